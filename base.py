@@ -7,16 +7,82 @@ import time
 import math
 import importlib
 import os
+import itertools
+import json
+import concurrent.futures
+import ast
+import builtins
+import sys
+import types
+import hashlib
+import threading
+import multiprocessing.connection
+import traceback
+import tracemalloc
+
+import opening_book
+import instrumentation
 
 all_bots = {}
 bot_modules = {}
 _module_files = {}
 
-try:
-    all_games = open("data/Games.txt") # Sourced from https://github.com/SebLague/Chess-Coding-Adventure/blob/Chess-V1-Unity/Assets/Book/Games.txt
-    lines = all_games.readlines()
-except FileNotFoundError:
-    raise FileNotFoundError("The file `data/Games.txt` was not found.")
+# Modules that have been changed since they were imported, and need to be reloaded the next time they're used.
+_stale_modules = set()
+
+# The modification time, size, and hash of each bot file, alongside the bots found in it.
+# This lets `refresh_bots` skip the files that haven't changed since the last refresh.
+_file_records = {}
+
+# Refreshing and importing bots can happen from the bot watcher's thread as well as the main thread.
+_bot_lock = threading.RLock()
+
+# The thread and stop event of the bot watcher, if it's running. See `start_bot_watcher`.
+_bot_watcher = None
+
+# Functions that are called with every bot module as it gets imported.
+# The GUIs use this to replace `print` in bots that are loaded after the GUI has started.
+module_load_hooks = []
+
+# The games from `data/Games.txt`, with their openings already parsed. See `opening_book.py` for more information.
+# This is loaded the first time it's needed, use `get_book` to get it.
+_book = None
+
+def get_book() -> opening_book.OpeningBook:
+    """Returns the opening book, loading it if it hasn't been loaded yet."""
+    global _book
+    
+    if _book is None:
+        _book = opening_book.load_book()
+    
+    return _book
+
+def __getattr__(name: str) -> typing.Any:
+    # Keeps `base.book` and `base.lines` working without loading the book when `base` is imported.
+    if name == "book":
+        return get_book()
+    if name == "lines":
+        return get_book().lines
+    
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def position_key(board: chess.Board) -> tuple:
+    """Returns a key for the position on the board, made of its pieces, the side to move, the castling rights, and the en passant square if an en passant capture is legal.
+    Two boards have the same key when they have the same legal moves, so it can be used to cache anything that only depends on the position.
+    This is the same as the key python-chess uses to detect repetitions, but only uses its public attributes, and it's a lot quicker than `chess.polyglot.zobrist_hash`."""
+    return (
+        board.pawns,
+        board.knights,
+        board.bishops,
+        board.rooks,
+        board.queens,
+        board.kings,
+        board.occupied_co[chess.WHITE],
+        board.occupied_co[chess.BLACK],
+        board.turn,
+        board.clean_castling_rights(),
+        board.ep_square if board.has_legal_en_passant() else None
+    )
 
 #############################################################################################################
 #############################################################################################################
@@ -30,6 +96,11 @@ class ChessBot(abc.ABC):
     description = """Generic Chess bot.""" # The description of the bot. This doesn't necessarily need to describe exactly how the bot works (like in the bot `tau` and `pi`,) but it can if you'd like (like in the bots `alphamove` and `giveaway`.)
     creator = "Biongo" # Whoever created this bot.
     color = 0x888888 # The color of the bot as a hex code. If possible this should be different from the other bots for clarity.
+    
+    # Set by `run_match` when the bot is played with a time limit, so bots that search can fit the search into the time they have.
+    # `time_limit` is the number of seconds the bot has for this move, which with a clock is everything left on it. Both are None without a time limit.
+    time_control = None # type: TimeControl | None
+    time_limit = None # type: float | None
 
     def __init__(
             self: typing.Self,
@@ -53,6 +124,30 @@ class ChessBot(abc.ABC):
 
         If `None` is returned then nothing will be saved."""
         return None
+    
+    # The number of positions whose move lists are kept by `get_moves` before the cache is cleared.
+    MOVE_CACHE_SIZE = 1024
+    
+    def get_moves(
+            self: typing.Self,
+            board: chess.Board
+        ) -> "MoveList":
+        """Returns the legal moves in the given position as a `MoveList`.
+        The move list is cached, so calling this again for the same position, even on a different board, doesn't generate the moves again.
+        This can be used in `turn` instead of going through `board.legal_moves` more than once.
+        For positions that are only looked at once, like the replies to each move in a search, `board.legal_moves` is quicker as nothing has to be kept."""
+        # Made here instead of in `__init__`, so subclasses that don't call `super().__init__` can still use this.
+        cache = self.__dict__.setdefault("_move_lists", {})
+        
+        key = position_key(board)
+        
+        if key not in cache:
+            if len(cache) >= self.MOVE_CACHE_SIZE:
+                cache.clear()
+            
+            cache[key] = MoveList(board)
+        
+        return cache[key]
 
     # This method is required for subclasses due to being an abstractmethod.
     @abc.abstractmethod
@@ -74,6 +169,170 @@ class ChessBot(abc.ABC):
 #############################################################################################################
 #############################################################################################################
 
+class AttackInfo():
+    """The attacks of every piece in a position, worked out once so the evaluation terms of a bot don't each have to redo it.
+    The attacks are the same as `chess.Board.attacks`, so pinned pieces still attack the squares they could move to if they weren't pinned.
+    
+    Anything that's split by side is indexed by the color, like `info.attacked[chess.WHITE]`.
+    
+    The board isn't kept, so the information stays the same even if moves are pushed to the board afterwards.
+    
+    >>> info = AttackInfo(chess.Board())
+    >>> info.attacker_count(chess.WHITE, chess.E3)
+    2
+    >>> info.undefended[chess.WHITE] == chess.BB_A1 | chess.BB_H1
+    True"""
+    def __init__(
+            self: typing.Self,
+            board: chess.Board
+        ) -> None:
+        self.piece_attacks = {} # type: dict[chess.Square, chess.Bitboard]
+        
+        self.occupied = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.attacked = [chess.BB_EMPTY, chess.BB_EMPTY]
+        
+        # For every square, a bitboard of the pieces of each side that attack it.
+        self.attackers = [[chess.BB_EMPTY] * 64, [chess.BB_EMPTY] * 64]
+        
+        for color in chess.COLORS:
+            attackers = self.attackers[color]
+            
+            for square in chess.scan_forward(self.occupied[color]):
+                attacks = board.attacks_mask(square)
+                self.piece_attacks[square] = attacks
+                self.attacked[color] |= attacks
+                
+                square_mask = chess.BB_SQUARES[square]
+                for attacked_square in chess.scan_forward(attacks):
+                    attackers[attacked_square] |= square_mask
+        
+        # Pieces that are attacked by their own side, and pieces that aren't.
+        self.defended = [self.occupied[color] & self.attacked[color] for color in (chess.BLACK, chess.WHITE)]
+        self.undefended = [self.occupied[color] & ~self.attacked[color] for color in (chess.BLACK, chess.WHITE)]
+        
+        # Undefended pieces that the other side attacks.
+        self.hanging = [self.undefended[color] & self.attacked[not color] for color in (chess.BLACK, chess.WHITE)]
+    
+    def attacks(
+            self: typing.Self,
+            square: chess.Square
+        ) -> chess.Bitboard:
+        """Returns a bitboard of the squares the piece on the given square attacks, or an empty bitboard if the square is empty."""
+        return self.piece_attacks.get(square, chess.BB_EMPTY)
+    
+    def attacked_by(
+            self: typing.Self,
+            color: chess.Color,
+            mask: chess.Bitboard = chess.BB_ALL
+        ) -> chess.Bitboard:
+        """Returns a bitboard of the squares attacked by the pieces of the given side that are in `mask`."""
+        if mask & self.occupied[color] == self.occupied[color]:
+            return self.attacked[color]
+        
+        total = chess.BB_EMPTY
+        
+        for square in chess.scan_forward(mask & self.occupied[color]):
+            total |= self.piece_attacks[square]
+        
+        return total
+    
+    def attackers_mask(
+            self: typing.Self,
+            color: chess.Color,
+            square: chess.Square
+        ) -> chess.Bitboard:
+        """Returns a bitboard of the pieces of the given side that attack the given square."""
+        return self.attackers[color][square]
+    
+    def attacker_count(
+            self: typing.Self,
+            color: chess.Color,
+            square: chess.Square
+        ) -> int:
+        """Returns the number of pieces of the given side that attack the given square."""
+        return self.attackers[color][square].bit_count()
+
+class MoveList():
+    """The legal moves in a position, generated once and grouped by the square they move from.
+    Whether each move is a capture or promotion is worked out when the list is made, and whether it gives check the first time that's needed.
+    
+    The moves are in the same order as `board.legal_moves`. Use `ChessBot.get_moves` to get the move list of a position.
+    
+    >>> moves = MoveList(chess.Board())
+    >>> len(moves)
+    20
+    >>> moves.from_square(chess.G1)
+    [Move.from_uci('g1h3'), Move.from_uci('g1f3')]
+    >>> moves.captures
+    []"""
+    def __init__(
+            self: typing.Self,
+            board: chess.Board
+        ) -> None:
+        self.moves = list(board.legal_moves)
+        
+        self.by_square = {} # type: dict[chess.Square, list[chess.Move]]
+        for move in self.moves:
+            if move.from_square in self.by_square:
+                self.by_square[move.from_square].append(move)
+            else:
+                self.by_square[move.from_square] = [move]
+        
+        self.captures = [move for move in self.moves if board.is_capture(move)]
+        self.promotions = [move for move in self.moves if move.promotion is not None]
+        
+        self._capture_set = set(self.captures)
+        
+        # The checks are only found if they're used, as that means pushing every move.
+        # A copy without the move stack is kept for that, as the original board could have changed by then.
+        self._board = board.copy(stack=False)
+        self._checks = None
+    
+    def __iter__(self: typing.Self) -> typing.Iterator[chess.Move]:
+        return iter(self.moves)
+    
+    def __len__(self: typing.Self) -> int:
+        return len(self.moves)
+    
+    def __contains__(
+            self: typing.Self,
+            move: chess.Move
+        ) -> bool:
+        return move in self.by_square.get(move.from_square, ())
+    
+    @property
+    def checks(self: typing.Self) -> list[chess.Move]:
+        """The moves that give check."""
+        if self._checks is None:
+            self._checks = [move for move in self.moves if self._board.gives_check(move)]
+        
+        return self._checks
+    
+    def from_square(
+            self: typing.Self,
+            square: chess.Square
+        ) -> list[chess.Move]:
+        """Returns the moves of the piece on the given square, which is empty if it can't move."""
+        return self.by_square.get(square, [])
+    
+    def is_capture(
+            self: typing.Self,
+            move: chess.Move
+        ) -> bool:
+        """Returns a boolean for whether the move is a capture. The move should be in the list."""
+        return move in self._capture_set
+    
+    def gives_check(
+            self: typing.Self,
+            move: chess.Move
+        ) -> bool:
+        """Returns a boolean for whether the move gives check. The move should be in the list."""
+        return move in self.checks
+
+#############################################################################################################
+#############################################################################################################
+#############################################################################################################
+
 def write_pgn(board: chess.Board) -> str:
     """Writes the given board's move stack as a pgn string.
     This does require the move stack having contents, so passing a board that was set from a FEN will only return the moves that were played.
@@ -126,7 +385,169 @@ def get_random_moves(
     """Gets a list of random moves from `data/Games.txt` and returns a random list of opening moves from it.
     
     If you want to force a set of opening moves have this return the output from `parse_san`."""
-    return random.Random(seed).choice(copy.deepcopy(lines)).split(" ")[:amount + 1]
+    book = get_book()
+    return book.get_san(book.random_index(seed), amount + 1)
+
+class TimeControl():
+    """A time limit for the bots in `run_match`. All times are in seconds.
+    
+    Either every move gets a fixed amount of time with `move_time`, or each bot gets a clock with `base_time`
+    that gains `increment` after every move, like a regular game of Chess.
+    
+    A bot that runs out of time loses, unless `fallback` is given. In that case the bot's move is replaced with
+    the move `fallback` returns when given the board, and the game carries on. `fallback` has to be defined at the
+    top level of a module so it can be sent to the processes used by `run_bulk`."""
+    def __init__(
+            self: typing.Self,
+            move_time: float | None = None,
+            base_time: float | None = None,
+            increment: float = 0.0,
+            fallback: typing.Callable[[chess.Board], chess.Move] | None = None
+        ) -> None:
+        if (move_time is None) == (base_time is None):
+            raise ValueError("Exactly one of `move_time` and `base_time` should be given.")
+        
+        self.move_time = move_time
+        self.base_time = base_time
+        self.increment = increment
+        self.fallback = fallback
+    
+    @classmethod
+    def from_string(
+            cls: type[typing.Self],
+            text: str,
+            fallback: typing.Callable[[chess.Board], chess.Move] | None = None
+        ) -> typing.Self:
+        """Parses a time control like `60+0.5` for a 60 second clock with a 0.5 second increment, or `0.5` for 0.5 seconds per move.
+        If the text is invalid a ValueError is raised."""
+        if "+" in text:
+            base_time, increment = text.split("+")
+            return cls(base_time=float(base_time), increment=float(increment), fallback=fallback)
+        
+        return cls(move_time=float(text), fallback=fallback)
+    
+    def __str__(self: typing.Self) -> str:
+        if self.move_time is not None:
+            return f"{self.move_time:g}s per move"
+        
+        return f"{self.base_time:g}+{self.increment:g}"
+
+def random_move(board: chess.Board) -> chess.Move:
+    """Returns a random legal move. This can be used as the fallback of a `TimeControl`."""
+    return random.choice(list(board.legal_moves))
+
+def _run_bot_process(
+        bot: ChessBot,
+        connection: multiprocessing.connection.Connection,
+        instrument: bool,
+        trace_memory: bool,
+        time_control: TimeControl
+    ) -> None:
+    """Runs a bot's turns for `_BotProcess` until the connection is closed."""
+    _init_bulk_worker()
+    
+    try:
+        bot_obj = bot({}) # type: ChessBot
+    except Exception:
+        connection.send(traceback.format_exc())
+        return
+    
+    bot_obj.time_control = time_control
+    
+    # Let the main process know the bot is ready, so creating the bot doesn't count towards its time.
+    connection.send(None)
+    
+    while True:
+        try:
+            board, data, time_limit = connection.recv()
+        except EOFError:
+            return
+        
+        bot_obj.time_limit = time_limit
+        
+        calls = [] if instrument else None
+        
+        try:
+            instrumentation.measure(calls, bot_obj.name, "load", board, bot_obj.load, data, trace_memory=trace_memory)
+            
+            move = instrumentation.measure(calls, bot_obj.name, "turn", board, bot_obj.turn, board, trace_memory=trace_memory)
+            
+            data = instrumentation.measure(calls, bot_obj.name, "save", board, bot_obj.save, trace_memory=trace_memory)
+            
+            connection.send((move, data, None, calls))
+        except Exception:
+            connection.send((None, None, traceback.format_exc(), None))
+
+class _BotProcess():
+    """A bot running in its own process, so its turn can be stopped if it goes over its time."""
+    def __init__(
+            self: typing.Self,
+            bot: ChessBot,
+            time_control: TimeControl,
+            instrument: bool = False,
+            trace_memory: bool = False
+        ) -> None:
+        self.bot = bot
+        self.time_control = time_control
+        self.instrument = instrument
+        self.trace_memory = trace_memory
+        self.process = None
+        self.connection = None
+    
+    def start(self: typing.Self) -> None:
+        """Starts the bot's process and waits for the bot to be created."""
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_run_bot_process, args=(self.bot, child_connection, self.instrument, self.trace_memory, self.time_control), daemon=True)
+        self.process.start()
+        child_connection.close()
+        
+        error = self.connection.recv()
+        
+        if error is not None:
+            self.stop()
+            raise RuntimeError(f"The bot {self.bot.name} raised an exception:\n{error}")
+    
+    def turn(
+            self: typing.Self,
+            board: chess.Board,
+            data: dict,
+            time_limit: float
+        ) -> tuple[chess.Move | None, dict, float, list[dict] | None]:
+        """Runs the bot's turn, returning the move, the data to save, the time the turn took, and the samples from `instrumentation.measure` if the bot is being instrumented.
+        If the bot doesn't move within the time limit it is stopped, and None is returned as the move."""
+        if self.process is None:
+            self.start()
+        
+        start = time.perf_counter()
+        
+        self.connection.send((board, data, time_limit))
+        
+        if not self.connection.poll(max(time_limit, 0)):
+            # The process gets started again for the next move, with the data from the last move that finished in time.
+            self.stop()
+            return None, data, time.perf_counter() - start, None
+        
+        move, data, error, calls = self.connection.recv()
+        
+        elapsed = time.perf_counter() - start
+        
+        if error is not None:
+            raise RuntimeError(f"The bot {self.bot.name} raised an exception:\n{error}")
+        
+        return move, data, elapsed, calls
+    
+    def stop(self: typing.Self) -> None:
+        """Stops the bot's process if it's running."""
+        if self.process is None:
+            return
+        
+        self.connection.close()
+        self.process.terminate()
+        self.process.join()
+        self.process.close()
+        
+        self.process = None
+        self.connection = None
 
 def run_match(
         white: ChessBot,
@@ -135,6 +556,10 @@ def run_match(
         variate_starting_position: bool = False,
         seed: str | int | float | bytes | bytearray | None = None,
         custom_start_san: str = None,
+        opening: int | None = None,
+        time_control: TimeControl | None = None,
+        instrument: bool = False,
+        trace_memory: bool = False,
         log_progress: bool = True,
     ) -> dict:
     """Runs a single match between the two given bots.
@@ -146,54 +571,390 @@ def run_match(
         seed (str | int | float | bytes | bytearray | None, optional): A seed to be passed when choosing the random start position, only makes a difference if variate_starting_position is True. Defaults to None.
         custom_start_san (str, optional): A string Standard Algebraic Notation moves that will be parsed and played before the bots take control,
             which can be used to start a game from a set position. This requires `variate_starting_position` to be True, but overrides `seed`. Defaults to None.
+        opening (int | None, optional): The index of the game in the opening book to take the starting moves from. This requires `variate_starting_position` to be True,
+            but overrides `seed`. `custom_start_san` takes priority over this. Defaults to None.
+        time_control (TimeControl | None, optional): The time limit for the bots. If this is given each bot is run in its own process,
+            so it can be stopped when it goes over its time, and the bot's `time_control` and `time_limit` are set before each move. If None the bots have no time limit. Defaults to None.
+        instrument (bool, optional): Whether to time every call to the bots' `load`, `turn`, and `save` methods. Defaults to False.
+        trace_memory (bool, optional): Whether to also measure the peak memory allocated in each call when `instrument` is True.
+            This makes the bots a lot slower. Defaults to False.
         log_progress (bool, optional): Whether to log the progress of the game as it is being played. Defaults to True.
 
     Returns:
-        dict: The result from the game, containing the winner, the PGN of the game, and the FEN of the board at the end.
+        dict: The result from the game, containing the winner, the PGN of the game, the FEN of the board at the end,
+            the time each move took under "move_times", and the plies where a bot ran out of time under "timeouts".
+            If `instrument` is True the samples from `instrumentation.measure` are under "calls", otherwise that is None.
     """    
     board = chess.Board()
 
     if variate_starting_position:
         if custom_start_san is None:
-            starting_moves = get_random_moves(amount=6, seed=seed)
+            book = get_book()
+            
+            if opening is None:
+                opening = book.random_index(seed)
+            
+            # The moves are already parsed in the book, so this skips parsing the SAN.
+            # 7 plies is the same as what `get_random_moves(amount=6)` gives.
+            board = book.get_board(opening, 7)
         else:
-            starting_moves = parse_san(custom_start_san)
-
-        for move in starting_moves:
-            board.push_san(move)
-
-    white_data = {}
-    black_data = {}
+            for move in parse_san(custom_start_san):
+                board.push_san(move)
 
-    white_obj = white(white_data) # type: ChessBot
-    black_obj = black(black_data) # type: ChessBot
+    data = {
+        chess.WHITE: {},
+        chess.BLACK: {}
+    }
+    
+    if time_control is None:
+        bot_objs = {
+            chess.WHITE: white(data[chess.WHITE]),
+            chess.BLACK: black(data[chess.BLACK])
+        } # type: dict[bool, ChessBot]
+    else:
+        bot_processes = {
+            chess.WHITE: _BotProcess(white, time_control, instrument, trace_memory),
+            chess.BLACK: _BotProcess(black, time_control, instrument, trace_memory)
+        }
+        clocks = {
+            chess.WHITE: time_control.base_time,
+            chess.BLACK: time_control.base_time
+        }
+    
+    move_times = []
+    timeouts = []
+    forfeit = None
+    calls = [] if instrument else None
+    was_tracing = tracemalloc.is_tracing()
     
-    move_number = 1
-    while board.outcome() is None:
-        if log_progress:
-            print(f"Progress: Tick: {move_number} Ply: {board.ply()} Fullmove: {board.fullmove_number} FEN: {board.fen()}")
-        if board.turn == chess.WHITE:
-            white_obj.load(white_data)
+    try:
+        move_number = 1
+        while board.outcome() is None:
+            if log_progress:
+                print(f"Progress: Tick: {move_number} Ply: {board.ply()} Fullmove: {board.fullmove_number} FEN: {board.fen()}")
             
-            move = white_obj.turn(board.copy())
+            if time_control is None:
+                bot_obj = bot_objs[board.turn]
+                
+                start = time.perf_counter()
+                
+                instrumentation.measure(calls, bot_obj.name, "load", board, bot_obj.load, data[board.turn], trace_memory=trace_memory)
+                
+                move = instrumentation.measure(calls, bot_obj.name, "turn", board, bot_obj.turn, board.copy(), trace_memory=trace_memory)
 
-            white_data = white_obj.save()
-        else:
-            black_obj.load(black_data)
+                data[board.turn] = instrumentation.measure(calls, bot_obj.name, "save", board, bot_obj.save, trace_memory=trace_memory)
+                
+                move_times.append(time.perf_counter() - start)
+            else:
+                if time_control.move_time is not None:
+                    time_limit = time_control.move_time
+                else:
+                    time_limit = clocks[board.turn]
+                
+                move, data[board.turn], elapsed, turn_calls = bot_processes[board.turn].turn(board.copy(), data[board.turn], time_limit)
+                
+                move_times.append(elapsed)
+                
+                if turn_calls is not None:
+                    calls.extend(turn_calls)
+                
+                if time_control.base_time is not None:
+                    clocks[board.turn] += time_control.increment - elapsed
+                
+                if move is None:
+                    timeouts.append(board.ply())
+                    
+                    if time_control.fallback is None:
+                        forfeit = board.turn
+                        break
+                    
+                    move = time_control.fallback(board.copy())
+                    
+                    if time_control.base_time is not None:
+                        # Otherwise the bot would never be able to move in time again.
+                        clocks[board.turn] = max(clocks[board.turn], 0) + time_control.increment
             
-            move = black_obj.turn(board.copy())
+            board.push(move)
+            move_number += 1
+    finally:
+        if time_control is not None:
+            for bot_process in bot_processes.values():
+                bot_process.stop()
+        
+        if trace_memory and not was_tracing:
+            tracemalloc.stop()
+    
+    if forfeit is None:
+        winner = board.outcome().winner if board.is_checkmate() else None # If it's not a checkmate then it's a draw.
+        result = board.outcome().result()
+        termination = ""
+    else:
+        # Running out of time is a draw if the other side can't possibly checkmate.
+        winner = None if board.has_insufficient_material(not forfeit) else not forfeit
+        result = {True: "1-0", False: "0-1", None: "1/2-1/2"}[winner]
+        termination = """[Termination "time forfeit"]\n"""
+    
+    return {
+        "winner": winner,
+        "pgn": f"""[White "[Bot] {white.name}"]\n[Black "[Bot] {black.name}"]\n[Result "{result}"]\n{termination}\n{write_pgn(board)} {result}""",
+        "fen": board.fen(),
+        "move_times": move_times,
+        "timeouts": timeouts,
+        "calls": calls
+    }
+
+def elo_to_score(elo: float) -> float:
+    """Converts an Elo difference into the expected score for the stronger side, where a win is 1 and a draw is 0.5."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def score_to_elo(score: float) -> float:
+    """Converts an expected score into an Elo difference. A score of 0 or 1 gives an infinite difference."""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    
+    return -400 * math.log10(1 / score - 1)
+
+def _score_statistics(
+        wins: int,
+        draws: int,
+        losses: int
+    ) -> tuple[float, float]:
+    """Returns the mean and variance of the score per game."""
+    games = wins + draws + losses
+    
+    mean = (wins + draws / 2) / games
+    variance = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * mean ** 2) / games
+    
+    return mean, variance
+
+def elo_estimate(
+        wins: int,
+        draws: int,
+        losses: int
+    ) -> tuple[float, float]:
+    """Estimates the Elo difference from the given results, from the point of view of the side with the wins.
+    
+    A score of 0 or 1 would be an infinite difference, so scores are kept away from them by the same amount
+    as adding a draw to a perfect score would, which is how `tournament.compute_ratings` handles it too.
+    
+    Returns a tuple of the estimate and the margin of its 95% confidence interval.
+    If there are no games, or every game has the same result so nothing is known about the variance, the margin is infinite."""
+    games = wins + draws + losses
+    
+    if games == 0:
+        return 0.0, math.inf
+    
+    mean, variance = _score_statistics(wins, draws, losses)
+    
+    limit = 0.5 / (games + 1)
+    clamp = lambda score: min(max(score, limit), 1 - limit)
+    
+    if variance == 0:
+        return score_to_elo(clamp(mean)), math.inf
+    
+    deviation = 1.959964 * math.sqrt(variance / games)
+    margin = (score_to_elo(clamp(mean + deviation)) - score_to_elo(clamp(mean - deviation))) / 2
+    
+    return score_to_elo(clamp(mean)), margin
+
+def sprt_llr(
+        wins: int,
+        draws: int,
+        losses: int,
+        elo0: float,
+        elo1: float
+    ) -> float:
+    """Returns the log-likelihood ratio of the Elo difference being `elo1` rather than `elo0`, given the results.
+    This uses the normal approximation of the generalized SPRT, which is the same one Fishtest uses."""
+    if wins + draws + losses == 0:
+        return 0.0
+    
+    mean, variance = _score_statistics(wins, draws, losses)
+    
+    # Every game having the same result gives no information about the variance, so hold off until it does.
+    if variance == 0:
+        return 0.0
+    
+    score0 = elo_to_score(elo0)
+    score1 = elo_to_score(elo1)
+    
+    return (wins + draws + losses) * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+def sprt_bounds(
+        alpha: float,
+        beta: float
+    ) -> tuple[float, float]:
+    """Returns the lower and upper log-likelihood ratio bounds for the given error rates.
+    Crossing the lower bound accepts `elo0`, and crossing the upper bound accepts `elo1`."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
 
-            black_data = black_obj.save()
+def plan_bulk_games(
+        bot_1: ChessBot,
+        bot_2: ChessBot,
+        amount: int,
+        variate_starting_positions: bool,
+        seeded_positions: bool,
+        time_control: TimeControl | None = None,
+        instrument: bool = False,
+        trace_memory: bool = False
+    ) -> typing.Generator[dict, None, None]:
+    """Yields the settings for each game in a bulk run, in the order they would be played.
+    The colors alternate every game, and each pair of games shares the same starting position so both bots get to play both sides of it."""
+    opening = None
+
+    for game in range(amount):
+        if seeded_positions:
+            seed = game
+        else:
+            seed = None
         
-        board.push(move)
-        move_number += 1
+        if variate_starting_positions and game % 2 == 0:
+            opening = get_book().random_index(seed)
+
+        yield {
+            "game": game,
+            "white": bot_1 if game % 2 == 0 else bot_2,
+            "black": bot_2 if game % 2 == 0 else bot_1,
+            "variate_starting_position": variate_starting_positions,
+            "opening": opening,
+            "seed": seed,
+            "time_control": time_control,
+            "instrument": instrument,
+            "trace_memory": trace_memory
+        }
+
+def _play_bulk_game(game: dict) -> dict:
+    """Plays a single game from the plan made by `plan_bulk_games`. This is what gets run in the worker processes."""
+    start = time.perf_counter()
+    
+    data = run_match(
+        white = game["white"],
+        black = game["black"],
+        variate_starting_position = game["variate_starting_position"],
+        opening = game["opening"],
+        seed = game["seed"],
+        time_control = game["time_control"],
+        instrument = game["instrument"],
+        trace_memory = game["trace_memory"],
+        log_progress = False
+    )
+    
+    data["time"] = time.perf_counter() - start
+    return data
+
+def _game_settings(game: dict) -> dict:
+    """Returns the settings of a game from `plan_bulk_games` that change how it's played, other than the seed, in a form that can be written to the results log."""
+    time_control = game["time_control"]
     
     return {
-        "winner": board.outcome().winner if board.is_checkmate() else None, # If it's not a checkmate then it's a draw.
-        "pgn": f"""[White "[Bot] {white_obj.name}"]\n[Black "[Bot] {black_obj.name}"]\n[Result "{board.outcome().result()}"]\n\n{write_pgn(board)} {board.outcome().result()}""",
-        "fen": board.fen()
+        "variate_starting_position": game["variate_starting_position"],
+        "time_control": None if time_control is None else [time_control.move_time, time_control.base_time, time_control.increment, time_control.fallback is not None]
     }
 
+def _read_results_log(
+        log_path: str,
+        bot_1: ChessBot,
+        bot_2: ChessBot
+    ) -> dict[int, list[dict]]:
+    """Reads the results log written by `run_bulk` and returns the entries for the given pairing, grouped by the game number.
+    A game number can have more than one entry if the log has runs with different seeds or settings.
+    Lines that can't be parsed, like one that was only partially written before a crash, are skipped."""
+    entries = {}
+    
+    if not os.path.isfile(log_path):
+        return entries
+    
+    with open(log_path, "r", encoding="utf-8") as file_read:
+        for line in file_read:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            
+            if entry.get("bot_1") != bot_1.name or entry.get("bot_2") != bot_2.name:
+                continue
+            
+            entries.setdefault(entry["game"], []).append(entry)
+    
+    return entries
+
+def _open_results_log(log_path: str) -> typing.TextIO:
+    """Opens the results log for appending.
+    If the last line was cut off partway through, a newline is added so the next entry starts on its own line."""
+    if os.path.isfile(log_path) and os.path.getsize(log_path) > 0:
+        with open(log_path, "rb") as file_read:
+            file_read.seek(-1, os.SEEK_END)
+            needs_newline = file_read.read(1) != b"\n"
+    else:
+        needs_newline = False
+    
+    log_file = open(log_path, "a", encoding="utf-8")
+    
+    if needs_newline:
+        log_file.write("\n")
+    
+    return log_file
+
+def _init_bulk_worker() -> None:
+    """Sets up a worker process for running bulk games."""
+    # Forked workers inherit the random state of the parent, which would make every worker play the same "random" moves.
+    random.seed()
+
+    # The GUIs replace `print` in the bot modules with a version that logs to the window, which can't be used from another process.
+    globals().pop("print", None)
+    module_load_hooks.clear()
+    for module in _module_files.values():
+        module.__dict__.pop("print", None)
+
+def iterate_in_pool(
+        function: typing.Callable[[typing.Any], typing.Any],
+        items: typing.Iterable[typing.Any],
+        workers: int = 1
+    ) -> typing.Generator[tuple[typing.Any, typing.Any], None, None]:
+    """Runs the function on each of the given items and yields each item alongside its result.
+    If more than one worker is used the items are spread over a process pool and are yielded in the order they finish,
+    in which case the function and items need to be picklable, so the function has to be defined at the top level of a module.
+    
+    Closing the generator early will cancel any items that haven't been started yet."""
+    if workers <= 1:
+        for item in items:
+            yield item, function(item)
+        return
+    
+    items = iter(items)
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_bulk_worker)
+    
+    try:
+        # Only keep a couple items queued per worker, so stopping early doesn't need to wait on thousands of them.
+        pending = {}
+        for item in itertools.islice(items, workers * 2):
+            pending[executor.submit(function, item)] = item
+        
+        while pending:
+            finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            
+            for future in finished:
+                item = pending.pop(future)
+                
+                for next_item in itertools.islice(items, 1):
+                    pending[executor.submit(function, next_item)] = next_item
+                
+                yield item, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def iterate_bulk_games(
+        games: typing.Iterable[dict],
+        workers: int = 1
+    ) -> typing.Generator[tuple[dict, dict], None, None]:
+    """Plays the given games and yields each game alongside its result.
+    If more than one worker is used the games are spread over a process pool and are yielded in the order they finish.
+    
+    Closing the generator early will cancel any games that haven't been started yet."""
+    yield from iterate_in_pool(_play_bulk_game, games, workers)
+
 def run_bulk(
         bot_1: ChessBot,
         bot_2: ChessBot,
@@ -201,7 +962,18 @@ def run_bulk(
         *, # This means the following arguments must be passed as keyword arguments, so like run_bulk(..., variate_starting_positions=True) rather than run_bulk(..., True)
         variate_starting_positions: bool = False,
         seeded_positions: bool = True,
-        fancy_formatting: bool = True
+        fancy_formatting: bool = True,
+        parallel: bool = False,
+        workers: int | None = None,
+        log_path: str | None = None,
+        resume: bool = False,
+        sprt: tuple[float, float] | None = None,
+        sprt_alpha: float = 0.05,
+        sprt_beta: float = 0.05,
+        time_control: TimeControl | None = None,
+        instrument: bool = False,
+        trace_memory: bool = False,
+        instrumentation_path: str | None = None
     ) -> dict:
     """Runs a series of matches between two bots and returns the results.
 
@@ -214,9 +986,25 @@ def run_bulk(
             so running this multiple times will have the same starting positions. This only makes a
             difference if variate_starting_positions is True. Defaults to True.
         fancy_formatting (bool, optional): Whether to use a nice formatting method that doesn't clog up the terminal. Defaults to True.
+        parallel (bool, optional): Whether to spread the games over multiple processes. The games and their starting positions
+            are the same as when running them one after another, they just finish in a different order. Defaults to False.
+        workers (int | None, optional): The number of processes to use when `parallel` is True. If None the number of CPUs is used. Defaults to None.
+        log_path (str | None, optional): A file to append each finished game to as a line of JSON, containing the PGN, FEN and time taken. Defaults to None.
+        resume (bool, optional): Whether to read the games already in `log_path` for this pairing, seed, and settings and skip playing them again.
+            Their results are counted as if they were just played. Defaults to False.
+        sprt (tuple[float, float] | None, optional): The Elo bounds (elo0, elo1) for a sequential probability ratio test of `bot_1` against `bot_2`.
+            If given, the games stop as soon as the test passes or fails, so `amount` becomes the most games that will be played. Defaults to None.
+        sprt_alpha (float, optional): The chance of the test passing when `bot_1` is really only elo0 stronger. Defaults to 0.05.
+        sprt_beta (float, optional): The chance of the test failing when `bot_1` is really elo1 stronger. Defaults to 0.05.
+        time_control (TimeControl | None, optional): The time limit for the bots in every game, see `run_match` for more information. Defaults to None.
+        instrument (bool, optional): Whether to time every call to the bots' `load`, `turn`, and `save` methods, see `instrumentation.py` for more information. Defaults to False.
+        trace_memory (bool, optional): Whether to also measure the peak memory allocated in each call when instrumenting. This makes the bots a lot slower. Defaults to False.
+        instrumentation_path (str | None, optional): If given the bots are instrumented, and at the end the summary is written to this path with `.json` added,
+            and every call is written to this path with `.csv` added. Defaults to None.
 
     Returns:
-        dict: The results from all the matches.
+        dict: The results from all the matches. If an SPRT was run the results of it are under the "sprt" key.
+            If the bots were instrumented, the summary from `instrumentation.Recorder.summary` is under the "instrumentation" key.
     """
     if fancy_formatting:
         print("\n" * 4)
@@ -224,6 +1012,12 @@ def run_bulk(
         LINE_CLEAR = '\x1b[2K'
         LOG_START = (LINE_CLEAR + LINE_UP) * 4
     
+    if parallel:
+        if workers is None:
+            workers = os.cpu_count() or 1
+    else:
+        workers = 1
+    
     outcomes = {
         bot_1.name: 0,
         bot_2.name: 0,
@@ -234,84 +1028,244 @@ def run_bulk(
 
     starting_time = time.time()
     
-    start_position = None
     starting_estimation = None
 
-    for game in range(amount):
-        game_white = bot_1 if game % 2 == 0 else bot_2
-        game_black = bot_2 if game % 2 == 0 else bot_1
-        
-        if variate_starting_positions and game % 2 == 0:
-            start_position = " ".join(get_random_moves(6))
+    games = plan_bulk_games(
+        bot_1 = bot_1,
+        bot_2 = bot_2,
+        amount = amount,
+        variate_starting_positions = variate_starting_positions,
+        seeded_positions = seeded_positions,
+        time_control = time_control,
+        instrument = instrument or instrumentation_path is not None,
+        trace_memory = trace_memory
+    )
+    
+    recorder = instrumentation.Recorder() if instrument or instrumentation_path is not None else None
+    
+    resumed = 0
+    
+    if log_path is not None and resume:
+        logged = _read_results_log(log_path, bot_1, bot_2)
+        remaining = []
         
-        if seeded_positions:
-            seed = game
-        else:
-            seed = None
-
-        data = run_match(
-            white = game_white,
-            black = game_black,
-            variate_starting_position = variate_starting_positions,
-            custom_start_san = start_position,
-            seed = seed,
-            log_progress = False
-        )
-
-        if data["winner"] is None:
-            outcomes["draw"] += 1
-        elif data["winner"]:
-            outcomes[game_white.name] += 1
-        else:
-            outcomes[game_black.name] += 1
-        
-        if (game + 1) % max(int(increment), 1) == 0:
-            current = time.time()
-            estimate = round(((current - starting_time) / (game + 1)) * (amount - (game + 1)), 2)
-            
-            if starting_estimation is None:
-                starting_estimation = estimate
-            
-            current_results = "Current results: {name1}: {win1}, {name2}: {win2}, draw: {draws}, {name1} win: {name1win}%, {name2} win: {name2win}%, draw: {drawpercent}%".format(
-                name1 = bot_1.name,
-                win1 = outcomes[bot_1.name],
-                name2 = bot_2.name,
-                win2 = outcomes[bot_2.name],
-                draws = outcomes["draw"],
-                name1win = round(outcomes[bot_1.name] / (game + 1) * 100, 2),
-                name2win = round(outcomes[bot_2.name] / (game + 1) * 100, 2),
-                drawpercent = round(outcomes["draw"] / (game + 1) * 100, 2)
-            )
+        for game in games:
+            settings = _game_settings(game)
             
-            if not fancy_formatting:
-                prefix = "{done}/{amount} | Elapsed: {elapsed} | Remaining: {estimated} | ".format(
-                    done = str(game + 1).rjust(int(math.log10(amount)) + 1),
-                    amount = amount,
-                    elapsed = round(current - starting_time, 2),
-                    estimated = estimate,
-                )
-                print(f"{prefix} {current_results}")
+            # Only skip the game if it was played with the same seed and settings, otherwise it would've had a different starting position or time limit.
+            # Entries from before the settings were logged don't have them, so those games are played again.
+            matching = [
+                entry
+                for entry in logged.get(game["game"], [])
+                if entry["seed"] == game["seed"] and entry.get("settings") == settings
+            ]
+            
+            if len(matching) == 0:
+                remaining.append(game)
+                continue
+            
+            entry = matching[-1]
+            
+            if entry["winner"] is None:
+                outcomes["draw"] += 1
+            elif entry["winner"]:
+                outcomes[entry["white"]] += 1
+            else:
+                outcomes[entry["black"]] += 1
+            
+            resumed += 1
+        
+        games = remaining
+        
+        print(f"Resuming from {log_path}, {resumed} of {amount} games have already been played.")
+    
+    if sprt is not None:
+        lower_bound, upper_bound = sprt_bounds(sprt_alpha, sprt_beta)
+        llr = sprt_llr(outcomes[bot_1.name], outcomes["draw"], outcomes[bot_2.name], *sprt)
+        
+        # The games read from the log might have already settled the test.
+        if not lower_bound < llr < upper_bound:
+            games = []
+    
+    log_file = None if log_path is None else _open_results_log(log_path)
+    
+    try:
+        for done, (game, data) in enumerate(iterate_bulk_games(games, workers), start=resumed + 1):
+            if data["winner"] is None:
+                outcomes["draw"] += 1
+            elif data["winner"]:
+                outcomes[game["white"].name] += 1
             else:
-                info = "{done}/{amount} [{progress}{blank}] {elapsed} | {estimated}".format(
-                    done = str(game + 1).rjust(int(math.log10(amount)) + 1),
-                    amount = amount,
-                    progress = "█" * int((game + 1) // increment),
-                    blank = "░" * int(100 - ((game + 1) // increment)),
-                    elapsed = round(current - starting_time, 2),
-                    estimated = estimate,
+                outcomes[game["black"].name] += 1
+            
+            if recorder is not None:
+                recorder.add(data["calls"])
+            
+            if log_file is not None:
+                log_file.write(json.dumps({
+                    "bot_1": bot_1.name,
+                    "bot_2": bot_2.name,
+                    "game": game["game"],
+                    "seed": game["seed"],
+                    "settings": _game_settings(game),
+                    "white": game["white"].name,
+                    "black": game["black"].name,
+                    "start": None if game["opening"] is None else " ".join(get_book().get_san(game["opening"], 7)),
+                    "winner": data["winner"],
+                    "pgn": data["pgn"],
+                    "fen": data["fen"],
+                    "time": data["time"],
+                    "move_times": data["move_times"],
+                    "timeouts": data["timeouts"]
+                }) + "\n")
+                log_file.flush()
+            
+            if done % max(int(increment), 1) == 0:
+                current = time.time()
+                estimate = round(((current - starting_time) / (done - resumed)) * (amount - done), 2)
+            
+                if starting_estimation is None:
+                    starting_estimation = estimate
+            
+                current_results = "Current results: {name1}: {win1}, {name2}: {win2}, draw: {draws}, {name1} win: {name1win}%, {name2} win: {name2win}%, draw: {drawpercent}%".format(
+                    name1 = bot_1.name,
+                    win1 = outcomes[bot_1.name],
+                    name2 = bot_2.name,
+                    win2 = outcomes[bot_2.name],
+                    draws = outcomes["draw"],
+                    name1win = round(outcomes[bot_1.name] / done * 100, 2),
+                    name2win = round(outcomes[bot_2.name] / done * 100, 2),
+                    drawpercent = round(outcomes["draw"] / done * 100, 2)
                 )
+            
+                if not fancy_formatting:
+                    prefix = "{done}/{amount} | Elapsed: {elapsed} | Remaining: {estimated} | ".format(
+                        done = str(done).rjust(int(math.log10(amount)) + 1),
+                        amount = amount,
+                        elapsed = round(current - starting_time, 2),
+                        estimated = estimate,
+                    )
+                    print(f"{prefix} {current_results}")
+                else:
+                    info = "{done}/{amount} [{progress}{blank}] {elapsed} | {estimated}".format(
+                        done = str(done).rjust(int(math.log10(amount)) + 1),
+                        amount = amount,
+                        progress = "█" * int(done // increment),
+                        blank = "░" * int(100 - (done // increment)),
+                        elapsed = round(current - starting_time, 2),
+                        estimated = estimate,
+                    )
                 
-                print("{log_start}\n{line}\n# {info} #\n# {current_results} #\n{line}".format(
-                    log_start = LOG_START,
-                    line = "#" * (len(info) + 4),
-                    info = info,
-                    current_results = current_results.ljust(len(info))
-                ), end="\r")
+                    print("{log_start}\n{line}\n# {info} #\n# {current_results} #\n{line}".format(
+                        log_start = LOG_START,
+                        line = "#" * (len(info) + 4),
+                        info = info,
+                        current_results = current_results.ljust(len(info))
+                    ), end="\r")
+            
+            if sprt is not None:
+                llr = sprt_llr(outcomes[bot_1.name], outcomes["draw"], outcomes[bot_2.name], *sprt)
+                
+                if not lower_bound < llr < upper_bound:
+                    break
+
+    finally:
+        if log_file is not None:
+            log_file.close()
             
     print()
+    
+    if sprt is not None:
+        played = outcomes[bot_1.name] + outcomes["draw"] + outcomes[bot_2.name]
+        elo, margin = elo_estimate(outcomes[bot_1.name], outcomes["draw"], outcomes[bot_2.name])
+        
+        if llr >= upper_bound:
+            verdict = "H1 accepted"
+        elif llr <= lower_bound:
+            verdict = "H0 accepted"
+        else:
+            verdict = "inconclusive"
+        
+        outcomes["sprt"] = {
+            "result": verdict,
+            "llr": llr,
+            "bounds": (lower_bound, upper_bound),
+            "elo": elo,
+            "elo_margin": margin,
+            "games": played,
+            "games_saved": amount - played
+        }
+        
+        print(f"SPRT [{sprt[0]}, {sprt[1]}] {bot_1.name} vs {bot_2.name}: {verdict}")
+        print(f"LLR: {round(llr, 2)} ({round(lower_bound, 2)}, {round(upper_bound, 2)}) | Elo: {round(elo, 1)} +/- {round(margin, 1) if math.isfinite(margin) else 'n/a'} | Games: {played} | Saved: {amount - played}")
+    
+    if recorder is not None:
+        outcomes["instrumentation"] = recorder.summary()
+        
+        print("Turn times (ms):")
+        for line in recorder.format_summary():
+            print(line)
+        
+        if instrumentation_path is not None:
+            recorder.write_json(f"{instrumentation_path}.json")
+            recorder.write_csv(f"{instrumentation_path}.csv")
+    
     return outcomes
 
-def get_bot(identifier: str) -> ChessBot | None:
+class BotInfo():
+    """Information about a bot that was found without importing the bot's file.
+    
+    This can be used in the same way as the bot's class. The file is only imported once the bot gets created,
+    or once something other than the name, description, creator, or color is needed."""
+    def __init__(
+            self: typing.Self,
+            name: str,
+            description: str,
+            creator: str,
+            color: int,
+            path: str,
+            module_name: str,
+            class_name: str,
+            bot_class: type[ChessBot] | None = None
+        ) -> None:
+        self.name = name
+        self.description = description
+        self.creator = creator
+        self.color = color
+        self.path = path
+        self.module_name = module_name
+        self.class_name = class_name
+        self._bot_class = bot_class
+    
+    def load(self: typing.Self) -> type[ChessBot]:
+        """Imports the bot's file if it hasn't been imported yet, and returns the bot's class."""
+        if self._bot_class is None:
+            module = _load_module(self.path, self.module_name)
+            self._bot_class = getattr(module, self.class_name)
+            bot_modules[self.name.lower()] = module
+        
+        return self._bot_class
+    
+    def __call__(self: typing.Self, *args, **kwargs) -> ChessBot:
+        return self.load()(*args, **kwargs)
+    
+    def __getattr__(self: typing.Self, name: str) -> typing.Any:
+        # This is only called for attributes that aren't set in `__init__`, so everything else is taken from the bot's class.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        
+        return getattr(self.load(), name)
+    
+    def __getstate__(self: typing.Self) -> dict:
+        # Classes from reloaded modules can't always be pickled, so let the other process import the class itself.
+        state = self.__dict__.copy()
+        state["_bot_class"] = None
+        return state
+    
+    def __repr__(self: typing.Self) -> str:
+        return f"<BotInfo {self.name!r} ({self.module_name}.{self.class_name})>"
+
+def get_bot(identifier: str) -> BotInfo | None:
     """Gets a bot from the all_bots dictionary by name.
     Case is ignored, so an all uppercase name will still work.
     If nothing is found a ValueError is raised."""
@@ -320,30 +1274,119 @@ def get_bot(identifier: str) -> ChessBot | None:
     except KeyError:
         raise ValueError(f"Bot '{identifier}' not found.\nAvailable bots: {', '.join(all_bots.keys())}")
 
-def get_module(identifier: str) -> ChessBot | None:
-    """Gets a bot's module from the bot_modules dictionary by the bot's name.
+def get_module(identifier: str) -> types.ModuleType | None:
+    """Gets a bot's module by the bot's name, importing it if it hasn't been imported yet.
     Case is ignored, so an all uppercase name will still work.
     If nothing is found then a ValueError will be raised."""
-    try:
-        return bot_modules[identifier.lower()]
-    except KeyError:
-        raise ValueError(f"Bot '{identifier}' not found.\nAvailable bots: {', '.join(all_bots.keys())}")
+    get_bot(identifier).load()
+    return bot_modules[identifier.lower()]
 
-def refresh_bots():
-    """Refreshes the all_bots dictionary with the bots in the `bots` and `dev` directories.
-    This searches the directories recursively for .py files, so files in folders in folders will be found as well."""
-    global all_bots, bot_modules, _module_files
+def add_module_load_hook(hook: typing.Callable[[types.ModuleType], None]) -> None:
+    """Adds a function that gets called with every bot module when it is imported or reloaded.
+    The function is also called with the modules that have already been imported."""
+    module_load_hooks.append(hook)
+    
+    for module in _module_files.values():
+        hook(module)
+
+def _load_module(
+        full_path: str,
+        module_name: str
+    ) -> types.ModuleType:
+    """Imports a bot file, or reloads it if it has changed since it was imported."""
+    with _bot_lock:
+        if full_path in _module_files and full_path not in _stale_modules:
+            return _module_files[full_path]
+        
+        try:
+            if full_path in _module_files:
+                module = importlib.reload(_module_files[full_path])
+            else:
+                module = importlib.import_module(module_name)
+        except Exception as e:
+            # Print the error so it shows up in the GUI logs, but still raise it since the bot can't be used.
+            print(f"{type(e).__name__} raised when loading \"{full_path}\" for finding chess bots: {e}")
+            raise
+        
+        globals()[module_name] = module
+        _module_files[full_path] = module
+        _stale_modules.discard(full_path)
+        
+        for hook in module_load_hooks:
+            hook(module)
+        
+        return module
+
+# The attributes of a bot that are read from the file without importing it.
+_BOT_ATTRIBUTES = ("name", "description", "creator", "color")
+
+def _scan_bot_file(full_path: str) -> dict[str, dict] | None:
+    """Finds the bots in a file by reading its class definitions, without running any of the file.
+    
+    Returns a dictionary of each bot's class name and its attributes from `_BOT_ATTRIBUTES`.
+    If the bots can't be found this way, like if a bot subclasses a class from another file or sets its name
+    to something other than a plain string, then None is returned and the file has to be imported."""
+    with open(full_path, "r", encoding="utf-8") as file_read:
+        tree = ast.parse(file_read.read(), filename=full_path)
     
-    all_bots.clear()
-    bot_modules.clear()
-    module_file_list_copy = _module_files.copy()
-    _module_files.clear()
+    defaults = {attribute: getattr(ChessBot, attribute) for attribute in _BOT_ATTRIBUTES}
+    found = {}
+    
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        
+        parents = []
+        
+        for base_node in node.bases:
+            base_name = ast.unparse(base_node)
+            
+            if base_name in ("base.ChessBot", "ChessBot"):
+                parents.append(defaults)
+            elif base_name in found:
+                parents.append(found[base_name])
+            elif not isinstance(getattr(builtins, base_name, None), type):
+                # It might be a bot from another file, there's no way to tell without importing it.
+                return None
+        
+        if len(parents) == 0:
+            continue
+        
+        if len(parents) > 1:
+            return None
+        
+        attributes = parents[0].copy()
+        
+        for statement in node.body:
+            if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+                target = statement.targets[0]
+            elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+                target = statement.target
+            else:
+                continue
+            
+            if not isinstance(target, ast.Name) or target.id not in _BOT_ATTRIBUTES:
+                continue
+            
+            try:
+                attributes[target.id] = ast.literal_eval(statement.value)
+            except ValueError:
+                return None
+        
+        found[node.name] = attributes
     
+    return found
+
+def _list_bot_files() -> list[tuple[str, str]]:
+    """Returns the path and module name of every .py file in the `bots` and `dev` directories.
+    This searches the directories recursively, so files in folders in folders will be found as well."""
     directory_list = [
         "bots",
         "dev"
     ]
     
+    bot_files = []
+    
     for directory in directory_list:
         file_list = []
         
@@ -360,44 +1403,196 @@ def refresh_bots():
                 continue
             
             filtered_root = root.replace('/', '.').replace('\\', '.')
-            
-            # If it's already been imported reload it, otherwise load it normally.
-            if full_path in module_file_list_copy:
-                try:
-                    module = importlib.reload(module_file_list_copy[full_path])
-                except Exception as e:
-                    # Catch any errors that occur when reloading the file and print them.
-                    print(f"{type(e).__name__} exception raised when reloading \"{full_path}\" for finding chess bots: {e}")
+            bot_files.append((full_path, f"{filtered_root}.{path.removesuffix('.py')}"))
+    
+    return bot_files
+
+def _find_bots(
+        full_path: str,
+        module_name: str
+    ) -> list[BotInfo] | None:
+    """Finds the bots in a file, only importing it if they can't be found by reading it.
+    If the file has an error None is returned."""
+    try:
+        found = _scan_bot_file(full_path)
+    except Exception as e:
+        # Catch any errors that occur when reading the file and print them.
+        print(f"{type(e).__name__} raised when loading \"{full_path}\" for finding chess bots: {e}")
+        return None
+    
+    if found is not None:
+        return [
+            BotInfo(
+                path = full_path,
+                module_name = module_name,
+                class_name = class_name,
+                **attributes
+            )
+            for class_name, attributes in found.items()
+        ]
+    
+    # The bots couldn't be found without importing the file, so import it.
+    try:
+        module = _load_module(full_path, module_name)
+    except Exception:
+        return None
+    
+    bots = []
+    
+    for obj in module.__dict__.values():
+        try:
+            # issubclass won't work properly if this file is run directly, so it must be imported.
+            # When run directly the import causes the ChessBot class in the imported file to be
+            # different internally from the one in this file, so issubclass will always return False.
+            # This can be solved by importing the this file instead, in which case everything will
+            # work as expected.
+            if issubclass(obj, ChessBot):
+                bots.append(BotInfo(
+                    name = obj.name,
+                    description = obj.description,
+                    creator = obj.creator,
+                    color = obj.color,
+                    path = full_path,
+                    module_name = module_name,
+                    class_name = obj.__name__,
+                    bot_class = obj
+                ))
+        except TypeError: # If the object is not a class then issubclass will raise a TypeError.
+            pass
+    
+    return bots
+
+def _hash_file(full_path: str) -> str:
+    with open(full_path, "rb") as file_read:
+        return hashlib.blake2b(file_read.read(), digest_size=16).hexdigest()
+
+def refresh_bots() -> bool:
+    """Refreshes the all_bots dictionary with the bots in the `bots` and `dev` directories.
+    
+    Only the files that have changed since the last refresh are looked at again. A file counts as changed if its
+    contents are different, so saving a file without changing it won't do anything. Bots from deleted files are removed.
+    The files are not imported here, see `BotInfo` for more information. Changed files that have already been imported
+    are reloaded the next time they're used.
+    
+    Returns whether anything changed."""
+    global all_bots, _file_records
+    
+    with _bot_lock:
+        changed = False
+        records = {}
+        
+        for full_path, module_name in _list_bot_files():
+            try:
+                stat = os.stat(full_path)
+                
+                record = _file_records.get(full_path)
+                if record is not None and record["signature"] == (stat.st_mtime_ns, stat.st_size):
+                    records[full_path] = record
                     continue
+                
+                file_hash = _hash_file(full_path)
+            except OSError:
+                # The file was deleted partway through refreshing.
+                continue
+            
+            if record is not None and record["hash"] == file_hash:
+                # The file was saved, but nothing in it changed.
+                record["signature"] = (stat.st_mtime_ns, stat.st_size)
+                records[full_path] = record
+                continue
+            
+            changed = True
+            
+            if full_path in _module_files:
+                _stale_modules.add(full_path)
+            
+            bots = _find_bots(full_path, module_name)
+            
+            if bots is None:
+                # Files with errors are always looked at again, in case the error came from another file.
+                records[full_path] = {"signature": None, "hash": None, "bots": []}
             else:
-                module_name = f"{filtered_root}.{path.removesuffix('.py')}"
-                try:
-                    module = importlib.import_module(module_name)
-                except Exception as e:
-                    # Catch any errors that occur when loading the file and print them.
-                    print(f"{type(e).__name__} raised when loading \"{full_path}\" for finding chess bots: {e}")
-                    continue
-                globals()[module_name] = module
-            
-            for obj in module.__dict__.values():
-                try:
-                    # issubclass won't work properly if this file is run directly, so it must be imported.
-                    # When run directly the import causes the ChessBot class in the imported file to be
-                    # different internally from the one in this file, so issubclass will always return False.
-                    # This can be solved by importing the this file instead, in which case everything will
-                    # work as expected.
-                    if issubclass(obj, ChessBot):
-                        all_bots[obj.name.lower()] = obj
-                        bot_modules[obj.name.lower()] = module
-                        _module_files[full_path] = module
-                except TypeError: # If the object is not a class then issubclass will raise a TypeError.
-                    pass
-    
-    # `sorted` returns a list of tuples, so convert it back to a dictionary.
-    all_bots = dict(sorted(all_bots.items(), key=lambda x: x[0]))
+                records[full_path] = {"signature": (stat.st_mtime_ns, stat.st_size), "hash": file_hash, "bots": bots}
+        
+        for full_path in _file_records.keys() - records.keys():
+            # The file was deleted, so forget the module.
+            changed = True
+            module = _module_files.pop(full_path, None)
+            _stale_modules.discard(full_path)
+            
+            if module is not None:
+                sys.modules.pop(module.__name__, None)
+                globals().pop(module.__name__, None)
+        
+        _file_records = records
+        
+        new_bots = {}
+        
+        for record in records.values():
+            for bot in record["bots"]:
+                new_bots[bot.name.lower()] = bot
+        
+        bot_modules.clear()
+        
+        for name, bot in new_bots.items():
+            if bot._bot_class is not None:
+                bot_modules[name] = _module_files[bot.path]
+        
+        # `sorted` returns a list of tuples, so convert it back to a dictionary.
+        all_bots = dict(sorted(new_bots.items(), key=lambda x: x[0]))
+        
+        return changed
+
+def start_bot_watcher(
+        interval: float = 1.0,
+        callback: typing.Callable[[], None] | None = None
+    ) -> None:
+    """Starts a background thread that refreshes the bots whenever a bot file is added, changed, or deleted.
+
+    Args:
+        interval (float, optional): How often to check the files, in seconds. Defaults to 1.0.
+        callback (typing.Callable[[], None] | None, optional): Called after every refresh that changed something. This gets called
+            from the watcher's thread, so GUIs should use it to schedule updating the bot lists rather than doing it directly. Defaults to None.
+    """
+    global _bot_watcher
+    
+    stop_bot_watcher()
+    
+    stop_event = threading.Event()
+    
+    def watch():
+        while not stop_event.wait(interval):
+            try:
+                changed = refresh_bots()
+            except Exception as e:
+                print(f"{type(e).__name__} raised when refreshing the bots: {e}")
+                continue
+            
+            if changed and callback is not None:
+                callback()
+    
+    thread = threading.Thread(target=watch, name="bot_watcher", daemon=True)
+    thread.start()
+    
+    _bot_watcher = (thread, stop_event)
+
+def stop_bot_watcher() -> None:
+    """Stops the bot watcher if it's running."""
+    global _bot_watcher
+    
+    if _bot_watcher is None:
+        return
+    
+    thread, stop_event = _bot_watcher
+    stop_event.set()
+    
+    if thread is not threading.current_thread():
+        thread.join()
+    
+    _bot_watcher = None
 
 # When the module is loaded, even as an import, refresh the bots.            
 refresh_bots()
 
 if __name__ == "__main__":
-    raise RuntimeError("This module is not meant to be run directly, as the all_bots dictionary will not be populated correctly.")
\ No newline at end of file
+    raise RuntimeError("This module is not meant to be run directly, as the all_bots dictionary will not be populated correctly.")
@@ -0,0 +1,294 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+import chess
+
+import base
+import instrumentation
+
+POSITIONS_PATH = os.path.join("data", "benchmark_positions.json")
+
+def load_positions(
+        path: str = POSITIONS_PATH,
+        categories: list[str] | None = None
+    ) -> tuple[int, dict[str, list[chess.Board]]]:
+    """Loads the benchmark positions, returning the version of the position set and the boards in each category.
+    If `categories` is given only those categories are loaded."""
+    with open(path, "r", encoding="utf-8") as file_read:
+        data = json.load(file_read)
+
+    positions = {}
+
+    for category, fens in data["positions"].items():
+        if categories is not None and category not in categories:
+            continue
+
+        positions[category] = [chess.Board(fen) for fen in fens]
+
+    return data["version"], positions
+
+def _summarize(
+        samples: list[dict],
+        nodes: int | None
+    ) -> dict:
+    """Summarizes the turn samples from one bot, with the nodes it searched if it counts them."""
+    wall = instrumentation.describe([sample["wall"] for sample in samples])
+    cpu = instrumentation.describe([sample["cpu"] for sample in samples])
+
+    return {
+        "moves": len(samples),
+        "time": wall["total"],
+        "cpu": cpu["total"],
+        "median": wall["p50"],
+        "p95": wall["p95"],
+        "moves_per_second": len(samples) / wall["total"] if wall["total"] else None,
+        "nodes": nodes,
+        "nodes_per_second": nodes / wall["total"] if nodes is not None and wall["total"] else None
+    }
+
+def benchmark_bot(
+        bot: base.ChessBot,
+        positions: dict[str, list[chess.Board]],
+        *, # This means the following arguments must be passed as keyword arguments.
+        warmup: int = 1,
+        repeats: int = 3,
+        seed: int = 0
+    ) -> dict:
+    """Times a bot's `turn` method on every position.
+
+    Each position gets a new bot, which is given `warmup` turns that aren't timed, followed by `repeats` timed turns.
+    If the bot has a `nodes` attribute it is set to 0 before each timed turn and read afterwards, which is used for the nodes per second.
+
+    Args:
+        bot (base.ChessBot): The bot to benchmark.
+        positions (dict[str, list[chess.Board]]): The positions in each category, as returned by `load_positions`.
+        warmup (int, optional): The number of untimed turns on each position. Defaults to 1.
+        repeats (int, optional): The number of timed turns on each position. Defaults to 3.
+        seed (int, optional): The seed for the `random` module, so bots that use randomness play the same moves every time. Defaults to 0.
+
+    Returns:
+        dict: The results for each category, and for all of them together under "total".
+    """
+    random.seed(seed)
+
+    results = {}
+    all_samples = []
+    all_nodes = 0
+
+    for category, boards in positions.items():
+        samples = []
+        nodes = 0
+
+        for board in boards:
+            data = {}
+            bot_obj = bot(data) # type: base.ChessBot
+
+            for _ in range(warmup):
+                bot_obj.load(data)
+                bot_obj.turn(board.copy())
+                bot_obj.save()
+
+            for _ in range(repeats):
+                if hasattr(bot_obj, "nodes"):
+                    bot_obj.nodes = 0
+
+                bot_obj.load(data)
+                instrumentation.measure(samples, bot.name, "turn", board, bot_obj.turn, board.copy())
+                bot_obj.save()
+
+                if nodes is not None and hasattr(bot_obj, "nodes"):
+                    nodes += bot_obj.nodes
+                else:
+                    nodes = None
+
+        results[category] = _summarize(samples, nodes)
+
+        all_samples.extend(samples)
+        all_nodes = None if all_nodes is None or nodes is None else all_nodes + nodes
+
+    results["total"] = _summarize(all_samples, all_nodes)
+
+    return results
+
+def run_benchmark(
+        bot_names: list[str],
+        *, # This means the following arguments must be passed as keyword arguments.
+        positions_path: str = POSITIONS_PATH,
+        categories: list[str] | None = None,
+        warmup: int = 1,
+        repeats: int = 3,
+        seed: int = 0
+    ) -> dict:
+    """Benchmarks each of the given bots, see `benchmark_bot` for more information.
+    Returns the results of every bot under "bots", alongside the settings used, which is what gets saved as a baseline."""
+    version, positions = load_positions(positions_path, categories)
+
+    results = {
+        "version": version,
+        "warmup": warmup,
+        "repeats": repeats,
+        "seed": seed,
+        "bots": {}
+    }
+
+    for name in bot_names:
+        bot = base.get_bot(name)
+
+        print(f"Benchmarking {bot.name}...")
+
+        results["bots"][bot.name] = benchmark_bot(
+            bot = bot,
+            positions = positions,
+            warmup = warmup,
+            repeats = repeats,
+            seed = seed
+        )
+
+    return results
+
+def _baseline_stats(
+        baseline: dict,
+        name: str,
+        category: str,
+        categories: dict
+    ) -> dict | None:
+    """Returns the baseline results of a bot in a category, or None if there's nothing to compare against.
+    The totals are only compared if both were made from the same categories."""
+    previous = baseline["bots"].get(name, {})
+
+    if category == "total" and previous.keys() != categories.keys():
+        return None
+
+    if category not in previous or not previous[category]["median"]:
+        return None
+
+    return previous[category]
+
+def compare_results(
+        results: dict,
+        baseline: dict,
+        threshold: float = 0.1
+    ) -> list[str]:
+    """Compares the median move time of every bot and category against a baseline.
+    Returns a line for every one that got slower by more than `threshold`, so 0.1 allows 10% slower.
+
+    If the baseline was made with a different version of the positions a ValueError is raised, as the times can't be compared."""
+    if results["version"] != baseline["version"]:
+        raise ValueError(f"The baseline uses version {baseline['version']} of the positions, but these results use version {results['version']}.")
+
+    slowdowns = []
+
+    for name, categories in results["bots"].items():
+        if name not in baseline["bots"]:
+            continue
+
+        for category, current in categories.items():
+            previous = _baseline_stats(baseline, name, category, categories)
+
+            if previous is None:
+                continue
+
+            change = current["median"] / previous["median"] - 1
+
+            if change > threshold:
+                slowdowns.append(f"{name} {category}: {previous['median'] * 1000:.2f}ms -> {current['median'] * 1000:.2f}ms per move ({change:+.1%})")
+
+    return slowdowns
+
+def format_results(
+        results: dict,
+        baseline: dict | None = None
+    ) -> list[str]:
+    """Returns the lines of a table of the results. If a baseline is given, the change in median move time is included."""
+    name_width = max([len(name) for name in results["bots"]] + [len("Bot")])
+
+    columns = ["Moves", "Median ms", "p95 ms", "Moves/s", "Nodes/s"]
+    if baseline is not None:
+        columns.append("Change")
+
+    header = " ".join(["Bot".ljust(name_width), "Category".ljust(10), *[column.rjust(10) for column in columns]])
+    lines = [header, "-" * len(header)]
+
+    for name, categories in results["bots"].items():
+        for category, stats in categories.items():
+            row = [
+                name.ljust(name_width),
+                category.ljust(10),
+                str(stats["moves"]).rjust(10),
+                f"{stats['median'] * 1000:.2f}".rjust(10),
+                f"{stats['p95'] * 1000:.2f}".rjust(10),
+                ("-" if stats["moves_per_second"] is None else f"{stats['moves_per_second']:.1f}").rjust(10),
+                ("-" if stats["nodes_per_second"] is None else f"{stats['nodes_per_second']:.0f}").rjust(10)
+            ]
+
+            if baseline is not None:
+                previous = _baseline_stats(baseline, name, category, categories)
+
+                if previous is None:
+                    row.append("-".rjust(10))
+                else:
+                    row.append(f"{stats['median'] / previous['median'] - 1:+.1%}".rjust(10))
+
+            lines.append(" ".join(row))
+
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the Chess bots on a fixed set of positions, and compares the times against a baseline.")
+    parser.add_argument("bots", nargs="+", help="The names of the bots to benchmark. Use `all` for every bot.")
+    parser.add_argument("-w", "--warmup", type=int, default=1, help="The number of untimed turns on each position.")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="The number of timed turns on each position.")
+    parser.add_argument("-c", "--categories", nargs="+", default=None, help="Only use positions from these categories.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed for bots that use randomness.")
+    parser.add_argument("--positions", default=POSITIONS_PATH, help="The file to load the positions from.")
+    parser.add_argument("--save", default=None, help="Save the results to this file, to be used as a baseline later.")
+    parser.add_argument("--compare", default=None, help="A baseline file to compare the results against.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="How much slower than the baseline a bot can get before being flagged, 0.1 is 10%%.")
+    arguments = parser.parse_args()
+
+    if arguments.bots == ["all"]:
+        bot_names = list(base.all_bots.keys())
+    else:
+        bot_names = arguments.bots
+
+    baseline = None
+    if arguments.compare is not None:
+        with open(arguments.compare, "r", encoding="utf-8") as file_read:
+            baseline = json.load(file_read)
+
+    results = run_benchmark(
+        bot_names = bot_names,
+        positions_path = arguments.positions,
+        categories = arguments.categories,
+        warmup = arguments.warmup,
+        repeats = arguments.repeats,
+        seed = arguments.seed
+    )
+
+    print()
+    for line in format_results(results, baseline):
+        print(line)
+
+    if arguments.save is not None:
+        with open(arguments.save, "w", encoding="utf-8") as file_write:
+            json.dump(results, file_write, indent=4)
+
+        print(f"\nSaved the results to {arguments.save}.")
+
+    if baseline is not None:
+        slowdowns = compare_results(results, baseline, arguments.threshold)
+
+        if len(slowdowns) == 0:
+            print(f"\nNo bot got more than {arguments.threshold:.0%} slower than the baseline.")
+        else:
+            print(f"\n{len(slowdowns)} slowdown(s) of more than {arguments.threshold:.0%} compared to the baseline:")
+            for line in slowdowns:
+                print(line)
+
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
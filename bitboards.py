@@ -0,0 +1,364 @@
+import math
+import random
+import timeit
+import typing
+
+import chess
+
+# Bitboard utilities shared between the bots, so each bot doesn't need its own copy.
+# Every table is indexed by square, and the ones that depend on the side are indexed by color first, like `PASSED_PAWN_MASKS[chess.WHITE][square]`.
+
+FILE_MASKS = [chess.BB_FILES[chess.square_file(square)] for square in chess.SQUARES]
+RANK_MASKS = [chess.BB_RANKS[chess.square_rank(square)] for square in chess.SQUARES]
+
+# The files next to the square's file, not including the file itself.
+ADJACENT_FILE_MASKS = [
+    (chess.BB_FILES[chess.square_file(square) - 1] if chess.square_file(square) > 0 else chess.BB_EMPTY)
+    | (chess.BB_FILES[chess.square_file(square) + 1] if chess.square_file(square) < 7 else chess.BB_EMPTY)
+    for square in chess.SQUARES
+]
+
+def _ranks_ahead(
+        square: chess.Square,
+        color: chess.Color
+    ) -> chess.Bitboard:
+    """Returns a bitboard of every rank in front of the square from the given side's point of view."""
+    rank = chess.square_rank(square)
+    ranks = range(rank + 1, 8) if color == chess.WHITE else range(rank)
+
+    mask = chess.BB_EMPTY
+    for ahead in ranks:
+        mask |= chess.BB_RANKS[ahead]
+
+    return mask
+
+# The squares in front of a pawn on its own file.
+PAWN_FRONT_SPANS = [
+    [FILE_MASKS[square] & _ranks_ahead(square, color) for square in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+# The squares in front of a pawn on the files next to it, which are the squares it could attack as it moves forward.
+PAWN_ATTACK_SPANS = [
+    [ADJACENT_FILE_MASKS[square] & _ranks_ahead(square, color) for square in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+# A pawn is passed if there are no opposing pawns in these squares.
+PASSED_PAWN_MASKS = [
+    [PAWN_FRONT_SPANS[color][square] | PAWN_ATTACK_SPANS[color][square] for square in chess.SQUARES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+# The squares around a king on the square, including the square itself.
+KING_ZONES = [chess.BB_KING_ATTACKS[square] | chess.BB_SQUARES[square] for square in chess.SQUARES]
+
+# The distance between every pair of squares, in squares. Chebyshev is the number of king moves, and Manhattan is the number of rook moves on an empty board if each move only went one square.
+EUCLIDEAN_DISTANCES = [
+    [math.dist((chess.square_file(a), chess.square_rank(a)), (chess.square_file(b), chess.square_rank(b))) for b in chess.SQUARES]
+    for a in chess.SQUARES
+]
+CHEBYSHEV_DISTANCES = [[chess.square_distance(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+MANHATTAN_DISTANCES = [[chess.square_manhattan_distance(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+
+#############################################################################################################
+#############################################################################################################
+#############################################################################################################
+
+def lsb(bitboard: chess.Bitboard) -> chess.Square:
+    """Returns the lowest square in a bitboard. The bitboard can't be empty."""
+    return (bitboard & -bitboard).bit_length() - 1
+
+def msb(bitboard: chess.Bitboard) -> chess.Square:
+    """Returns the highest square in a bitboard. The bitboard can't be empty."""
+    return bitboard.bit_length() - 1
+
+def scan(bitboard: chess.Bitboard) -> typing.Generator[chess.Square, None, None]:
+    """Yields every square in a bitboard, from lowest to highest."""
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+def squares(bitboard: chess.Bitboard) -> list[chess.Square]:
+    """Returns a list of every square in a bitboard, from lowest to highest. This is a little quicker than `scan` when every square is needed."""
+    out = []
+
+    while bitboard:
+        lowest = bitboard & -bitboard
+        out.append(lowest.bit_length() - 1)
+        bitboard ^= lowest
+
+    return out
+
+def attacked_squares(
+        board: chess.Board,
+        color: chess.Color,
+        mask: chess.Bitboard = chess.BB_ALL
+    ) -> chess.Bitboard:
+    """Returns a bitboard of the squares attacked by the pieces of the given side that are in `mask`."""
+    total = chess.BB_EMPTY
+    attacks_mask = board.attacks_mask
+
+    for square in squares(board.occupied_co[color] & mask):
+        total |= attacks_mask(square)
+
+    return total
+
+def defended_pieces(
+        board: chess.Board,
+        color: chess.Color
+    ) -> chess.Bitboard:
+    """Returns a bitboard of the pieces of the given side that are defended by another piece of that side."""
+    return board.occupied_co[color] & attacked_squares(board, color)
+
+def undefended_pieces(
+        board: chess.Board,
+        color: chess.Color
+    ) -> chess.Bitboard:
+    """Returns a bitboard of the pieces of the given side that aren't defended by another piece of that side."""
+    return board.occupied_co[color] & ~attacked_squares(board, color)
+
+def hanging_pieces(
+        board: chess.Board,
+        color: chess.Color
+    ) -> chess.Bitboard:
+    """Returns a bitboard of the undefended pieces of the given side that the other side attacks."""
+    return undefended_pieces(board, color) & attacked_squares(board, not color)
+
+def is_passed_pawn(
+        board: chess.Board,
+        square: chess.Square,
+        color: chess.Color
+    ) -> bool:
+    """Returns a boolean for whether a pawn of the given side on the given square is a passed pawn."""
+    return not board.pawns & board.occupied_co[not color] & PASSED_PAWN_MASKS[color][square]
+
+def passed_pawns(
+        board: chess.Board,
+        color: chess.Color
+    ) -> chess.Bitboard:
+    """Returns a bitboard of the passed pawns of the given side."""
+    out = chess.BB_EMPTY
+    opposing_pawns = board.pawns & board.occupied_co[not color]
+    masks = PASSED_PAWN_MASKS[color]
+
+    for square in squares(board.pawns & board.occupied_co[color]):
+        if not opposing_pawns & masks[square]:
+            out |= chess.BB_SQUARES[square]
+
+    return out
+
+class DistanceSum():
+    """The sum of the distances from one side's pieces to a target square, like the other side's king, with each distance weighted by the piece type.
+
+    The sum is worked out once for a position, and `after_move` gives the sum after any legal move by only
+    changing the pieces the move affects, instead of going over every piece again for every move.
+    Distances shorter than `cap` count as `cap`, and piece types that aren't in `weights` are ignored."""
+    def __init__(
+            self: typing.Self,
+            board: chess.Board,
+            color: chess.Color,
+            target: chess.Square,
+            weights: dict[chess.PieceType, float],
+            cap: float = 0.0,
+            table: list[list[float]] = EUCLIDEAN_DISTANCES
+        ) -> None:
+        self.color = color
+        self.target = target
+        self.weights = [weights.get(piece_type, 0) for piece_type in range(7)] # Index 0 is unused, as there's no piece type 0.
+        self.cap = cap
+        self.table = table
+
+        self.distance_total, self.weight_total = self.totals(board, target)
+
+    def contribution(
+            self: typing.Self,
+            square: chess.Square,
+            piece_type: chess.PieceType,
+            target: chess.Square | None = None
+        ) -> float:
+        """Returns the weighted distance of a piece on the given square."""
+        return max(self.table[square][self.target if target is None else target], self.cap) * self.weights[piece_type]
+
+    def totals(
+            self: typing.Self,
+            board: chess.Board,
+            target: chess.Square
+        ) -> tuple[float, float]:
+        """Returns the weighted distance and total weight of the side's pieces on the board, going over every piece."""
+        distance_total = 0
+        weight_total = 0
+
+        for piece_type in chess.PIECE_TYPES:
+            weight = self.weights[piece_type]
+
+            if not weight:
+                continue
+
+            for square in squares(board.pieces_mask(piece_type, self.color)):
+                distance_total += self.contribution(square, piece_type, target)
+                weight_total += weight
+
+        return distance_total, weight_total
+
+    def after_move(
+            self: typing.Self,
+            board: chess.Board,
+            move: chess.Move
+        ) -> tuple[float, float]:
+        """Returns the weighted distance and total weight after the given move is played on the board.
+        The board should be the position the sum was made from, and is left unchanged."""
+        # Moving the target, or moving two pieces at once, is rare enough to just go over every piece again.
+        if move.from_square == self.target or board.is_castling(move):
+            board.push(move)
+
+            if move.from_square == self.target:
+                out = self.totals(board, move.to_square)
+            else:
+                out = self.totals(board, self.target)
+
+            board.pop()
+            return out
+
+        distance_total = self.distance_total
+        weight_total = self.weight_total
+
+        if board.turn == self.color:
+            # One of the side's pieces is moving, and might be promoting.
+            piece_type = board.piece_type_at(move.from_square)
+            new_type = move.promotion or piece_type
+
+            distance_total += self.contribution(move.to_square, new_type) - self.contribution(move.from_square, piece_type)
+            weight_total += self.weights[new_type] - self.weights[piece_type]
+        else:
+            # The other side is moving, and might be capturing one of the side's pieces.
+            if board.is_en_passant(move):
+                captured = move.to_square - 8 if board.turn == chess.WHITE else move.to_square + 8
+            else:
+                captured = move.to_square
+
+            if board.color_at(captured) == self.color:
+                piece_type = board.piece_type_at(captured)
+
+                distance_total -= self.contribution(captured, piece_type)
+                weight_total -= self.weights[piece_type]
+
+        return distance_total, weight_total
+
+#############################################################################################################
+#############################################################################################################
+#############################################################################################################
+
+def _benchmark_positions(amount: int = 200) -> list[chess.Board]:
+    """Returns positions from random games, always the same ones."""
+    generator = random.Random(0)
+    boards = []
+
+    while len(boards) < amount:
+        board = chess.Board()
+
+        for _ in range(generator.randrange(10, 80)):
+            moves = list(board.legal_moves)
+            if len(moves) == 0:
+                break
+
+            board.push(generator.choice(moves))
+
+        boards.append(board)
+
+    return boards
+
+# Copies of the functions the bots had before they used this module, from `colonthree.py` and `owobot_v3.py`, for `main` to compare against.
+# The bots call this module now, so timing their methods would only time this module again.
+
+def _reference_scan(bitboard: chess.Bitboard) -> typing.Generator[int, None, None]:
+    """`owobot_v3`'s old `iterate_through_bitboard`."""
+    while bitboard:
+        b = bitboard & (~bitboard + 1)
+        yield int(math.log2(b))
+        bitboard ^= b
+
+def _reference_attacked_squares(
+        board: chess.Board,
+        side: chess.Color
+    ) -> chess.Bitboard:
+    """`colonthree`'s old `get_attacked_squares`."""
+    total = chess.BB_EMPTY
+
+    for square in board.piece_map(mask=board.occupied_co[side]):
+        total |= int(board.attacks(square))
+
+    return total
+
+def _reference_hanging_pieces(
+        board: chess.Board,
+        side: chess.Color
+    ) -> chess.Bitboard:
+    """`colonthree`'s old `get_hanging_pieces`, with `get_undefended_pieces` in it."""
+    undefended = board.occupied_co[side] - (board.occupied_co[side] & _reference_attacked_squares(board, side))
+    return undefended & _reference_attacked_squares(board, not side)
+
+def _reference_is_passed_pawn(
+        board: chess.Board,
+        square: chess.Square,
+        side: chess.Color
+    ) -> bool:
+    """`colonthree`'s old `is_passed_pawn`."""
+    cover_bitboard = 0
+
+    pawn_file = chess.square_file(square)
+
+    cover_bitboard |= chess.BB_FILES[pawn_file]
+
+    if pawn_file != 0:
+        cover_bitboard |= chess.BB_FILES[pawn_file - 1]
+    if pawn_file != 7:
+        cover_bitboard |= chess.BB_FILES[pawn_file + 1]
+
+    if side == chess.WHITE:
+        cover_bitboard <<= 8 * (chess.square_rank(square) + 1)
+    else:
+        cover_bitboard >>= 8 * (8 - chess.square_rank(square))
+
+    return not bool(board.pawns & board.occupied_co[not side] & cover_bitboard)
+
+def _reference_passed_pawns(
+        board: chess.Board,
+        side: chess.Color
+    ) -> chess.Bitboard:
+    """`colonthree`'s old `find_passed_pawns`."""
+    result = 0
+
+    for pawn in board.pieces(chess.PAWN, side):
+        if _reference_is_passed_pawn(board, pawn, side):
+            result |= chess.BB_SQUARES[pawn]
+
+    return result
+
+def main():
+    """Times the functions in this module against the copies the bots had before they used it, and checks that both give the same results."""
+    boards = _benchmark_positions()
+
+    comparisons = [
+        ("Bitboard iteration", lambda board: list(_reference_scan(board.occupied)), lambda board: list(scan(board.occupied))),
+        ("Attacked squares", lambda board: _reference_attacked_squares(board, chess.WHITE), lambda board: attacked_squares(board, chess.WHITE)),
+        ("Hanging pieces", lambda board: _reference_hanging_pieces(board, chess.WHITE), lambda board: hanging_pieces(board, chess.WHITE)),
+        ("Passed pawns", lambda board: _reference_passed_pawns(board, chess.WHITE), lambda board: passed_pawns(board, chess.WHITE))
+    ]
+
+    print(f"Microseconds per position, best of 5, over {len(boards)} positions.\n")
+    print(f"{'Function'.ljust(20)} {'Old bots'.rjust(10)} {'bitboards'.rjust(10)} {'Speedup'.rjust(10)}")
+
+    for name, reference_function, module_function in comparisons:
+        for board in boards:
+            if reference_function(board) != module_function(board):
+                raise AssertionError(f"{name} gives a different result than the old version for {board.fen()}")
+
+        reference_time = min(timeit.repeat(lambda: [reference_function(board) for board in boards], number=10, repeat=5)) / 10 / len(boards) * 1e6
+        module_time = min(timeit.repeat(lambda: [module_function(board) for board in boards], number=10, repeat=5)) / 10 / len(boards) * 1e6
+
+        print(f"{name.ljust(20)} {reference_time:10.2f} {module_time:10.2f} {reference_time / module_time:9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -376,6 +376,16 @@ class ChessApp(parent_class):
                 
                 custom_start = self.custom_start_san.get()
             
+        time_control = None
+        if len(self.time_control.get().strip()) != 0:
+            try:
+                time_control = base.TimeControl.from_string(self.time_control.get().strip())
+            except ValueError:
+                messagebox.showerror(
+                    title = "Chess match",
+                    message = "The entered time control should be like `60+0.5` for a 60 second clock with a 0.5 second increment, or `0.5` for 0.5 seconds per move."
+                )
+                return None
             
         bot1 = base.get_bot(self.bot_1.name)
         bot2 = base.get_bot(self.bot_2.name)
@@ -389,7 +399,8 @@ class ChessApp(parent_class):
             white = bot1,
             black = bot2,
             variate_starting_position = self.random_start,
-            custom_start_san = custom_start
+            custom_start_san = custom_start,
+            time_control = time_control
         )
         
         end_time = time.time()
@@ -425,6 +436,30 @@ class ChessApp(parent_class):
             )
             return None
         
+        sprt = None
+        if len(self.sprt_bounds.get().strip()) != 0:
+            try:
+                elo0, elo1 = map(float, self.sprt_bounds.get().split(","))
+            except ValueError:
+                messagebox.showerror(
+                    title = "Bulk game",
+                    message = "The entered SPRT Elo bounds should be two numbers separated by a comma, like `0, 10`."
+                )
+                return None
+            
+            sprt = (elo0, elo1)
+        
+        time_control = None
+        if len(self.time_control.get().strip()) != 0:
+            try:
+                time_control = base.TimeControl.from_string(self.time_control.get().strip())
+            except ValueError:
+                messagebox.showerror(
+                    title = "Bulk game",
+                    message = "The entered time control should be like `60+0.5` for a 60 second clock with a 0.5 second increment, or `0.5` for 0.5 seconds per move."
+                )
+                return None
+        
         if bot1 == bot2:
             if not messagebox.askokcancel(
                 title = "Bulk Game",
@@ -438,18 +473,31 @@ class ChessApp(parent_class):
             amount = amount,
             variate_starting_positions = self.random_start,
             seeded_positions = True,
-            fancy_formatting = False # The fancy formatting is disabled here due to not really working properly.
+            fancy_formatting = False, # The fancy formatting is disabled here due to not really working properly.
+            parallel = self.parallel_bulk,
+            sprt = sprt,
+            time_control = time_control
         )
         
         print(result)
         
+        # An SPRT can stop the games before all of them have been played.
+        played = result[bot1.name] + result[bot2.name] + result["draw"]
+        
         lines = [
-            f"Results from {amount} Chess games:",
-            f"{bot1.name}: {result[bot1.name]} ({round(result[bot1.name] / amount * 100, 2)}%)",
-            f"{bot2.name}: {result[bot2.name]} ({round(result[bot2.name] / amount * 100, 2)}%)",
-            f"Draws: {result['draw']} ({round(result['draw'] / amount * 100, 2)}%)"
+            f"Results from {played} Chess games:",
+            f"{bot1.name}: {result[bot1.name]} ({round(result[bot1.name] / played * 100, 2)}%)",
+            f"{bot2.name}: {result[bot2.name]} ({round(result[bot2.name] / played * 100, 2)}%)",
+            f"Draws: {result['draw']} ({round(result['draw'] / played * 100, 2)}%)"
         ]
         
+        if sprt is not None:
+            lines.extend([
+                f"SPRT [{sprt[0]}, {sprt[1]}]: {result['sprt']['result']}",
+                f"LLR: {round(result['sprt']['llr'], 2)}, Elo: {round(result['sprt']['elo'], 1)} +/- {round(result['sprt']['elo_margin'], 1)}",
+                f"Games saved: {result['sprt']['games_saved']}"
+            ])
+        
         max_length = len(max(lines, key=len))
         
         print("#" * (max_length + 4))
@@ -568,6 +616,24 @@ class ChessApp(parent_class):
                 variable_name = "bulk_amount",
                 default = "1000"
             ),
+            EntrySetting(
+                app = self,
+                identifier = "sprt_entry",
+                label = "SPRT Elo bounds (optional):",
+                variable_name = "sprt_bounds"
+            ),
+            EntrySetting(
+                app = self,
+                identifier = "time_control_entry",
+                label = "Time control (optional):",
+                variable_name = "time_control"
+            ),
+            CheckboxSetting(
+                app = self,
+                identifier = "parallel_bulk_tickbox",
+                label = "Run bulk games in parallel?",
+                variable_name = "parallel_bulk"
+            ),
             SettingButton(
                 app = self,
                 identifier = "run_button",
@@ -641,8 +707,8 @@ def main():
         
     print = custom_print
     base.print = custom_print
-    for module in base.bot_modules.values():
-        module.print = custom_print
+    # Bots are imported when they're first used, so this also needs to happen to the ones imported later.
+    base.add_module_load_hook(lambda module: setattr(module, "print", custom_print))
         
     chess_app.mainloop()
 
@@ -1,10 +1,10 @@
 import typing
 import chess
-import math
 import random
 import copy
 
 import base
+import bitboards
 
 class BrokenCloset(base.ChessBot):
     name = "brokencloset"
@@ -64,7 +64,7 @@ class BrokenCloset(base.ChessBot):
         if thisBoard.king(thisBoard.turn) == None or thisBoard.king(not thisBoard.turn) == None:
             # print("A king is missing.")
             return 0
-        pieceDist = math.dist(self.helper_numToSquare(thisBoard.king(thisBoard.turn)),self.helper_numToSquare(thisBoard.king(not thisBoard.turn)))
+        pieceDist = bitboards.EUCLIDEAN_DISTANCES[thisBoard.king(thisBoard.turn)][thisBoard.king(not thisBoard.turn)]
         if pieceDist < (self.BC_DIST_CAP): # Replace 13**0.5 with the highest distance you want to matter.
             return self.BC_DIST_CAP
         else:
@@ -2,9 +2,9 @@ import typing
 import chess
 import copy
 import random
-import math
 
 import base
+import bitboards
 
 class CCPBot(base.ChessBot):
     name = "ccpbot"
@@ -73,10 +73,17 @@ class CCPBot(base.ChessBot):
 
         moveDict = {}
 
+        # The distances are worked out once, and then only the piece that moves is updated for each move.
+        distances = bitboards.DistanceSum(
+            board = board,
+            color = board.turn,
+            target = board.king(not board.turn),
+            weights = dict(zip(chess.PIECE_TYPES, self.CCP_PIECE_VALUES)),
+            cap = self.CCP_DIST_CAP
+        )
+
         for move in board.legal_moves:
-            board_copy.push(move) 
-            moveDict[move] = self.rateDistFromKing(board_copy, board.turn)
-            board_copy.pop()
+            moveDict[move] = self.rateDistFromKing(distances, board, move)
 
         return min(moveDict, key=moveDict.get)
             
@@ -89,24 +96,12 @@ class CCPBot(base.ChessBot):
             return None       
         return [(boardNum // 8)+1,boardNum % 8+1]
 
-    def rateDistFromKing(self, thisBoard, color):
+    def rateDistFromKing(self, distances, thisBoard, move):
         # For now, all pieces' distance from the king will be judged.
         # It should be fairly easy to adjust this so that a piece type is ignored later.
+        # Distances closer than CCP_DIST_CAP count as CCP_DIST_CAP, and each distance is weighted by the piece value.
 
-        thisBoard.turn = color
-        sumDist = 0
-        totalPieces = 0
-        for piece in chess.PIECE_TYPES:
-            # if piece == chess.KING:
-                # continue
-            listPieces = list(thisBoard.pieces(piece, thisBoard.turn))
-            for item in listPieces:
-                rawDist = math.dist(self.helper_numToSquare(item),self.helper_numToSquare(thisBoard.king(not thisBoard.turn)))
-                if rawDist <= self.CCP_DIST_CAP:
-                    sumDist += (self.CCP_DIST_CAP) * self.getPieceValue(thisBoard, item)
-                else:
-                    sumDist += rawDist * self.getPieceValue(thisBoard, item)
-                totalPieces += 1 * self.getPieceValue(thisBoard, item)
+        sumDist, totalPieces = distances.after_move(thisBoard, move)
         if totalPieces == 0:
             # Should only fire if the king is the only piece.
             return 0
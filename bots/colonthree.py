@@ -5,6 +5,119 @@ import copy
 import random
 
 import base
+import bitboards
+
+class MateSearch():
+    """Finds short forced mates, remembering the result for every position it has searched.
+    The results only depend on the position, so one search can be kept for a whole game."""
+    
+    # Once this many positions are stored the cache is cleared, to keep the memory use bounded.
+    MAX_CACHE_SIZE = 1 << 18
+    
+    def __init__(self: typing.Self) -> None:
+        self.mate_in_one_cache = {} # type: dict[tuple, bool]
+        self.mate_in_two_cache = {} # type: dict[tuple, bool]
+    
+    def position_key(
+            self: typing.Self,
+            board: chess.Board
+        ) -> tuple:
+        """Returns a key for the position on the board, including the side to move, castling rights, and en passant square."""
+        # A lot faster than a Zobrist hash, see `base.position_key`.
+        return base.position_key(board)
+    
+    def store(
+            self: typing.Self,
+            cache: dict[tuple, bool],
+            key: tuple,
+            result: bool
+        ) -> bool:
+        """Stores a result in the given cache and returns it."""
+        if len(cache) >= self.MAX_CACHE_SIZE:
+            cache.clear()
+        
+        cache[key] = result
+        return result
+    
+    def checking_moves(
+            self: typing.Self,
+            board: chess.Board
+        ) -> typing.Generator[chess.Move, None, None]:
+        """Yields the legal moves for the side to move that might give check.
+        Every move that gives check is yielded, but some of the yielded moves might not give check."""
+        king = board.king(not board.turn)
+        
+        if king is None:
+            yield from board.generate_legal_moves()
+            return
+        
+        occupied = board.occupied
+        diagonal = chess.BB_DIAG_ATTACKS[king][chess.BB_DIAG_MASKS[king] & occupied]
+        straight = chess.BB_RANK_ATTACKS[king][chess.BB_RANK_MASKS[king] & occupied] | chess.BB_FILE_ATTACKS[king][chess.BB_FILE_MASKS[king] & occupied]
+        
+        # The squares a piece of each type has to move to in order to attack the king directly.
+        targets = {
+            chess.PAWN: chess.BB_PAWN_ATTACKS[not board.turn][king],
+            chess.KNIGHT: chess.BB_KNIGHT_ATTACKS[king],
+            chess.BISHOP: diagonal,
+            chess.ROOK: straight,
+            chess.QUEEN: diagonal | straight,
+            chess.KING: chess.BB_EMPTY
+        }
+        
+        # Moving a piece off a line between the king and one of our sliding pieces can give a discovered check.
+        sliders = board.occupied_co[board.turn] & (board.bishops | board.rooks | board.queens)
+        
+        for move in board.generate_legal_moves():
+            if chess.BB_SQUARES[move.to_square] & targets[board.piece_type_at(move.from_square)]:
+                yield move
+            elif chess.BB_RAYS[king][move.from_square] & sliders:
+                yield move
+            elif move.promotion or board.is_castling(move) or board.is_en_passant(move):
+                yield move
+    
+    def mate_in_one(
+            self: typing.Self,
+            board: chess.Board
+        ) -> bool:
+        """Returns a boolean for whether the side to move can checkmate with its next move."""
+        key = self.position_key(board)
+        
+        if key in self.mate_in_one_cache:
+            return self.mate_in_one_cache[key]
+        
+        # A move can only be checkmate if it gives check, so only those moves are played out.
+        for move in self.checking_moves(board):
+            board.push(move)
+            mated = board.is_checkmate()
+            board.pop()
+            
+            if mated:
+                return self.store(self.mate_in_one_cache, key, True)
+        
+        return self.store(self.mate_in_one_cache, key, False)
+    
+    def mated_in_two(
+            self: typing.Self,
+            board: chess.Board
+        ) -> bool:
+        """Returns a boolean for whether every legal move for the side to move allows the other side to checkmate on the next move.
+        This is also True if the side to move has no legal moves."""
+        key = self.position_key(board)
+        
+        if key in self.mate_in_two_cache:
+            return self.mate_in_two_cache[key]
+        
+        for move in board.generate_legal_moves():
+            board.push(move)
+            mated = self.mate_in_one(board)
+            board.pop()
+            
+            # This move escapes, so there's no forced mate.
+            if not mated:
+                return self.store(self.mate_in_two_cache, key, False)
+        
+        return self.store(self.mate_in_two_cache, key, True)
 
 class colon_three(base.ChessBot):
     name = ":3"
@@ -143,6 +256,15 @@ class colon_three(base.ChessBot):
     BLACK_PIECE_TABLE_QUEEN = list(reversed(WHITE_PIECE_TABLE_QUEEN))
     BLACK_PIECE_TABLE_KING_START = list(reversed(WHITE_PIECE_TABLE_KING_START))
     BLACK_PIECE_TABLE_KING_END = list(reversed(WHITE_PIECE_TABLE_KING_END))
+    
+    def __init__(
+            self: typing.Self,
+            database_data: dict
+        ) -> None:
+        # A new bot is made for every game, so the mate search results are kept for the whole game.
+        self.mate_search = MateSearch()
+        
+        super().__init__(database_data)
 
     #######################################################################################################################
     ##### UTILITIES #######################################################################################################
@@ -162,12 +284,7 @@ class colon_three(base.ChessBot):
             side: chess.Color
         ) -> chess.Bitboard:
         """Returns a bitboard of squares attacked by the given side."""
-        total = chess.BB_EMPTY
-
-        for square in board.piece_map(mask=self.get_occupied_bitboard(board, side)):
-            total |= self.get_attacks(board, square)
-
-        return total
+        return bitboards.attacked_squares(board, side)
     
     def get_piece_bitboard(
             self: typing.Self,
@@ -191,7 +308,7 @@ class colon_three(base.ChessBot):
             side: chess.Color
         ) -> chess.Bitboard:
         """Returns a bitboard of all the pieces for the given side that are not defended."""
-        return self.get_occupied_bitboard(board, side) - (self.get_occupied_bitboard(board, side) & self.get_attacked_squares(board, side))
+        return bitboards.undefended_pieces(board, side)
 
     def get_hanging_pieces(
             self: typing.Self,
@@ -199,7 +316,7 @@ class colon_three(base.ChessBot):
             side: chess.Color
         ) -> chess.Bitboard:
         """Returns a bitboard of the pieces for the given side that are attacked by the other side but not defended."""
-        return self.get_undefended_pieces(board, side) & self.get_attacked_squares(board, not side)
+        return bitboards.hanging_pieces(board, side)
     
     def is_passed_pawn(
             self: typing.Self,
@@ -208,30 +325,9 @@ class colon_three(base.ChessBot):
             side: chess.Color
         ) -> bool:
         """Returns a boolean for whether the pawn on the given square is a passed pawn."""
-        cover_bitboard = 0
-        
-        pawn_file = chess.square_file(square)
-        
-        # Get a bitboard covering the file the pawn is on, as well as the files next to it.
-        cover_bitboard |= chess.BB_FILES[pawn_file]
-        
-        if pawn_file != 0:
-            cover_bitboard |= chess.BB_FILES[pawn_file - 1]
-        if pawn_file != 7:
-            cover_bitboard |= chess.BB_FILES[pawn_file + 1]
-        
-        # Shift the bitboard by 8 per row the pawn is away from the end of the board.
-        # If it's a white pawn, shift right, if it's a black pawn, shift left.
-        # Add 1 to the shift multiplier to disregard pawns on the same rank as the passed pawn.
-        if side == chess.WHITE:
-            cover_bitboard <<= 8 * (chess.square_rank(square) + 1)
-        else:
-            cover_bitboard >>= 8 * (8 - chess.square_rank(square))
-        
-        # Bitwise and the other side's pieces with the overall pawn bitboard to get the other side's pawns in a bitboard.
-        # Then, by bitwise anding that with the cover bitboard any bits that are 1 are opposing pawns that are able to stop this pawn.
-        # If that's the case, then this pawn is not a passed pawn, so invert the result to return True for actual passed pawns.
-        return not bool(board.pawns & board.occupied_co[not side] & cover_bitboard)
+        # The mask covers the squares in front of the pawn on its own file and the files next to it.
+        # If any of the other side's pawns are in it then this pawn is not a passed pawn.
+        return bitboards.is_passed_pawn(board, square, side)
 
     def find_passed_pawns(
             self: typing.Self,
@@ -239,13 +335,7 @@ class colon_three(base.ChessBot):
             side: chess.Color
         ) -> chess.Bitboard:
         """Returns a bitboard of the passed pawns for the given side."""
-        result = 0
-        
-        for pawn in board.pieces(chess.PAWN, side):
-            if self.is_passed_pawn(board, pawn, side):
-                result |= chess.BB_SQUARES[pawn]
-        
-        return result
+        return bitboards.passed_pawns(board, side)
 
     def occupied_value(
             self: typing.Self,
@@ -346,13 +436,14 @@ class colon_three(base.ChessBot):
         board.push(move)
 
         # Check for checkmate.
-        # Check the opponent's legal moves to see if they have mate in 1.
+        # Check whether the opponent has mate in 1.
+        if self.mate_search.mate_in_one(board):
+            board.pop()
+            return False
+        
+        # Check the opponent's legal moves to see if any of them forces mate in 2.
         for move_check in board.legal_moves:
             board.push(move_check)
-            if board.is_checkmate():
-                board.pop()
-                board.pop()
-                return False
             
             if self.check_mate_in_two(board):
                 board.pop()
@@ -385,6 +476,9 @@ class colon_three(base.ChessBot):
         if self.check_mate_in_two(post_board):
             return 1e200 # Not math.inf in case there's mate in 1 and we haven't checked it yet.
 
+        # Work out the attacks in the position once, every criteria below that needs them uses this.
+        attack_info = base.AttackInfo(post_board)
+
         # Base score of 0.
         out = 0
 
@@ -400,11 +494,11 @@ class colon_three(base.ChessBot):
         
         # If it's a check, reward that by adding 1 to the score.
         if post_board.is_check():
-            out += self.check_value(pre_board, post_board, move)
+            out += self.check_value(pre_board, post_board, move, attack_info)
             # out += 100
         
         # For every hanging piece, subtract 5 from the score.
-        out -= self.hanging_pieces_penalty(post_board)
+        out -= self.hanging_pieces_penalty(post_board, attack_info)
         # hanging = self.get_hanging_pieces(post_board, self.bot_turn)
         # out -= hanging.bit_count() * 500
         
@@ -427,7 +521,7 @@ class colon_three(base.ChessBot):
         
         # Apply a bonus or penalty based on how safe our
         # king is and how safe the opposing king is.
-        out += self.rate_king_safety(post_board)
+        out += self.rate_king_safety(post_board, attack_info)
         
         return out
     
@@ -439,7 +533,8 @@ class colon_three(base.ChessBot):
             self: typing.Self,
             pre_board: chess.Board,
             post_board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            attack_info: base.AttackInfo
         ) -> int:
         """Gives a rating for a move that puts the opponent in check."""
         
@@ -450,8 +545,8 @@ class colon_three(base.ChessBot):
         # If the piece moved is also attacking an undefended piece or a 
         # defended piece of higher value add a larger bonus for the move
         # based on what exactly is the case.
-        attacked = self.get_attacks(post_board, move.to_square)
-        opposing_undefended = self.get_undefended_pieces(post_board, not self.bot_turn)
+        attacked = attack_info.attacks(move.to_square)
+        opposing_undefended = attack_info.undefended[not self.bot_turn]
         
         # We want to make sure the king isn't in the bitboard of undefended pieces, since that could mess things up.
         opposing_king = chess.BB_SQUARES[post_board.king(not self.bot_turn)]
@@ -472,8 +567,8 @@ class colon_three(base.ChessBot):
         
         # Time to check for defended pieces we're attacking that are worth more than what we're attacking with.
         attacking_value = self.PIECE_VALUES[post_board.piece_at(move.to_square).piece_type]
-        defended_squares = self.get_attacked_squares(post_board, not self.bot_turn)
-        opposing_pieces = self.get_occupied_bitboard(post_board, not self.bot_turn)
+        defended_squares = attack_info.attacked[not self.bot_turn]
+        opposing_pieces = attack_info.occupied[not self.bot_turn]
         
         defended_pieces = defended_squares & opposing_pieces
         attacked_pieces = defended_pieces & attacked
@@ -609,24 +704,25 @@ class colon_three(base.ChessBot):
     
     def hanging_pieces_penalty(
             self: typing.Self,
-            post_board: chess.Board
+            post_board: chess.Board,
+            attack_info: base.AttackInfo
         ) -> int:
         """Applies a negative penalty based on hanging pieces, accounting for piece value."""
-        self_occupied = self.get_occupied_bitboard(post_board, self.bot_turn)
-        self_attacking = self.get_attacked_squares(post_board, self.bot_turn)
+        self_occupied = attack_info.occupied[self.bot_turn]
+        self_attacking = attack_info.attacked[self.bot_turn]
         
         penalty_value = 0
         
-        for square in chess.scan_forward(self.get_occupied_bitboard(post_board, not self.bot_turn)):
-            piece_type = post_board.piece_at(square).piece_type
+        for square in chess.scan_forward(attack_info.occupied[not self.bot_turn]):
+            piece_type = post_board.piece_type_at(square)
             
-            attacking = self.get_attacks(post_board, square)
+            attacking = attack_info.attacks(square)
             
             for attacked_square in chess.scan_forward(attacking & self_occupied):
-                attacked_type = post_board.piece_at(attacked_square).piece_type
+                attacked_type = post_board.piece_type_at(attacked_square)
                 
-                attacking_amount = post_board.attackers_mask(not self.bot_turn, attacked_square).bit_count()
-                defending_amount = post_board.attackers_mask(self.bot_turn, attacked_square).bit_count()
+                attacking_amount = attack_info.attacker_count(not self.bot_turn, attacked_square)
+                defending_amount = attack_info.attacker_count(self.bot_turn, attacked_square)
                 
                 if attacking_amount > defending_amount:
                     penalty_value += self.PIECE_VALUES[attacked_type] * 1.5
@@ -671,27 +767,7 @@ class colon_three(base.ChessBot):
             post_board: chess.Board
         ) -> bool:
         """Attempts to find mate in two. Returns a boolean for whether it found mate in two."""
-        
-        for opponent_move in post_board.legal_moves:
-            post_board.push(opponent_move)
-
-            for self_move in post_board.legal_moves:
-                post_board.push(self_move)
-
-                if post_board.is_checkmate():
-                    post_board.pop()
-                    break
-
-                post_board.pop()
-            else:
-                post_board.pop()
-                break
-
-            post_board.pop()
-        else:
-            return True
-
-        return False
+        return self.mate_search.mated_in_two(post_board)
     
     def piece_sum(
             self: typing.Self,
@@ -724,18 +800,20 @@ class colon_three(base.ChessBot):
     
     def rate_king_safety(
             self: typing.Self,
-            post_board: chess.Board
+            post_board: chess.Board,
+            attack_info: base.AttackInfo
         ) -> int:
         """Rates the position based on the king safety of both sides."""
-        self_safety = self.king_safety_single(post_board, self.bot_turn)
-        opposing_safety = self.king_safety_single(post_board, not self.bot_turn)
+        self_safety = self.king_safety_single(post_board, self.bot_turn, attack_info)
+        opposing_safety = self.king_safety_single(post_board, not self.bot_turn, attack_info)
         
         return self_safety - opposing_safety
     
     def king_safety_single(
             self: typing.Self,
             board: chess.Board,
-            side: chess.Color
+            side: chess.Color,
+            attack_info: base.AttackInfo
         ) -> int:
         """Rates king safety for the given side."""
         king = board.king(side)
@@ -749,4 +827,4 @@ class colon_three(base.ChessBot):
             moves = list(board.generate_legal_moves(chess.BB_SQUARES[king]))
             board.pop()
         
-        return 300 - (check & self.get_attacks(board, not side)).bit_count() * 33 - len(moves) * 50
\ No newline at end of file
+        return 300 - (check & attack_info.attacked[not side]).bit_count() * 33 - len(moves) * 50
\ No newline at end of file
@@ -1,10 +1,10 @@
 import typing
 import chess
-import copy
 import random
-import math
+import time
 
 import base
+import bitboards
 
 class NyaaBot(base.ChessBot):
     name = "nyaabot"
@@ -16,6 +16,10 @@ class NyaaBot(base.ChessBot):
     PHO_FORCED_EP = True # Take en passant if possible.
     PHO_BEST_BY_TEST = True # Premove e4/e5.
     PHO_PIECE_VALUES = [1,3,3,5,9,3] # For use in distance calc. P,N,B,R,Q,K
+    PHO_PROFILE = False # Time each heuristic. See heuristicReport.
+
+    # The number of calls and total time of each heuristic, for every NyaaBot in this process. Only filled in if PHO_PROFILE is True.
+    heuristicTimes = {}
 
     def turn(
             self: typing.Self,
@@ -33,8 +37,11 @@ class NyaaBot(base.ChessBot):
         elif board.ply() == 1 and self.PHO_BEST_BY_TEST == True:
             return chess.Move(chess.E7,chess.E5)
         
+        # The legal moves are generated once, and used for every pass over the moves below.
+        moves = self.get_moves(board)
+
         if board.has_legal_en_passant() and self.PHO_FORCED_EP:
-            for move in board.legal_moves:
+            for move in moves:
                 if chess.Board.is_en_passant(board, move):
                     # print("HOLY HELL!")
                     return move
@@ -42,15 +49,16 @@ class NyaaBot(base.ChessBot):
         check_moves = []
         cap_moves = []
 
-        board_copy = copy.deepcopy(board)
-        for move in board.legal_moves:
-            if board.gives_check(move) and self.check_SanityCheck(board, move.to_square, move) == True: # Is it a sane check?
+        # Every move that gets pushed to the board is popped again before the next one, so the board doesn't need to be copied.
+        for move in moves:
+            if moves.gives_check(move) and self.check_SanityCheck(board, move.to_square, move) == True: # Is it a sane check?
                 check_moves.append(move) 
-                board_copy.push(move) 
-                if board_copy.is_checkmate(): # If it is mate, then play it now.
+                board.push(move) 
+                if board.is_checkmate(): # If it is mate, then play it now.
+                    board.pop()
                     return move
-                board_copy.pop()
-            if board.is_capture(move) and self.capture_SanityCheck(board, move.from_square, move.to_square, move) == True: # If it is not check, check if it is a capture.
+                board.pop()
+            if moves.is_capture(move) and self.capture_SanityCheck(board, move.from_square, move.to_square, move) == True: # If it is not check, check if it is a capture.
                 cap_moves.append(move) # Note any captures.            
 
         # Step 2: If no mate exists, Check the king
@@ -65,27 +73,20 @@ class NyaaBot(base.ChessBot):
 
         moveEvalDict = {}
 
+        # The distances of the pieces to the kings are worked out once, and then only the pieces the move changes are updated for each move.
+        # King and pawn distances aren't included, the king should stay away from pieces and pawns use a more complex system.
+        distanceWeights = dict(zip(chess.PIECE_TYPES, self.PHO_PIECE_VALUES))
+        distanceWeights.pop(chess.KING)
+        distanceWeights.pop(chess.PAWN)
+        self.attackDistances = bitboards.DistanceSum(board, board.turn, board.king(not board.turn), distanceWeights, self.PHO_DIST_CAP)
+        self.defenceDistances = bitboards.DistanceSum(board, not board.turn, board.king(board.turn), distanceWeights, self.PHO_DIST_CAP)
+
         # Evaluation time!
-        for move in board.legal_moves:
-            moveEvalDict[move] = 0
-            if move in check_moves:
-                moveEvalDict[move] = moveEvalDict[move] + 0
-            if move in cap_moves:
-                moveEvalDict[move] = moveEvalDict[move] + self.getPieceValue(board, move.to_square)                
-            moveEvalDict[move] = moveEvalDict[move] - self.ratePieceDistFromKing(board_copy, board.turn, move)
-            moveEvalDict[move] = moveEvalDict[move] + self.attackVulnerableSquares(board_copy, board.turn, move)
-            moveEvalDict[move] = moveEvalDict[move] + self.rateKingSafety(board_copy, board.turn, move)
-            moveEvalDict[move] = moveEvalDict[move] + (self.pawnAdvancement(board_copy, board.turn, move))*0.5   
-            moveEvalDict[move] = moveEvalDict[move] - self.checkYourselfDontWreckYourself(board_copy, board.turn, move)
-            if self.move_Draws(board, move):
-                moveEvalDict[move] = moveEvalDict[move] - 1000 # Must be stalemate or fivefold repetition.
-            if self.move_blundersMate(board, move):
-                moveEvalDict[move] = moveEvalDict[move] - 93258468905632490863452
+        for move in moves:
+            moveEvalDict[move] = self.evaluateMove(board, board.turn, move, move in check_moves, move in cap_moves)
 
         highValMove = max(moveEvalDict, key=moveEvalDict.get)
-        board_copy.push(highValMove) 
         highVal = moveEvalDict.get(highValMove)
-        board_copy.pop()
         if len([k for k, v in moveEvalDict.items() if v == highVal]) == 0:
             print("Oh shit!")
 
@@ -100,6 +101,58 @@ class NyaaBot(base.ChessBot):
 
     # Functions for use in turn().
 
+    def evaluateMove(self, thisBoard, color, move, isCheck, isCapture):
+        # The move is only pushed once, and every heuristic that needs the position after the move reads it from the same board.
+        moveEval = 0
+        if isCheck:
+            moveEval = moveEval + 0
+        if isCapture:
+            moveEval = moveEval + self.getPieceValue(thisBoard, move.to_square)
+
+        # These use the distances worked out at the start of the turn, so they need the board before the move.
+        pieceDist = self.timeHeuristic("ratePieceDistFromKing", self.ratePieceDistFromKing, thisBoard, color, move)
+        kingSafety = self.timeHeuristic("rateKingSafety", self.rateKingSafety, thisBoard, color, move)
+
+        chess.Board.push(thisBoard, move)
+        vulnerable = self.timeHeuristic("attackVulnerableSquares", self.attackVulnerableSquares, thisBoard, color)
+        pawnPoints = self.timeHeuristic("pawnAdvancement", self.pawnAdvancement, thisBoard, color, move)
+        wreckPenalty = self.timeHeuristic("checkYourselfDontWreckYourself", self.checkYourselfDontWreckYourself, thisBoard, color)
+        draws = self.timeHeuristic("position_Draws", self.position_Draws, thisBoard)
+        blundersMate = self.timeHeuristic("position_blundersMate", self.position_blundersMate, thisBoard)
+        chess.Board.pop(thisBoard)
+
+        moveEval = moveEval - pieceDist
+        moveEval = moveEval + vulnerable
+        moveEval = moveEval + kingSafety
+        moveEval = moveEval + pawnPoints*0.5
+        moveEval = moveEval - wreckPenalty
+        if draws:
+            moveEval = moveEval - 1000 # Must be stalemate or fivefold repetition.
+        if blundersMate:
+            moveEval = moveEval - 93258468905632490863452
+        return moveEval
+
+    def timeHeuristic(self, name, function, *args):
+        # Runs a heuristic, and adds how long it took to heuristicTimes if PHO_PROFILE is True.
+        if not self.PHO_PROFILE:
+            return function(*args)
+        start = time.perf_counter()
+        out = function(*args)
+        elapsed = time.perf_counter() - start
+        calls, total = NyaaBot.heuristicTimes.get(name, (0, 0))
+        NyaaBot.heuristicTimes[name] = (calls + 1, total + elapsed)
+        return out
+
+    @classmethod
+    def heuristicReport(cls):
+        # Returns the lines of a table of the time spent in each heuristic, slowest first.
+        # To use it set PHO_PROFILE to True, play some games in this process (like with base.run_match,) and print the lines.
+        grandTotal = sum(total for _, total in cls.heuristicTimes.values())
+        lines = [f"{'Heuristic'.ljust(32)} {'Calls'.rjust(8)} {'Total ms'.rjust(10)} {'Mean us'.rjust(9)} {'Share'.rjust(7)}"]
+        for name, (calls, total) in sorted(cls.heuristicTimes.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"{name.ljust(32)} {str(calls).rjust(8)} {total * 1000:10.1f} {total / calls * 1e6:9.1f} {total / grandTotal:7.1%}")
+        return lines
+
     def helper_numToSquare(self, boardNum: int): # Must input an integer.
         if boardNum < 0 or boardNum >= 64:
             # print("Illegal input made.")
@@ -115,93 +168,48 @@ class NyaaBot(base.ChessBot):
     def ratePieceDistFromKing(self, thisBoard, color, move):
         # For now, all pieces' distance from the king will be judged.
         # It should be fairly easy to adjust this so that a piece type is ignored later.
-        chess.Board.push(thisBoard, move)
-        thisBoard.turn = color # To fix whose turn it is
-        sumDist = 0
-        totalPieces = 0
-        for piece in chess.PIECE_TYPES:
-            listPieces = list(thisBoard.pieces(piece, thisBoard.turn))
-            for item in listPieces:
-                if chess.Board.piece_type_at(thisBoard, item) == chess.KING or chess.Board.piece_type_at(thisBoard, item) == chess.PAWN:
-                    continue # The king should stay away from pieces. Pawns use a more complex system.
-                pieceDist = math.dist(self.helper_numToSquare(item),self.helper_numToSquare(thisBoard.king(not thisBoard.turn)))
-                # print("Distance of the", chess.square_name(item), chess.Board.piece_type_at(thisBoard, item), "is", pieceDist)
-                if pieceDist < (self.PHO_DIST_CAP):
-                    sumDist += (self.PHO_DIST_CAP) * self.getPieceValue(thisBoard, item)
-                else:
-                    sumDist += pieceDist * self.getPieceValue(thisBoard, item)
-                totalPieces += 1 * self.getPieceValue(thisBoard, item)
+        # This uses the distances worked out at the start of the turn, see `turn`.
+        sumDist, totalPieces = self.attackDistances.after_move(thisBoard, move)
         if totalPieces == 0:
-            chess.Board.pop(thisBoard)           
             return 8
-        chess.Board.pop(thisBoard)    
-        # print(totalPieces)
-        # print(sumDist)
-        # print()
         return sumDist/totalPieces
     
     def rateKingSafety(self, thisBoard, color, move):
-        chess.Board.push(thisBoard, move)
-        thisBoard.turn = color # To fix whose turn it is
-        sumDist = 0
-        totalPieces = 0
-        for piece in chess.PIECE_TYPES:
-            listPieces = list(thisBoard.pieces(piece, not thisBoard.turn))
-            for item in listPieces:
-                if chess.Board.piece_type_at(thisBoard, item) == chess.KING or chess.Board.piece_type_at(thisBoard, item) == chess.PAWN:
-                    continue # The king should stay away from pieces. Pawns use a more complex system.
-                pieceDist = math.dist(self.helper_numToSquare(item),self.helper_numToSquare(thisBoard.king(thisBoard.turn)))
-                # print("Distance of the", chess.square_name(item), chess.Board.piece_type_at(thisBoard, item), "is", pieceDist)
-                if pieceDist < (self.PHO_DIST_CAP):
-                    sumDist += (self.PHO_DIST_CAP) * self.getPieceValue(thisBoard, item)
-                else:
-                    sumDist += pieceDist * self.getPieceValue(thisBoard, item)
-                totalPieces += 1 * self.getPieceValue(thisBoard, item)
+        # The distances of the opponent's pieces to our king, using the distances worked out at the start of the turn.
+        sumDist, totalPieces = self.defenceDistances.after_move(thisBoard, move)
         if totalPieces == 0:
-            chess.Board.pop(thisBoard)           
             return 8
-        chess.Board.pop(thisBoard)    
-        # print(totalPieces)
-        # print(sumDist)
-        # print()
         return sumDist/totalPieces
     
-    def pawnAdvancement(self, thisBoard, color, move):
+    def pawnAdvancement(self, thisBoard, color, move): # The move should already be pushed to thisBoard.
         pushPoints = 0
         if move.promotion != None:
             if move.promotion != chess.QUEEN:
                 return 0
             else:
                 return 10.5
-        chess.Board.push(thisBoard, move)
-        thisBoard.turn = color # To fix whose turn it is
-        listPieces = list(thisBoard.pieces(chess.PAWN, thisBoard.turn))
+        listPieces = list(thisBoard.pieces(chess.PAWN, color))
+        kingDistances = bitboards.EUCLIDEAN_DISTANCES[thisBoard.king(not color)]
         for square in listPieces:
-            if thisBoard.turn == chess.WHITE:
+            if color == chess.WHITE:
                 promotionPoints = 0.05*(chess.square_rank(square)**1.5) # 0 to 0.73 points
-                kingPenalty = -0.15*math.dist(self.helper_numToSquare(square),self.helper_numToSquare(thisBoard.king(not thisBoard.turn)))
+                kingPenalty = -0.15*kingDistances[square]
             else: # it's black's move.
                 promotionPoints = 0.05*((-chess.square_rank(square)+7)**1.5) # 0 to 0.73 points
-                kingPenalty = -0.15*math.dist(self.helper_numToSquare(square),self.helper_numToSquare(thisBoard.king(not thisBoard.turn)))
+                kingPenalty = -0.15*kingDistances[square]
             promotionPoints *= (-abs(chess.square_file(square)-3.5)+3.5)*0.25+0.5 # Encourage center pawn development
             pushPoints += promotionPoints + kingPenalty
-        thisBoard.pop()
         return pushPoints           
     
-    def attackVulnerableSquares(self, thisBoard, color, move):
-        # print("Considering move", move)
-        chess.Board.push(thisBoard, move)
-        thisBoard.turn = color # To fix whose turn it is
-        listAttacking = list(chess.Board.attacks(thisBoard, thisBoard.king(not thisBoard.turn)))
+    def attackVulnerableSquares(self, thisBoard, color): # The move should already be pushed to thisBoard.
+        listAttacking = list(chess.Board.attacks(thisBoard, thisBoard.king(not color)))
         listNumAttacking = []
         # print(listAttacking)
         for square in listAttacking:
-            if len(chess.Board.attackers(thisBoard, not thisBoard.turn, square)) == 1: # Must only be the king then
-                listNumAttacking.append(len(chess.Board.attackers(thisBoard, thisBoard.turn, square)))
-                # print("There are", len(chess.Board.attackers(thisBoard, thisBoard.turn, square)), "attackers on square", square)
+            if thisBoard.attackers_mask(not color, square).bit_count() == 1: # Must only be the king then
+                listNumAttacking.append(thisBoard.attackers_mask(color, square).bit_count())
             else:
                 listNumAttacking.append(0)
-        thisBoard.pop()
         # print("There are", listNumAttacking, "attackers.")
         # print()
         if max(listNumAttacking) == 0:
@@ -234,9 +242,7 @@ class NyaaBot(base.ChessBot):
         # print("Nope")
         return False
     
-    def checkYourselfDontWreckYourself(self, thisBoard, color, move):
-        # print("Checking sanity of move", move)
-        chess.Board.push(thisBoard, move)
+    def checkYourselfDontWreckYourself(self, thisBoard, color): # The move should already be pushed to thisBoard.
         thisBoard.turn = color # To fix whose turn it is    
         penalty = 0
         for piece in chess.PIECE_TYPES:
@@ -261,7 +267,7 @@ class NyaaBot(base.ChessBot):
                                 penalty = penalty + 0.5 + self.getPieceValue(thisBoard, square)
                                 break
                         thisBoard.turn = color
-        chess.Board.pop(thisBoard)
+        thisBoard.turn = not color # Back to the opponent's turn, as it is after the move.
         return penalty
     
     def capture_SanityCheck(self, thisBoard, fromSquare, toSquare, move): # TODO: Convert this to inputting a move.
@@ -336,21 +342,29 @@ class NyaaBot(base.ChessBot):
             return 0
 
     def move_Draws(self, thisBoard, move):
-        board_copy_HFD = copy.deepcopy(thisBoard)
-        chess.Board.push(board_copy_HFD, move)
-        if chess.Board.outcome(board_copy_HFD, claim_draw=True) != None and chess.Board.is_checkmate(board_copy_HFD) == False:
+        # Pushing and popping the move leaves thisBoard how it was, so there's no need to copy it.
+        chess.Board.push(thisBoard, move)
+        draws = self.position_Draws(thisBoard)
+        chess.Board.pop(thisBoard)
+        return draws
+
+    def position_Draws(self, thisBoard): # Same as move_Draws, but the move should already be pushed to thisBoard.
+        if chess.Board.outcome(thisBoard, claim_draw=True) != None and chess.Board.is_checkmate(thisBoard) == False:
             return True
         else:
             return False
         
     def move_blundersMate(self, thisBoard, move):
-        board_copy_HFD = copy.deepcopy(thisBoard)
-        chess.Board.push(board_copy_HFD, move)
-        for i in board_copy_HFD.legal_moves:
-            chess.Board.push(board_copy_HFD, i)
-            if chess.Board.is_checkmate(board_copy_HFD):
-                chess.Board.pop(board_copy_HFD)
-                chess.Board.pop(board_copy_HFD)                
+        chess.Board.push(thisBoard, move)
+        blundersMate = self.position_blundersMate(thisBoard)
+        chess.Board.pop(thisBoard)
+        return blundersMate
+
+    def position_blundersMate(self, thisBoard): # Same as move_blundersMate, but the move should already be pushed to thisBoard.
+        for i in thisBoard.legal_moves:
+            chess.Board.push(thisBoard, i)
+            if chess.Board.is_checkmate(thisBoard):
+                chess.Board.pop(thisBoard)
                 return True
-            chess.Board.pop(board_copy_HFD)
+            chess.Board.pop(thisBoard)
         return False
\ No newline at end of file
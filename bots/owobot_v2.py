@@ -3,6 +3,7 @@ import chess
 import random
 
 import base
+import bitboards
 
 class OwObot_v2(base.ChessBot):
     name = "owobot_v2"
@@ -52,24 +53,14 @@ class OwObot_v2(base.ChessBot):
             board: chess.Board,
             color: chess.Color
         ) -> chess.Bitboard:
-        total = chess.BB_EMPTY
-
-        for square in board.piece_map(mask=self.get_all_pieces(board, color)):
-            total |= self.get_defense(board, color, square)
-        
-        return total
+        return bitboards.defended_pieces(board, color)
     
     def get_attacked_squares(
             self: typing.Self,
             board: chess.Board,
             color: chess.Color
         ) -> chess.Bitboard:
-        total = chess.BB_EMPTY
-
-        for square in board.piece_map(mask=self.get_all_pieces(board, color)):
-            total |= self.get_attacks(board, square)
-        
-        return total
+        return bitboards.attacked_squares(board, color)
     
     def get_all_pieces(
             self: typing.Self,
@@ -83,7 +74,7 @@ class OwObot_v2(base.ChessBot):
             board: chess.Board,
             color: chess.Color
         ) -> chess.Bitboard:
-        return self.get_all_pieces(board, color) - self.get_defended_squares(board, color)
+        return bitboards.undefended_pieces(board, color)
 
 
     def turn(
@@ -4,6 +4,7 @@ import random
 import math
 
 import base
+import bitboards
 
 class OwObot_v3(base.ChessBot):
     name = "owobot_v3"
@@ -145,10 +146,7 @@ class OwObot_v3(base.ChessBot):
             self: typing.Self,
             bitboard: chess.Bitboard
         ) -> typing.Generator[int, None, None]:
-        while bitboard:
-            b = bitboard & (~bitboard + 1)
-            yield int(math.log2(b))
-            bitboard ^= b
+        return bitboards.scan(bitboard)
     
     def get_attacks(
             self: typing.Self,
@@ -186,12 +184,7 @@ class OwObot_v3(base.ChessBot):
             color: chess.Color
         ) -> chess.Bitboard:
         """Gives a bitboard of every square the given color has a piece on which is defended."""
-        total = chess.BB_EMPTY
-
-        for square in board.piece_map(mask=self.get_all_pieces(board, color)):
-            total |= self.get_defense(board, color, square)
-        
-        return total
+        return bitboards.defended_pieces(board, color)
     
     def get_attacked_squares(
             self: typing.Self,
@@ -199,12 +192,7 @@ class OwObot_v3(base.ChessBot):
             color: chess.Color
         ) -> chess.Bitboard:
         """Gives a bitboard of every square the given color attacks."""
-        total = chess.BB_EMPTY
-
-        for square in board.piece_map(mask=self.get_all_pieces(board, color)):
-            total |= self.get_attacks(board, square)
-        
-        return total
+        return bitboards.attacked_squares(board, color)
     
     def get_attacked_squares_no_king(
             self: typing.Self,
@@ -212,15 +200,7 @@ class OwObot_v3(base.ChessBot):
             color: chess.Color
         ) -> chess.Bitboard:
         """Gives a bitboard of every square the given color attacks, not including the king."""
-        total = chess.BB_EMPTY
-
-        for square in board.piece_map(mask=self.get_all_pieces(board, color)):
-            if board.piece_at(square).piece_type == chess.KING:
-                continue
-
-            total |= self.get_attacks(board, square)
-        
-        return total
+        return bitboards.attacked_squares(board, color, ~board.kings)
     
     def get_squares_attacked_by_king(
             self: typing.Self,
@@ -251,7 +231,7 @@ class OwObot_v3(base.ChessBot):
             color: chess.Color
         ) -> chess.Bitboard:
         """Gives a bitboard of every square that has a piece of the given color which that color does not defend."""
-        return self.get_all_pieces(board, color) - self.get_defended_squares(board, color)
+        return bitboards.undefended_pieces(board, color)
 
     def get_square_attackers(
             self: typing.Self,
@@ -260,14 +240,7 @@ class OwObot_v3(base.ChessBot):
             square: chess.Square
         ) -> chess.Bitboard:
         """Gives a bitboard of each square that the given color occupies that attacks the given square."""
-        shift = 1 << square
-        total = chess.BB_EMPTY
-
-        for piece_square in board.piece_map(mask=self.get_all_pieces(board, color)):
-            if shift & self.get_attacks(board, piece_square):
-                total |= 1 << piece_square
-        
-        return total
+        return board.attackers_mask(color, square)
 
     def get_attacked_pieces(
             self: typing.Self,
@@ -293,18 +266,19 @@ class OwObot_v3(base.ChessBot):
     def find_hanging_pieces(
             self: typing.Self,
             board: chess.Board,
-            color: chess.Color
+            color: chess.Color,
+            attack_info: base.AttackInfo
         ) -> chess.Bitboard:
         """Finds hanging pieces that `not color` has."""
         output = 0
 
-        color_pieces = self.get_all_pieces(board, color)
-        opposite_pieces = self.get_all_pieces(board, not color)
+        color_pieces = attack_info.occupied[color]
+        opposite_pieces = attack_info.occupied[not color]
 
         for piece_square in self.iterate_through_bitboard(color_pieces):
             piece_value = self.get_piece_value_from_square(board, piece_square)
 
-            attacks = self.get_attacks_filtered(board, color, piece_square)
+            attacks = attack_info.attacks(piece_square)
 
             for attack_square in self.iterate_through_bitboard(attacks & opposite_pieces):
                 attack_value = self.get_piece_value_from_square(board, attack_square)
@@ -323,17 +297,23 @@ class OwObot_v3(base.ChessBot):
         ) -> chess.Move:
         self.side = board.turn
 
+        # The attacks before the move are the same for every move, so they're only worked out once.
+        pre_info = base.AttackInfo(board)
 
         move_rankings = {}
 
         for move in board.legal_moves:
+            # The attacks after the move, shared by every ranking criteria below.
+            board.push(move)
+            post_info = base.AttackInfo(board)
+            board.pop()
 
             score = 0
 
             ################################
             # Check for checks.
             if board.gives_check(move):
-                score += self.check_value(board, move)
+                score += self.check_value(board, move, pre_info, post_info)
 
                 # Check if it's checkmate...
                 board.push(move)
@@ -345,16 +325,16 @@ class OwObot_v3(base.ChessBot):
             ################################
             # Check for captures.
             if board.is_capture(move):
-                score += self.capture_value(board, move)
+                score += self.capture_value(board, move, pre_info)
             
             ################################
             # Check for piece blunders.
-            if self.move_blunders_piece(board, move):
+            if self.move_blunders_piece(board, move, post_info):
                 score -= 10
 
             ################################
             # Check for piece hangs.
-            score += self.move_hangs_any_piece(board, move) * -7.5
+            score += self.move_hangs_any_piece(board, move, post_info) * -7.5
                 
             ################################
             # Account for king safety.
@@ -374,11 +354,11 @@ class OwObot_v3(base.ChessBot):
 
             ################################
             # Account for attacking vulnerable squares
-            score += self.vulnerable_squares(board, move)
+            score += self.vulnerable_squares(board, move, pre_info, post_info)
 
             ################################
             # Check for trapped pieces.
-            score += self.check_trapped_pieces(board, move)
+            score += self.check_trapped_pieces(board, move, post_info)
 
             move_rankings[move] = score
         
@@ -443,7 +423,8 @@ class OwObot_v3(base.ChessBot):
     def move_blunders_piece(
             self: typing.Self,
             board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            post_info: base.AttackInfo
         ) -> bool:
         """If any attacked piece is left undefended after the move is complete.
         This has the exception for if the move is a capture and the captured piece is of equal or higher value than what is doing the capturing."""
@@ -451,15 +432,11 @@ class OwObot_v3(base.ChessBot):
             if self.get_piece_value_from_square(board, move.from_square) <= self.get_piece_value_from_square(board, move.to_square):
                 return False
 
-        board.push(move)
-
-        undefended_pieces = self.get_undefended_pieces(board, self.side)
-        attacked = self.get_attacked_squares(board, not self.side)
+        undefended_pieces = post_info.undefended[self.side]
+        attacked = post_info.attacked[not self.side]
 
         attacked_pieces = undefended_pieces & attacked
 
-        board.pop()
-
         return attacked_pieces > 0
     
     def move_hangs_moved_piece(
@@ -491,17 +468,18 @@ class OwObot_v3(base.ChessBot):
     def move_hangs_any_piece(
             self: typing.Self,
             board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            post_info: base.AttackInfo
         ) -> bool:
         board.push(move)
 
-        attacked_pieces = self.get_attacked_pieces(board, self.side)
+        attacked_pieces = post_info.occupied[self.side] & post_info.attacked[not self.side]
 
         if attacked_pieces == 0:
             board.pop()
             return False
         
-        hanging = self.find_hanging_pieces(board, not self.side)
+        hanging = self.find_hanging_pieces(board, not self.side, post_info)
         if hanging:
             board.pop()
             return hanging.bit_count() 
@@ -529,12 +507,13 @@ class OwObot_v3(base.ChessBot):
     def capture_value(
             self: typing.Self,
             board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            pre_info: base.AttackInfo
         ) -> float:
         """Assigns a score to a capture."""
         if board.is_capture(move):
-            opponent_attackers = self.get_square_attackers(board, not self.side, move.to_square)
-            defenders = self.get_square_attackers(board, self.side, move.to_square)
+            opponent_attackers = pre_info.attackers_mask(not self.side, move.to_square)
+            defenders = pre_info.attackers_mask(self.side, move.to_square)
             
             captured_value = self.get_piece_value_from_square(board, move.to_square)
             capturing_value = self.get_piece_value_from_square(board, move.from_square)
@@ -661,18 +640,16 @@ class OwObot_v3(base.ChessBot):
     def vulnerable_squares(
             self: typing.Self,
             board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            pre_info: base.AttackInfo,
+            post_info: base.AttackInfo
         ) -> float:
-        king = self.get_squares_attacked_by_king(board, not self.side)
-        attacked = self.get_attacked_squares_no_king(board, not self.side)
+        king = pre_info.attacks(board.king(not self.side))
+        attacked = pre_info.attacked_by(not self.side, ~board.kings)
 
         king_vulernable = king - (king & attacked)
 
-        board.push(move)
-
-        self_attacking = self.get_attacks(board, move.to_square)
-
-        board.pop()
+        self_attacking = post_info.attacks(move.to_square)
 
         if king_vulernable & self_attacking:
             # Attacking a vulnerable square!
@@ -683,11 +660,13 @@ class OwObot_v3(base.ChessBot):
     def check_value(
             self: typing.Self,
             board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            pre_info: base.AttackInfo,
+            post_info: base.AttackInfo
         ) -> float:
         value = 1
 
-        fork_pre = self.find_hanging_pieces(board, self.side)
+        fork_pre = self.find_hanging_pieces(board, self.side, pre_info)
 
         board.push(move)
 
@@ -699,7 +678,7 @@ class OwObot_v3(base.ChessBot):
 
         ### Potential forks. ###
         
-        fork_post = self.find_hanging_pieces(board, self.side)
+        fork_post = self.find_hanging_pieces(board, self.side, post_info)
         post_count = fork_post.bit_count()
 
         if post_count > fork_pre.bit_count():
@@ -714,11 +693,12 @@ class OwObot_v3(base.ChessBot):
     def check_trapped_pieces(
             self: typing.Self,
             board: chess.Board,
-            move: chess.Move
+            move: chess.Move,
+            post_info: base.AttackInfo
         ) -> float:
         board.push(move)
 
-        attack_pieces = self.get_attacked_pieces(board, not self.side)
+        attack_pieces = post_info.occupied[not self.side] & post_info.attacked[self.side]
 
         if not attack_pieces:
             board.pop()
@@ -726,14 +706,14 @@ class OwObot_v3(base.ChessBot):
         
         out = 0
         
-        all_attacks = self.get_attacked_squares(board, self.side)
+        all_attacks = post_info.attacked[self.side]
 
         for square in self.iterate_through_bitboard(attack_pieces):
-            square_attacks = self.get_attacks_filtered(board, not self.side, square)
+            square_attacks = post_info.attacks(square) & ~post_info.occupied[not self.side]
 
             if square_attacks & all_attacks == square_attacks:
                 attacked = self.get_piece_value_from_square(board, square)
-                attackers = self.get_square_attackers(board, self.side, square)
+                attackers = post_info.attackers_mask(self.side, square)
 
                 for potential in self.iterate_through_bitboard(attackers):
                     if self.get_piece_value_from_square(board, potential) < attacked:
@@ -16,6 +16,9 @@ class RandomBot(base.ChessBot):
         ) -> chess.Move:
         all_pieces = []
 
+        # The legal moves are only generated once, and are grouped by the square they move from.
+        moves = self.get_moves(board)
+
         for piece in chess.PIECE_TYPES:
             pieces = board.pieces(piece, board.turn)
 
@@ -24,13 +27,8 @@ class RandomBot(base.ChessBot):
         
         for _ in all_pieces:
             chosen_tile = random.choice(all_pieces)
-                
-            all_moves = board.legal_moves
 
-            possible_moves = []
-            for move in all_moves:
-                if move.from_square == chosen_tile:
-                    possible_moves.append(move)
+            possible_moves = moves.from_square(chosen_tile)
             
             if len(possible_moves) == 0:
                 continue
@@ -38,4 +36,4 @@ class RandomBot(base.ChessBot):
             return random.choice(possible_moves)
         
         # Failsafe, this should never happen, and it might not even help.
-        return random.choice(list(board.legal_moves))
\ No newline at end of file
+        return random.choice(moves.moves)
\ No newline at end of file
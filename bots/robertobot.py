@@ -1,9 +1,110 @@
 import typing
 import chess
+import chess.polyglot
 import random
+import time
 
 import base
 
+# Transposition table entry flags, for whether the stored value is exact or only a bound.
+EXACT = 0
+LOWER = 1 # The real value is at least the stored value (the search failed high).
+UPPER = 2 # The real value is at most the stored value (the search failed low).
+
+# Piece values for ordering captures, most valuable victim first and then least valuable attacker.
+ORDER_VALUES = {
+	chess.PAWN: 1,
+	chess.KNIGHT: 3,
+	chess.BISHOP: 3,
+	chess.ROOK: 5,
+	chess.QUEEN: 9,
+	chess.KING: 10
+}
+
+# The hp each piece adds, the same as in `RobertoBot.full_stats`.
+HP_VALUES = {
+	chess.PAWN: 1,
+	chess.KNIGHT: 3,
+	chess.BISHOP: 3,
+	chess.ROOK: 5,
+	chess.QUEEN: 9,
+	chess.KING: 0
+}
+
+class SearchTimeout(Exception):
+	"""Raised inside the search when the time budget runs out."""
+	pass
+
+class IncrementalEval():
+	"""Keeps the hp, attack, defense, speed, and dexterity of both sides up to date as moves are pushed and popped,
+	so the eval doesn't have to look at every piece on the board at every leaf.
+
+	Every piece adds to the stats of its side, based on its own square and the squares it attacks. When a move is made,
+	the only pieces whose part can change are the ones on the squares the move changes, and the ones attacking those
+	squares. This covers the sliders whose rays get blocked or opened up, as a slider attacks the first piece in the way."""
+	def __init__(self, board):
+		self.board = board
+		self.stats = {
+			chess.WHITE: [0, 0, 0, 0, 0],
+			chess.BLACK: [0, 0, 0, 0, 0]
+		}
+		self.history = []
+
+		for square in chess.scan_forward(board.occupied):
+			self.apply(square, 1)
+
+	def apply(self, square, sign):
+		"""Adds (or with a sign of -1 removes) the stats of the piece on the square."""
+		board = self.board
+		piece_type = board.piece_type_at(square)
+		white = bool(board.occupied_co[chess.WHITE] & chess.BB_SQUARES[square])
+
+		attacks = board.attacks_mask(square)
+		friendly = attacks & board.occupied_co[white]
+		enemy = attacks & board.occupied_co[not white]
+
+		stats = self.stats[white]
+		stats[0] += sign * HP_VALUES[piece_type]
+		stats[1] += sign * enemy.bit_count()
+		stats[2] += sign * friendly.bit_count()
+		stats[3] += sign * (attacks & ~board.occupied).bit_count()
+		stats[4] += sign * attacks.bit_count()
+
+	def push(self, move):
+		board = self.board
+
+		changed = chess.BB_SQUARES[move.from_square] | chess.BB_SQUARES[move.to_square]
+
+		if board.is_en_passant(move):
+			changed |= chess.BB_SQUARES[chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square))]
+		elif board.is_castling(move):
+			rank = chess.square_rank(move.from_square)
+			if board.is_kingside_castling(move):
+				changed |= chess.BB_SQUARES[chess.square(7, rank)] | chess.BB_SQUARES[chess.square(5, rank)]
+			else:
+				changed |= chess.BB_SQUARES[chess.square(0, rank)] | chess.BB_SQUARES[chess.square(3, rank)]
+
+		affected = changed
+		for square in chess.scan_forward(changed):
+			affected |= board.attackers_mask(chess.WHITE, square) | board.attackers_mask(chess.BLACK, square)
+
+		self.history.append((self.stats[chess.WHITE].copy(), self.stats[chess.BLACK].copy()))
+
+		for square in chess.scan_forward(affected & board.occupied):
+			self.apply(square, -1)
+
+		board.push(move)
+
+		for square in chess.scan_forward(affected & board.occupied):
+			self.apply(square, 1)
+
+	def pop(self):
+		white_stats, black_stats = self.history.pop()
+		self.stats[chess.WHITE] = white_stats
+		self.stats[chess.BLACK] = black_stats
+
+		return self.board.pop()
+
 class RobertoBot(base.ChessBot):
 	name = "roberto_bot"
 	description = """A python version of my Roberto bot (https://github.com/lythd/Robertoct.ChessBot) that placed 293/624 in Sebastians competition. Don't look at my code there please its genuinely embarassing."""
@@ -15,30 +116,104 @@ class RobertoBot(base.ChessBot):
 	SPD = 0.4
 	DEX = 0.3
 
+	TIME_BUDGET = 2.0 # Seconds per move for the iterative deepening when there's no time control.
+	MAX_DEPTH = 6 # Deeper searches take well over the time budget in the middlegame, and in the endgame they only use up time.
+	MOVE_TIME_SHARE = 0.5 # The share of the time per move used with a time control that gives a fixed time per move, the rest leaves room for the overhead.
+	CLOCK_MOVES = 30 # With a clock, each move gets the time left on the clock divided by this, plus half the increment.
+	CHECK_EVAL = False # Compares the incremental eval against a full recompute at every leaf, which is slow but useful for finding bugs.
+	TABLE_SIZE = 1 << 16 # Number of transposition table slots, this has to be a power of 2.
+
+	def __init__(self, database_data):
+		# Each slot holds (key, depth, value, flag, best move, generation), or None if it's empty.
+		# A slot is only replaced by a deeper search of any position, or by anything once its entry is from an older move.
+		self.table = [None] * RobertoBot.TABLE_SIZE
+		self.generation = 0
+		self.nodes = 0
+		self.evaluator = None
+
+		super().__init__(database_data)
+
 	def turn(
 			self: typing.Self,
 			board: chess.Board,
-			depth = 2
+			time_budget = None,
+			max_depth = None
 		) -> chess.Move:
-		
+		"""Iterative deepening, searching one ply deeper each time until the time budget runs out, or until the next depth wouldn't finish in time.
+		The move from the deepest search that finished is played."""
+		if time_budget is None:
+			time_budget = self.time_budget()
+		if max_depth is None:
+			max_depth = RobertoBot.MAX_DEPTH
+
+		legal_moves = list(board.legal_moves)
+		if len(legal_moves) == 1:
+			return legal_moves[0]
+
+		self.generation += 1
+		self.evaluator = IncrementalEval(board)
+		self.killers = [[None, None] for _ in range(max_depth + 1)]
+		self.deadline = time.perf_counter() + time_budget
+
+		best_move = legal_moves[0]
+
+		for depth in range(1, max_depth + 1):
+			start = time.perf_counter()
+
+			try:
+				best_move, best_value = self.search_root(board, depth, best_move)
+			except SearchTimeout:
+				break
+
+			# No point searching further if there's a forced mate.
+			if abs(best_value) >= 9999:
+				break
+
+			# Each depth takes several times longer than the one before it, so if this one took more than half of
+			# the time that's left the next one would almost certainly be cut off, and the time would be wasted.
+			now = time.perf_counter()
+			if now - start > (self.deadline - now) / 2:
+				break
+
+		return best_move
+
+	def time_budget(self):
+		"""Returns the number of seconds to spend on this move, based on the time control if there is one."""
+		if self.time_control is None or self.time_limit is None:
+			return RobertoBot.TIME_BUDGET
+
+		if self.time_control.move_time is not None:
+			return self.time_limit * RobertoBot.MOVE_TIME_SHARE
+
+		return max(self.time_limit, 0) / RobertoBot.CLOCK_MOVES + self.time_control.increment / 2
+
+	def search_root(self, board, depth, previous_best):
 		best_move = None
 		best_value = -float('inf') if board.turn else float('inf')
+		alpha = -float('inf')
+		beta = float('inf')
 
-		for move in board.legal_moves:
-			board.push(move)
-			board_value = self.search(board, depth, -float('inf'), float('inf'), not board.turn)
-			board.pop()
+		# The best move from the previous depth goes first, as it's likely to still be the best.
+		moves = self.order_moves(board, 0, previous_best)
+
+		for move in moves:
+			self.evaluator.push(move)
+			board_value = self.search(board, depth - 1, alpha, beta, board.turn, 1)
+			self.evaluator.pop()
 
 			if board.turn and board_value > best_value:
 				best_value = board_value
 				best_move = move
+				alpha = max(alpha, board_value)
 			elif not board.turn and board_value < best_value:
 				best_value = board_value
 				best_move = move
+				beta = min(beta, board_value)
+
+		self.store(chess.polyglot.zobrist_hash(board), depth, best_value, EXACT, best_move)
+
+		return best_move, best_value
 
-		return best_move
-		
-		
 	def evaluate_board(self, board):
 		if board.is_checkmate():
 			if board.turn:
@@ -48,6 +223,15 @@ class RobertoBot(base.ChessBot):
 		elif board.is_stalemate() or board.is_insufficient_material() or board.is_seventyfive_moves():
 			return 0
 
+		if self.evaluator is not None and self.evaluator.board is board:
+			if RobertoBot.CHECK_EVAL:
+				for white in (chess.WHITE, chess.BLACK):
+					full = list(self.full_stats(board, white))
+					if full != self.evaluator.stats[white]:
+						raise AssertionError(f"Incremental eval {self.evaluator.stats[white]} doesn't match full eval {full} for {'white' if white else 'black'} in {board.fen()}")
+
+			return self.score_stats(board, self.evaluator.stats[board.turn], board.turn) + self.score_stats(board, self.evaluator.stats[not board.turn], not board.turn)
+
 		return self.base_eval(board, board.turn) + self.base_eval(board, not board.turn) # one would be negative from being black so we do want to add them here
 		#material = sum([self.piece_value(piece) for piece in board.piece_map().values()])
 		#return material
@@ -63,35 +247,117 @@ class RobertoBot(base.ChessBot):
 	#	}
 	#	return values[piece.piece_type] if piece.color == chess.WHITE else -values[piece.piece_type]
 
-	def search(self, board, depth, alpha, beta, maximizing_player):
+	def search(self, board, depth, alpha, beta, maximizing_player, ply):
+		self.nodes += 1
+		if self.nodes % 64 == 0 and time.perf_counter() > self.deadline:
+			raise SearchTimeout()
+
 		if depth == 0 or board.is_game_over():
 			return self.evaluate_board(board)
 
-		legal_moves = list(board.legal_moves)
-		
+		key = chess.polyglot.zobrist_hash(board)
+		entry = self.table[key & (RobertoBot.TABLE_SIZE - 1)]
+		table_move = None
+
+		if entry is not None and entry[0] == key:
+			table_move = entry[4]
+
+			if entry[1] >= depth:
+				value = entry[2]
+				if entry[3] == EXACT:
+					return value
+				elif entry[3] == LOWER:
+					alpha = max(alpha, value)
+				else:
+					beta = min(beta, value)
+
+				if beta <= alpha:
+					return value
+
+		original_alpha = alpha
+		original_beta = beta
+		best_move = None
+
 		if maximizing_player:
 			max_eval = -float('inf')
-			for move in legal_moves:
-				board.push(move)
-				eval = self.search(board, depth - 1, alpha, beta, False)
-				board.pop()
-				max_eval = max(max_eval, eval)
+			for move in self.order_moves(board, ply, table_move):
+				self.evaluator.push(move)
+				eval = self.search(board, depth - 1, alpha, beta, False, ply + 1)
+				self.evaluator.pop()
+				if eval > max_eval:
+					max_eval = eval
+					best_move = move
 				alpha = max(alpha, eval)
 				if beta <= alpha:
+					self.add_killer(board, move, ply)
 					break
-			return max_eval
+			best_value = max_eval
 		else:
 			min_eval = float('inf')
-			for move in legal_moves:
-				board.push(move)
-				eval = self.search(board, depth - 1, alpha, beta, True)
-				board.pop()
-				min_eval = min(min_eval, eval)
+			for move in self.order_moves(board, ply, table_move):
+				self.evaluator.push(move)
+				eval = self.search(board, depth - 1, alpha, beta, True, ply + 1)
+				self.evaluator.pop()
+				if eval < min_eval:
+					min_eval = eval
+					best_move = move
 				beta = min(beta, eval)
 				if beta <= alpha:
+					self.add_killer(board, move, ply)
 					break
-		return min_eval
-	
+			best_value = min_eval
+
+		if best_value <= original_alpha:
+			flag = UPPER
+		elif best_value >= original_beta:
+			flag = LOWER
+		else:
+			flag = EXACT
+
+		self.store(key, depth, best_value, flag, best_move)
+
+		return best_value
+
+	def store(self, key, depth, value, flag, move):
+		"""Stores a search result in the transposition table, if it's worth replacing what's already in the slot."""
+		index = key & (RobertoBot.TABLE_SIZE - 1)
+		entry = self.table[index]
+
+		if entry is None or entry[5] != self.generation or depth >= entry[1]:
+			self.table[index] = (key, depth, value, flag, move, self.generation)
+
+	def order_moves(self, board, ply, table_move):
+		"""Orders the moves so the ones most likely to cause a cutoff are searched first.
+		The move from the transposition table goes first, then captures by most valuable victim and least valuable attacker, then killer moves."""
+		killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+
+		def score(move):
+			if move == table_move:
+				return 1000
+			if board.is_capture(move):
+				if board.is_en_passant(move):
+					victim = chess.PAWN
+				else:
+					victim = board.piece_type_at(move.to_square)
+				return 100 + 10 * ORDER_VALUES[victim] - ORDER_VALUES[board.piece_type_at(move.from_square)]
+			if move.promotion is not None:
+				return 90 + ORDER_VALUES[move.promotion]
+			if move == killers[0]:
+				return 80
+			if move == killers[1]:
+				return 79
+			return 0
+
+		return sorted(board.legal_moves, key=score, reverse=True)
+
+	def add_killer(self, board, move, ply):
+		"""Remembers a quiet move that caused a cutoff, so it can be tried early in other positions at the same ply."""
+		if ply >= len(self.killers) or board.is_capture(move) or move == self.killers[ply][0]:
+			return
+
+		self.killers[ply][1] = self.killers[ply][0]
+		self.killers[ply][0] = move
+
 	def base_eval(self, board, white):
 		"""
 		 * Eval Explained
@@ -119,7 +385,10 @@ class RobertoBot(base.ChessBot):
 		 * Yes I just copied this message I am not even gonna bother reading this message again.
 		 * 
 		"""
-		
+		return self.score_stats(board, self.full_stats(board, white), white)
+
+	def full_stats(self, board, white):
+		"""Counts the hp, attack, defense, speed, and dexterity of one side from scratch."""
 		boardturn = board.turn # not sure if it clones or not but just resetting just incase, and not sure if this even matters but idcccc i just want this to work
 		board.turn = white
 		
@@ -198,6 +467,14 @@ class RobertoBot(base.ChessBot):
 		speed += bin(king_attacks & ~enemy_squares & ~friendly_squares).count('1')
 		dexterity += bin(king_attacks).count('1')
 
+		board.turn = boardturn
+
+		return hp, attack, defense, speed, dexterity
+
+	def score_stats(self, board, stats, white):
+		"""Combines the stats of one side into its eval, which is negative for black."""
+		hp, attack, defense, speed, dexterity = stats
+
 		eval_score = (hp * RobertoBot.HP +
 					  attack * RobertoBot.ATK +
 					  defense * RobertoBot.DEF +
@@ -209,6 +486,4 @@ class RobertoBot(base.ChessBot):
 		if board.fullmove_number < 5:
 			eval_score *= random.uniform(0.95, 1.05)  # for opening spice
 
-		board.turn = boardturn
-
 		return eval_score * (1.0 if white else -1.0)
\ No newline at end of file
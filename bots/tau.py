@@ -4,6 +4,7 @@ import random
 import os
 
 import base
+import digit_source
 
 class Tau(base.ChessBot):
     name = "tau"
@@ -15,11 +16,8 @@ class Tau(base.ChessBot):
             self: typing.Self,
             database_data: dict
         ) -> None:
-        try:
-            with open(os.path.join("data", "100k_tau.txt"), "r") as file_read:
-                self.digits = file_read.read()
-        except FileNotFoundError:
-            self.digits = None
+        # Shared between every instance in the process, so this doesn't read the file.
+        self.digits = digit_source.get_source(os.path.join("data", "100k_tau.txt"))
 
         super().__init__(database_data)
     
@@ -53,7 +51,7 @@ class Tau(base.ChessBot):
             if self.digits is None:
                 return random.choice(list(board.legal_moves))
             
-            digits = int(self.digits[self.digit_position * 2:self.digit_position * 2 + 2])
+            digits = self.digits.two_digits(self.digit_position)
 
             all_pieces = []
             for j in range(6):
@@ -69,7 +67,7 @@ class Tau(base.ChessBot):
             if digits >= cutoff:
                 while digits >= cutoff:
                     self.increment()
-                    digits = int(self.digits[self.digit_position * 2:self.digit_position * 2 + 2])
+                    digits = self.digits.two_digits(self.digit_position)
 
             chosen_piece, chosen_tile = all_pieces[int(digits / cutoff * piece_count)]
             
@@ -82,7 +80,7 @@ class Tau(base.ChessBot):
             
             ###########################################
             self.increment()
-            digits = int(self.digits[self.digit_position * 2:self.digit_position * 2 + 2])
+            digits = self.digits.two_digits(self.digit_position)
             ###########################################
 
             possible_move_count = len(possible_moves)
@@ -96,6 +94,6 @@ class Tau(base.ChessBot):
             if digits >= cutoff:
                 while digits >= cutoff:
                     self.increment()
-                    digits = int(self.digits[self.digit_position * 2:self.digit_position * 2 + 2])
+                    digits = self.digits.two_digits(self.digit_position)
         
             return possible_moves[int(digits / cutoff * possible_move_count)]
\ No newline at end of file
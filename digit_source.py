@@ -0,0 +1,48 @@
+import mmap
+import typing
+
+class DigitSource():
+    """The digits of a constant, read straight from a memory-mapped file.
+    The file is only mapped once per process, see `get_source`, so making a bot that uses it costs next to nothing."""
+    def __init__(
+            self: typing.Self,
+            path: str
+        ) -> None:
+        self.path = path
+
+        with open(path, "rb") as file_read:
+            # The mapping stays open after the file is closed.
+            self.map = mmap.mmap(file_read.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # The value of every pair of digits that has been read so far.
+        self.pairs = {} # type: dict[int, int]
+
+    def __len__(self: typing.Self) -> int:
+        return len(self.map)
+
+    def two_digits(
+            self: typing.Self,
+            position: int
+        ) -> int:
+        """Returns the two digit number made from the characters at `position * 2` and `position * 2 + 1` of the file.
+        This is the same as `int(text[position * 2:position * 2 + 2])` on the text of the file, including raising a ValueError if those characters aren't digits."""
+        try:
+            return self.pairs[position]
+        except KeyError:
+            value = int(self.map[position * 2:position * 2 + 2])
+            self.pairs[position] = value
+            return value
+
+# The sources that have been loaded in this process, by path.
+_sources = {} # type: dict[str, DigitSource]
+
+def get_source(path: str) -> DigitSource | None:
+    """Returns the digit source for the given file, mapping the file the first time it's used in this process.
+    If the file doesn't exist None is returned, and it will be looked for again next time."""
+    if path not in _sources:
+        try:
+            _sources[path] = DigitSource(path)
+        except FileNotFoundError:
+            return None
+
+    return _sources[path]
@@ -0,0 +1,239 @@
+import csv
+import json
+import math
+import time
+import tracemalloc
+import typing
+
+import chess
+
+# Games are split into phases by the number of pieces on the board, kings and pawns included.
+OPENING_PIECES = 28 # Positions with at least this many pieces are in the opening.
+ENDGAME_PIECES = 12 # Positions with at most this many pieces are in the endgame.
+
+PHASES = ("opening", "middlegame", "endgame")
+METHODS = ("load", "turn", "save")
+
+# The fields of every sample, in the order they're written to CSV files.
+SAMPLE_FIELDS = ("bot", "method", "ply", "phase", "wall", "cpu", "memory")
+
+def game_phase(board: chess.Board) -> str:
+    """Returns the phase of the game the board is in, based on the number of pieces on the board."""
+    pieces = chess.popcount(board.occupied)
+
+    if pieces >= OPENING_PIECES:
+        return "opening"
+
+    if pieces <= ENDGAME_PIECES:
+        return "endgame"
+
+    return "middlegame"
+
+def measure(
+        samples: list[dict] | None,
+        bot_name: str,
+        method: str,
+        board: chess.Board,
+        function: typing.Callable,
+        *args,
+        trace_memory: bool = False
+    ) -> typing.Any:
+    """Calls `function` with `args` and returns what it returns.
+    If `samples` isn't None, a sample with the wall time, CPU time, and the peak memory allocated during the call is added to it.
+    The memory is only measured if `trace_memory` is True, as `tracemalloc` makes everything a lot slower."""
+    if samples is None:
+        return function(*args)
+
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        tracemalloc.reset_peak()
+        memory_start = tracemalloc.get_traced_memory()[0]
+
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+
+    output = function(*args)
+
+    cpu = time.thread_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    samples.append({
+        "bot": bot_name,
+        "method": method,
+        "ply": board.ply(),
+        "phase": game_phase(board),
+        "wall": wall,
+        "cpu": cpu,
+        "memory": tracemalloc.get_traced_memory()[1] - memory_start if trace_memory else None
+    })
+
+    return output
+
+def percentile(
+        values: list[float],
+        percent: float
+    ) -> float:
+    """Returns the given percentile of the values, interpolating between the two closest values. The values must be sorted."""
+    if len(values) == 0:
+        return math.nan
+
+    position = (len(values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def describe(values: list[float]) -> dict[str, float]:
+    """Returns the total, mean, p50, p95, p99, and max of the values."""
+    values = sorted(values)
+
+    return {
+        "total": sum(values),
+        "mean": sum(values) / len(values) if values else math.nan,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else math.nan
+    }
+
+def _finite(value: typing.Any) -> typing.Any:
+    """Returns the value with every NaN or infinite float in it replaced with None, going through dictionaries and lists.
+    JSON has no NaN or infinity, and `json.dump` would otherwise write them as values most parsers reject."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+
+    return value
+
+class Recorder():
+    """Collects the samples from `measure` over any number of games, and summarizes them for each bot."""
+    def __init__(self: typing.Self) -> None:
+        self.samples = [] # type: list[dict]
+
+    def add(
+            self: typing.Self,
+            samples: typing.Iterable[dict] | None
+        ) -> None:
+        """Adds samples, like the ones under "calls" in the result of `base.run_match`."""
+        if samples is not None:
+            self.samples.extend(samples)
+
+    def values(
+            self: typing.Self,
+            bot_name: str,
+            method: str = "turn",
+            field: str = "wall",
+            phase: str | None = None
+        ) -> list[float]:
+        """Returns the values of a field for every call of a method by a bot, optionally only in one phase of the game."""
+        return [
+            sample[field]
+            for sample in self.samples
+            if sample["bot"] == bot_name
+            and sample["method"] == method
+            and (phase is None or sample["phase"] == phase)
+            and sample[field] is not None
+        ]
+
+    def summary(self: typing.Self) -> dict:
+        """Summarizes the samples of every bot.
+
+        For each bot and method there is the number of calls, and the total, mean, p50, p95, p99, and max of the wall time,
+        CPU time, and peak memory. The memory is None if it wasn't measured. The turn times are also split up by game phase under "phases"."""
+        summary = {}
+
+        for bot_name in sorted({sample["bot"] for sample in self.samples}):
+            bot_summary = {}
+
+            for method in METHODS:
+                wall = self.values(bot_name, method, "wall")
+
+                if len(wall) == 0:
+                    continue
+
+                memory = self.values(bot_name, method, "memory")
+
+                bot_summary[method] = {
+                    "count": len(wall),
+                    "wall": describe(wall),
+                    "cpu": describe(self.values(bot_name, method, "cpu")),
+                    "memory": describe(memory) if memory else None
+                }
+
+            bot_summary["phases"] = {}
+
+            for phase in PHASES:
+                wall = self.values(bot_name, "turn", "wall", phase)
+
+                if len(wall) == 0:
+                    continue
+
+                bot_summary["phases"][phase] = {
+                    "count": len(wall),
+                    "wall": describe(wall),
+                    "cpu": describe(self.values(bot_name, "turn", "cpu", phase))
+                }
+
+            summary[bot_name] = bot_summary
+
+        return summary
+
+    def format_summary(self: typing.Self) -> list[str]:
+        """Returns the lines of a table of the turn times of every bot, in milliseconds."""
+        summary = self.summary()
+
+        if len(summary) == 0:
+            return []
+
+        name_width = max(len(name) for name in summary)
+        name_width = max(name_width, len("Bot"))
+
+        header = " ".join([
+            "Bot".ljust(name_width),
+            "Phase".ljust(10),
+            "Moves".rjust(7),
+            *[column.rjust(9) for column in ("p50", "p95", "p99", "max", "cpu p50")]
+        ])
+        lines = [header, "-" * len(header)]
+
+        for bot_name, bot_summary in summary.items():
+            rows = [("all", bot_summary.get("turn"))] + list(bot_summary["phases"].items())
+
+            for phase, stats in rows:
+                if stats is None:
+                    continue
+
+                lines.append(" ".join([
+                    bot_name.ljust(name_width),
+                    phase.ljust(10),
+                    str(stats["count"]).rjust(7),
+                    *[f"{stats['wall'][key] * 1000:.2f}".rjust(9) for key in ("p50", "p95", "p99", "max")],
+                    f"{stats['cpu']['p50'] * 1000:.2f}".rjust(9)
+                ]))
+
+        return lines
+
+    def write_csv(
+            self: typing.Self,
+            path: str
+        ) -> None:
+        """Writes every sample to a CSV file, one row per call."""
+        with open(path, "w", newline="", encoding="utf-8") as file_write:
+            writer = csv.DictWriter(file_write, fieldnames=SAMPLE_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.samples)
+
+    def write_json(
+            self: typing.Self,
+            path: str
+        ) -> None:
+        """Writes the summary from `summary` to a JSON file. Statistics without a value, like the percentiles of a phase with no samples, are written as null."""
+        with open(path, "w", encoding="utf-8") as file_write:
+            json.dump(_finite(self.summary()), file_write, indent=4, allow_nan=False)
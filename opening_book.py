@@ -0,0 +1,179 @@
+import array
+import os
+import pickle
+import random
+import typing
+
+import chess
+import chess.polyglot
+
+GAMES_PATH = os.path.join("data", "Games.txt") # Sourced from https://github.com/SebLague/Chess-Coding-Adventure/blob/Chess-V1-Unity/Assets/Book/Games.txt
+CACHE_PATH = os.path.join("data", "Games.cache")
+
+# The number of plies from the start of each game that are parsed and stored in the cache.
+BOOK_DEPTH = 12
+
+# Bump this whenever the layout of the cache changes, so old caches get rebuilt.
+CACHE_VERSION = 1
+
+def encode_move(move: chess.Move) -> int:
+    """Packs a move into 16 bits, 6 for the from square, 6 for the to square, and 3 for the promotion piece type."""
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(packed: int) -> chess.Move:
+    """Unpacks a move packed by `encode_move`."""
+    return chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
+class OpeningBook():
+    """The games from `data/Games.txt`, with the first `BOOK_DEPTH` plies of each game already parsed.
+
+    For every game the moves are stored as packed integers, alongside the FEN and Zobrist key of
+    the position after each number of plies, so nothing has to be parsed to set up an opening."""
+    def __init__(
+            self: typing.Self,
+            lines: list[str],
+            moves: array.array,
+            offsets: array.array,
+            fens: list[str],
+            keys: array.array
+        ) -> None:
+        self.lines = lines
+        self.moves = moves
+        self.offsets = offsets
+        self.fens = fens
+        self.keys = keys
+
+    def __len__(self: typing.Self) -> int:
+        return len(self.lines)
+
+    def random_index(
+            self: typing.Self,
+            seed: str | int | float | bytes | bytearray | None = None
+        ) -> int:
+        """Returns the index of a random game. The same seed picks the same game as `random.Random(seed).choice` on the lines would."""
+        return random.Random(seed).randrange(len(self.lines))
+
+    def plies(
+            self: typing.Self,
+            index: int
+        ) -> int:
+        """Returns the number of plies stored for the given game."""
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def get_san(
+            self: typing.Self,
+            index: int,
+            plies: int
+        ) -> list[str]:
+        """Returns the first `plies` SAN moves of the given game."""
+        return self.lines[index].split(" ")[:plies]
+
+    def get_moves(
+            self: typing.Self,
+            index: int,
+            plies: int
+        ) -> list[chess.Move]:
+        """Returns the first `plies` moves of the given game. `plies` can't be more than `BOOK_DEPTH`."""
+        start = self.offsets[index]
+        return [decode_move(packed) for packed in self.moves[start:start + min(plies, self.plies(index))]]
+
+    def get_fen(
+            self: typing.Self,
+            index: int,
+            plies: int
+        ) -> str:
+        """Returns the FEN of the given game after `plies` plies."""
+        return self.fens[index * (BOOK_DEPTH + 1) + plies]
+
+    def get_key(
+            self: typing.Self,
+            index: int,
+            plies: int
+        ) -> int:
+        """Returns the Zobrist key of the given game after `plies` plies."""
+        return self.keys[index * (BOOK_DEPTH + 1) + plies]
+
+    def get_board(
+            self: typing.Self,
+            index: int,
+            plies: int
+        ) -> chess.Board:
+        """Returns a board with the first `plies` moves of the given game played on it, so the moves are in the move stack."""
+        board = chess.Board()
+
+        for move in self.get_moves(index, plies):
+            board.push(move)
+
+        return board
+
+def build_book(lines: list[str]) -> OpeningBook:
+    """Parses the opening moves of each game into an `OpeningBook`."""
+    moves = array.array("H")
+    offsets = array.array("I", [0])
+    fens = []
+    keys = array.array("Q")
+
+    for line in lines:
+        board = chess.Board()
+
+        fens.append(board.fen())
+        keys.append(chess.polyglot.zobrist_hash(board))
+
+        for san in line.split(" ")[:BOOK_DEPTH]:
+            try:
+                move = board.push_san(san)
+            except ValueError:
+                # The game is shorter than the book depth and this is the result.
+                break
+
+            moves.append(encode_move(move))
+            fens.append(board.fen())
+            keys.append(chess.polyglot.zobrist_hash(board))
+
+        offsets.append(len(moves))
+
+        # Pad out short games so every game takes up the same number of FENs and keys.
+        while len(fens) % (BOOK_DEPTH + 1):
+            fens.append(fens[-1])
+            keys.append(keys[-1])
+
+    return OpeningBook(lines, moves, offsets, fens, keys)
+
+def load_book(
+        games_path: str = GAMES_PATH,
+        cache_path: str = CACHE_PATH
+    ) -> OpeningBook:
+    """Loads the opening book from the cache, rebuilding the cache first if the games file has changed since it was made."""
+    try:
+        stat = os.stat(games_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"The file `{games_path}` was not found.")
+
+    signature = (CACHE_VERSION, BOOK_DEPTH, stat.st_mtime_ns, stat.st_size)
+
+    try:
+        with open(cache_path, "rb") as file_read:
+            cached = pickle.load(file_read)
+
+        if cached["signature"] == signature:
+            return OpeningBook(**cached["book"])
+    except (FileNotFoundError, EOFError, KeyError, TypeError, pickle.UnpicklingError):
+        pass
+
+    with open(games_path, "r") as file_read:
+        lines = file_read.readlines()
+
+    book = build_book(lines)
+
+    # Write to a temporary file first, so a crash partway through writing doesn't leave a broken cache.
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, "wb") as file_write:
+            pickle.dump({"signature": signature, "book": vars(book)}, file_write, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        # Not being able to write the cache isn't a problem, the book will just be rebuilt next time.
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    return book
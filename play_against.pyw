@@ -1,2 +1,4 @@
-import play_against_console
-play_against_console.main()
\ No newline at end of file
+if __name__ == "__main__":
+    # The process pools import this file again in every worker on Windows, which would open another window without this check.
+    import play_against_console
+    play_against_console.main()
\ No newline at end of file
@@ -0,0 +1,209 @@
+import timeit
+import typing
+
+import chess
+import numpy
+
+# Piece-square table scoring for many positions or moves at once.
+# Positions are encoded as 12 planes of 64 squares, one plane for each piece type of each side,
+# so scoring every position in a batch is a single matrix product with the tables.
+
+PLANES = 12
+FEATURES = PLANES * 64
+
+def plane(
+        piece_type: chess.PieceType,
+        color: chess.Color
+    ) -> int:
+    """Returns the index of the plane for the given piece. White's pieces are in planes 0 to 5, and black's in 6 to 11."""
+    return piece_type - 1 + (0 if color == chess.WHITE else 6)
+
+class PieceSquareTables():
+    """A set of piece-square tables, with a table for the start of the game and one for the end.
+
+    `start` and `end` map each piece type and side to a list of 64 scores, like `{(chess.KNIGHT, chess.WHITE): [...]}`.
+    Pieces that aren't in `end` use their start table at the end of the game too, and pieces that aren't in either score 0.
+
+    The score of a piece is `start + phase * (end - start)`, where `phase` goes from 0 at the start of the game to 1 at the end.
+    Each row of a batch can have its own phase, as they can be different positions."""
+    def __init__(
+            self: typing.Self,
+            start: dict[tuple[chess.PieceType, chess.Color], typing.Sequence[float]],
+            end: dict[tuple[chess.PieceType, chess.Color], typing.Sequence[float]] | None = None
+        ) -> None:
+        if end is None:
+            end = {}
+
+        # One column for the start tables and one for the end tables, so both are looked up by the same product.
+        self.tables = numpy.zeros((FEATURES, 2), dtype=numpy.float64)
+
+        for (piece_type, color), table in start.items():
+            index = plane(piece_type, color) * 64
+            self.tables[index:index + 64, 0] = table
+            self.tables[index:index + 64, 1] = end.get((piece_type, color), table)
+
+        for (piece_type, color), table in end.items():
+            if (piece_type, color) not in start:
+                raise ValueError(f"There's an end table for {chess.piece_name(piece_type)} but no start table.")
+
+    def encode_positions(
+            self: typing.Self,
+            boards: typing.Sequence[chess.Board]
+        ) -> numpy.ndarray:
+        """Returns the piece planes of each board as a row of 768 zeros and ones."""
+        # The 12 piece bitboards of each board, split into bytes so NumPy can unpack them into bits.
+        bitboards = numpy.array(
+            [
+                [board.pieces_mask(piece_type, color) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+                for board in boards
+            ],
+            dtype=numpy.uint64
+        ).reshape(len(boards), PLANES)
+
+        bits = numpy.unpackbits(bitboards.astype("<u8").view(numpy.uint8), bitorder="little")
+
+        return bits.reshape(len(boards), FEATURES).astype(numpy.float64)
+
+    def encode_moves(
+            self: typing.Self,
+            board: chess.Board,
+            moves: typing.Sequence[chess.Move]
+        ) -> numpy.ndarray:
+        """Returns a row for each move, with a one for the piece being moved on the square it's moving to.
+        A promoting pawn is still counted as a pawn, as it's the pawn that moves to the square."""
+        planes = numpy.zeros((len(moves), FEATURES), dtype=numpy.float64)
+
+        columns = [
+            plane(board.piece_type_at(move.from_square), board.turn) * 64 + move.to_square
+            for move in moves
+        ]
+        planes[numpy.arange(len(moves)), columns] = 1
+
+        return planes
+
+    def lookup(
+            self: typing.Self,
+            planes: numpy.ndarray
+        ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Returns the start and end scores of each row of planes."""
+        scores = planes @ self.tables
+        return scores[:, 0], scores[:, 1]
+
+    def interpolate(
+            self: typing.Self,
+            start: numpy.ndarray,
+            end: numpy.ndarray,
+            phase: float | numpy.ndarray
+        ) -> numpy.ndarray:
+        """Returns the scores between the start and end scores for the given phase."""
+        return start + phase * (end - start)
+
+    def score_positions(
+            self: typing.Self,
+            boards: typing.Sequence[chess.Board],
+            phase: float | numpy.ndarray
+        ) -> numpy.ndarray:
+        """Returns the total piece-square score of each board, where white's and black's pieces both count positively.
+        To get a score from one side's point of view, give the other side's tables negative scores."""
+        return self.interpolate(*self.lookup(self.encode_positions(boards)), phase)
+
+    def score_moves(
+            self: typing.Self,
+            board: chess.Board,
+            moves: typing.Sequence[chess.Move],
+            phase: float | numpy.ndarray
+        ) -> numpy.ndarray:
+        """Returns the score of the square each move moves its piece to, for the side to move."""
+        return self.interpolate(*self.lookup(self.encode_moves(board, moves)), phase)
+
+#############################################################################################################
+#############################################################################################################
+#############################################################################################################
+
+def _colon_three_tables(bot: type) -> PieceSquareTables:
+    """Returns the tables `:3` rates the ending location of its moves with, see `colon_three.rate_ending_location`."""
+    start = {}
+    end = {}
+
+    for color, prefix in ((chess.WHITE, "WHITE"), (chess.BLACK, "BLACK")):
+        for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
+            start[piece_type, color] = getattr(bot, f"{prefix}_PIECE_TABLE_{chess.piece_name(piece_type).upper()}")
+
+        # Only the pawn and king tables change between the start and the end of the game.
+        for piece_type in (chess.PAWN, chess.KING):
+            start[piece_type, color] = getattr(bot, f"{prefix}_PIECE_TABLE_{chess.piece_name(piece_type).upper()}_START")
+            end[piece_type, color] = getattr(bot, f"{prefix}_PIECE_TABLE_{chess.piece_name(piece_type).upper()}_END")
+
+    return PieceSquareTables(start, end)
+
+def _owobot_v3_tables(bot: type) -> PieceSquareTables:
+    """Returns the tables `owobot_v3` scores the ending location of its moves with, see `OwObot_v3.rank_ending_piece_location`.
+    Both sides use the same tables, and the pawns and kings only use their start tables, the same as the bot."""
+    tables = {
+        chess.PAWN: bot.PIECE_TABLE_PAWN_START,
+        chess.KNIGHT: bot.PIECE_TABLE_KNIGHT,
+        chess.BISHOP: bot.PIECE_TABLE_BISHOP,
+        chess.ROOK: bot.PIECE_TABLE_ROOK,
+        chess.QUEEN: bot.PIECE_TABLE_QUEEN,
+        chess.KING: bot.PIECE_TABLE_KING_START
+    }
+
+    return PieceSquareTables({(piece_type, color): table for piece_type, table in tables.items() for color in chess.COLORS})
+
+def main():
+    """Checks that the tables give the same scores as the piece tables of `:3` and `owobot_v3`, and times them against the bots rating one move at a time."""
+    import base
+    import bitboards
+
+    colon_three = base.get_bot(":3")({})
+    owobot = base.get_bot("owobot_v3")({})
+
+    colon_three_tables = _colon_three_tables(type(colon_three))
+    owobot_tables = _owobot_v3_tables(type(owobot))
+
+    positions = [(board, list(board.legal_moves)) for board in bitboards._benchmark_positions()]
+    positions = [(board, moves) for board, moves in positions if len(moves) != 0]
+
+    def colon_three_single(board, moves):
+        colon_three.bot_turn = board.turn
+        return [colon_three.rate_ending_location(board, move) for move in moves]
+
+    def colon_three_batch(board, moves):
+        return colon_three_tables.score_moves(board, moves, colon_three.PIECE_TABLE_VARIATION[board.occupied.bit_count()]).tolist()
+
+    def owobot_single(board, moves):
+        return [owobot.rank_ending_piece_location(board, move) for move in moves]
+
+    def owobot_batch(board, moves):
+        remaining_pieces = (board.occupied & ~board.pawns & ~board.kings).bit_count()
+
+        start, end = owobot_tables.lookup(owobot_tables.encode_moves(board, moves))
+        blended = (remaining_pieces / 14) * start + ((14 - remaining_pieces) / 14) * end
+
+        return [
+            (blended_score if board.piece_type_at(move.from_square) in (chess.PAWN, chess.KING) else start_score) / 10
+            for move, start_score, blended_score in zip(moves, start.tolist(), blended.tolist())
+        ]
+
+    comparisons = [
+        (":3", colon_three_single, colon_three_batch),
+        ("owobot_v3", owobot_single, owobot_batch)
+    ]
+
+    moves_total = sum(len(moves) for _, moves in positions)
+
+    print(f"Microseconds per position, best of 5, over {len(positions)} positions with {moves_total} moves.\n")
+    print(f"{'Bot'.ljust(12)} {'Bot'.rjust(10)} {'pst'.rjust(10)} {'Speedup'.rjust(10)}")
+
+    for name, single_function, batch_function in comparisons:
+        for board, moves in positions:
+            if single_function(board, moves) != batch_function(board, moves):
+                raise AssertionError(f"The tables for {name} give different scores than the bot for {board.fen()}")
+
+        single_time = min(timeit.repeat(lambda: [single_function(board, moves) for board, moves in positions], number=10, repeat=5)) / 10 / len(positions) * 1e6
+        batch_time = min(timeit.repeat(lambda: [batch_function(board, moves) for board, moves in positions], number=10, repeat=5)) / 10 / len(positions) * 1e6
+
+        print(f"{name.ljust(12)} {single_time:10.2f} {batch_time:10.2f} {single_time / batch_time:9.2f}x")
+
+if __name__ == "__main__":
+    main()
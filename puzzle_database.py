@@ -0,0 +1,530 @@
+import array
+import bisect
+import csv
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import typing
+
+try:
+    import zstandard
+except ImportError:
+    # Only needed for reading the compressed database.
+    zstandard = None
+
+CSV_PATH = os.path.join("data", "lichess_db_puzzle.csv") # Sourced from https://database.lichess.org/#puzzles
+DATABASE_PATH = os.path.join("data", "lichess_db_puzzle.sqlite")
+
+# The compressed CSV, as it's downloaded from Lichess. This is read straight from the archive if the CSV isn't there.
+ZST_PATH = os.path.join("data", "lichess_db_puzzle.csv.zst")
+
+# Bump this whenever the layout of the database changes, so old databases get rebuilt.
+SCHEMA_VERSION = 2
+
+# The width of each rating bucket, in rating points.
+BUCKET_SIZE = 100
+
+# The number of rows inserted at once while importing.
+BATCH_SIZE = 10_000
+
+# Every puzzle is stored in the same form as its row in the CSV, with the rating also stored as a number
+# and the position being the number of the row, starting at 1 for the first puzzle.
+# `puzzle_themes` is the inverted index of the themes, with a row for every theme of every puzzle.
+# `strata` has the positions of the puzzles with each theme in each rating bucket packed into an array, which is what sampling picks from.
+# Theme 0 in `strata` is every puzzle, no matter the theme.
+SCHEMA = """
+CREATE TABLE info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE puzzles (
+    position INTEGER PRIMARY KEY,
+    puzzle_id TEXT NOT NULL,
+    fen TEXT NOT NULL,
+    moves TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    rating_deviation TEXT NOT NULL,
+    popularity TEXT NOT NULL,
+    plays TEXT NOT NULL,
+    themes TEXT NOT NULL,
+    game_url TEXT NOT NULL,
+    opening_tags TEXT NOT NULL
+);
+CREATE TABLE themes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE puzzle_themes (
+    theme INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (theme, position)
+) WITHOUT ROWID;
+CREATE TABLE strata (
+    theme INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (theme, bucket)
+) WITHOUT ROWID;
+"""
+
+# Made after importing, as that's a lot quicker than keeping them up to date during it.
+INDEXES = """
+CREATE UNIQUE INDEX puzzles_by_id ON puzzles (puzzle_id);
+CREATE INDEX puzzles_by_bucket ON puzzles (bucket, position);
+"""
+
+PUZZLE_COLUMNS = "puzzle_id, fen, moves, rating, rating_deviation, popularity, plays, themes, game_url, opening_tags"
+
+def bucket_of(rating: int) -> int:
+    """Returns the rating bucket a rating is in, so with a bucket size of 100 a rating of 1550 is in bucket 15."""
+    return rating // BUCKET_SIZE
+
+def _pack(positions: array.array) -> bytes:
+    """Packs an array of positions into bytes to be stored in the strata table, always little-endian so the database works on any machine."""
+    if sys.byteorder == "big":
+        positions = array.array("I", positions)
+        positions.byteswap()
+
+    return positions.tobytes()
+
+def _unpack(packed: bytes) -> array.array:
+    """Unpacks an array of positions packed by `_pack`."""
+    positions = array.array("I")
+    positions.frombytes(packed)
+
+    if sys.byteorder == "big":
+        positions.byteswap()
+
+    return positions
+
+def _to_row(record: tuple) -> tuple[str]:
+    """Turns a record from the puzzles table back into the row it was in the CSV."""
+    return (record[0], record[1], record[2], str(record[3]), *record[4:])
+
+class PuzzleStore():
+    """The puzzles from the Lichess puzzle database, imported into an SQLite database with indexes on the puzzle id, themes, and rating buckets.
+
+    Puzzles are returned as tuples of strings in the same form as the rows of the CSV, so
+    `puzzle_id, fen, moves, rating, rating_deviation, popularity, plays, themes, game_url, opening_tags`.
+    Use `load_store` to get one, instead of making it directly."""
+    def __init__(
+            self: typing.Self,
+            connection: sqlite3.Connection
+        ) -> None:
+        self.connection = connection
+
+        self.size = int(self.info("size"))
+        self.theme_ids = dict(self.connection.execute("SELECT name, id FROM themes"))
+
+        # The strata that have been read so far, by theme and bucket.
+        self.strata = {} # type: dict[tuple[str, int], array.array]
+
+    def __len__(self: typing.Self) -> int:
+        return self.size
+
+    def info(
+            self: typing.Self,
+            key: str
+        ) -> str | None:
+        """Returns a value from the info table, like the schema version or the signature of the CSV it was imported from."""
+        record = self.connection.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return None if record is None else record[0]
+
+    def themes(self: typing.Self) -> list[str]:
+        """Returns the name of every theme in the database, in alphabetical order."""
+        return sorted(self.theme_ids)
+
+    def get(
+            self: typing.Self,
+            puzzle_id: str
+        ) -> tuple[str] | None:
+        """Returns the puzzle with the given id, or None if there isn't one."""
+        record = self.connection.execute(f"SELECT {PUZZLE_COLUMNS} FROM puzzles WHERE puzzle_id = ?", (puzzle_id,)).fetchone()
+        return None if record is None else _to_row(record)
+
+    def get_position(
+            self: typing.Self,
+            position: int
+        ) -> tuple[str] | None:
+        """Returns the puzzle at the given position, where 1 is the first puzzle in the CSV, or None if the position is out of range."""
+        record = self.connection.execute(f"SELECT {PUZZLE_COLUMNS} FROM puzzles WHERE position = ?", (position,)).fetchone()
+        return None if record is None else _to_row(record)
+
+    def _filter(
+            self: typing.Self,
+            theme: str,
+            bucket: int | None
+        ) -> tuple[str, list] | None:
+        """Returns the joins and conditions that limit the puzzles table to a theme and rating bucket, and the parameters for them.
+        An empty theme or a bucket of None means any theme or bucket. If the theme doesn't exist None is returned, as no puzzles can match."""
+        joins = ""
+        conditions = ["puzzles.position > ?"]
+        parameters = []
+
+        if theme != "":
+            if theme not in self.theme_ids:
+                return None
+
+            joins = "JOIN puzzle_themes ON puzzle_themes.position = puzzles.position AND puzzle_themes.theme = ?"
+            parameters.append(self.theme_ids[theme])
+
+        if bucket is not None:
+            conditions.append("puzzles.bucket = ?")
+
+        return f"{joins} WHERE {' AND '.join(conditions)}", parameters
+
+    def count(
+            self: typing.Self,
+            theme: str = "",
+            bucket: int | None = None
+        ) -> int:
+        """Returns the number of puzzles with the given theme in the given rating bucket. An empty theme or a bucket of None means any theme or bucket."""
+        if theme == "" and bucket is None:
+            return self.size
+
+        if bucket is None:
+            return sum(len(self.stratum(theme, bucket)) for bucket in self.buckets(theme))
+
+        return len(self.stratum(theme, bucket))
+
+    def iterate(
+            self: typing.Self,
+            theme: str = "",
+            bucket: int | None = None,
+            after: int = 0
+        ) -> typing.Generator[tuple[int, tuple[str]], None, None]:
+        """Yields the position and row of every puzzle with the given theme in the given rating bucket, in the order they're in the CSV.
+        Only puzzles after the position `after` are included, so passing the last position yielded carries on from there."""
+        query = self._filter(theme, bucket)
+
+        if query is None:
+            return
+
+        clauses, parameters = query
+        parameters.append(after)
+        if bucket is not None:
+            parameters.append(bucket)
+
+        cursor = self.connection.execute(f"SELECT puzzles.position, {PUZZLE_COLUMNS} FROM puzzles {clauses} ORDER BY puzzles.position", parameters)
+
+        for record in cursor:
+            yield record[0], _to_row(record[1:])
+
+    def buckets(
+            self: typing.Self,
+            theme: str = ""
+        ) -> list[int]:
+        """Returns every rating bucket with at least one puzzle with the given theme, from lowest to highest. An empty theme means any theme."""
+        theme_id = 0 if theme == "" else self.theme_ids.get(theme)
+
+        if theme_id is None:
+            return []
+
+        return [bucket for (bucket,) in self.connection.execute("SELECT bucket FROM strata WHERE theme = ? ORDER BY bucket", (theme_id,))]
+
+    def stratum(
+            self: typing.Self,
+            theme: str,
+            bucket: int
+        ) -> array.array:
+        """Returns the positions of the puzzles with the given theme in the given rating bucket, in the order they're in the CSV. An empty theme means any theme.
+        Each stratum is only read from the database once, and should not be changed."""
+        key = (theme, bucket)
+
+        if key not in self.strata:
+            theme_id = 0 if theme == "" else self.theme_ids.get(theme)
+            record = self.connection.execute("SELECT positions FROM strata WHERE theme = ? AND bucket = ?", (theme_id, bucket)).fetchone()
+
+            self.strata[key] = array.array("I") if record is None else _unpack(record[0])
+
+        return self.strata[key]
+
+    def sample(
+            self: typing.Self,
+            amount: int,
+            theme: str = "",
+            seed: str | int | float | bytes | bytearray | None = None
+        ) -> list[tuple[str]]:
+        """Returns `amount` different puzzles with the given theme, picked uniformly at random. If there are fewer puzzles than that every one is returned, in a random order.
+        The same seed always picks the same puzzles from the same database."""
+        generator = random.Random(seed)
+
+        if theme == "":
+            positions = generator.sample(range(1, self.size + 1), min(amount, self.size))
+        else:
+            strata = [self.stratum(theme, bucket) for bucket in self.buckets(theme)]
+
+            # The index each stratum ends at, as if they were one list, so a pick can be found in the right stratum without joining them.
+            ends = []
+            for stratum in strata:
+                ends.append((ends[-1] if ends else 0) + len(stratum))
+
+            total = ends[-1] if ends else 0
+            positions = []
+
+            for pick in generator.sample(range(total), min(amount, total)):
+                index = bisect.bisect_right(ends, pick)
+                positions.append(strata[index][pick - (ends[index - 1] if index else 0)])
+
+        return [self.get_position(position) for position in positions]
+
+    def sample_stratified(
+            self: typing.Self,
+            per_bucket: int,
+            themes: typing.Sequence[str] = ("",),
+            buckets: typing.Sequence[int] | None = None,
+            seed: str | int | float | bytes | bytearray | None = None
+        ) -> list[tuple[str]]:
+        """Returns up to `per_bucket` puzzles picked at random from each rating bucket of each of the given themes, shuffled together.
+        An empty theme means any theme, and if `buckets` is None every bucket with a puzzle in it is used.
+
+        Each bucket has the same number of puzzles, unless it doesn't have enough, so the results of bots aren't skewed by there being more puzzles around one rating.
+        Puzzles that are in more than one of the themes are only included once. The same seed always picks the same puzzles from the same database."""
+        generator = random.Random(seed)
+
+        # A dictionary keeps the order the positions were picked in, which keeps the shuffle the same for the same seed.
+        positions = {} # type: dict[int, None]
+
+        for theme in themes:
+            for bucket in (self.buckets(theme) if buckets is None else buckets):
+                stratum = self.stratum(theme, bucket)
+
+                for position in generator.sample(stratum, min(per_bucket, len(stratum))):
+                    positions[position] = None
+
+        order = list(positions)
+        generator.shuffle(order)
+
+        return [self.get_position(position) for position in order]
+
+    def close(self: typing.Self) -> None:
+        self.connection.close()
+
+def _connect(database_path: str) -> sqlite3.Connection:
+    """Opens the database. The puzzle programs read puzzles from a different thread to the one that loaded them, so the connection can be used from any thread."""
+    return sqlite3.connect(database_path, check_same_thread=False)
+
+def import_rows(
+        connection: sqlite3.Connection,
+        rows: typing.Iterable[list[str]]
+    ) -> int:
+    """Imports the rows of the CSV into an empty database, returning the number of puzzles imported.
+    The rows are read one at a time, so they can come straight from a file without the whole file being in memory."""
+    theme_ids = {} # type: dict[str, int]
+
+    position = 0
+    puzzles = []
+    puzzle_themes = []
+
+    def flush():
+        connection.executemany("INSERT INTO puzzles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", puzzles)
+        connection.executemany("INSERT INTO puzzle_themes VALUES (?, ?)", puzzle_themes)
+        puzzles.clear()
+        puzzle_themes.clear()
+
+    for row in rows:
+        # The header.
+        if row[0] == "PuzzleId":
+            continue
+
+        puzzle_id, fen, moves, rating, rating_deviation, popularity, plays, themes, game_url, opening_tags = row
+
+        position += 1
+        rating = int(rating)
+        puzzles.append((position, puzzle_id, fen, moves, rating, bucket_of(rating), rating_deviation, popularity, plays, themes, game_url, opening_tags))
+
+        for theme in themes.split(" "):
+            if theme == "":
+                continue
+
+            if theme not in theme_ids:
+                theme_ids[theme] = len(theme_ids) + 1
+
+            puzzle_themes.append((theme_ids[theme], position))
+
+        if len(puzzles) >= BATCH_SIZE:
+            flush()
+
+    flush()
+
+    connection.executemany("INSERT INTO themes VALUES (?, ?)", [(theme_id, name) for name, theme_id in theme_ids.items()])
+
+    return position
+
+def build_strata(connection: sqlite3.Connection) -> None:
+    """Fills in the strata table from the puzzles and their themes, one theme at a time so only one theme's positions are in memory at once."""
+    theme_ids = [0] + [theme_id for (theme_id,) in connection.execute("SELECT id FROM themes ORDER BY id")]
+
+    for theme_id in theme_ids:
+        if theme_id == 0:
+            cursor = connection.execute("SELECT bucket, position FROM puzzles ORDER BY position")
+        else:
+            cursor = connection.execute(
+                "SELECT puzzles.bucket, puzzles.position FROM puzzle_themes JOIN puzzles ON puzzles.position = puzzle_themes.position"
+                " WHERE puzzle_themes.theme = ? ORDER BY puzzle_themes.position",
+                (theme_id,)
+            )
+
+        strata = {} # type: dict[int, array.array]
+        for bucket, position in cursor:
+            if bucket not in strata:
+                strata[bucket] = array.array("I")
+
+            strata[bucket].append(position)
+
+        connection.executemany("INSERT INTO strata VALUES (?, ?, ?)", [
+            (theme_id, bucket, _pack(positions))
+            for bucket, positions in strata.items()
+        ])
+
+def build_database(
+        rows: typing.Iterable[list[str]],
+        database_path: str,
+        signature: str,
+        source_path: str
+    ) -> None:
+    """Imports the rows of the CSV into a new database at the given path, replacing the database that's there if there is one.
+    The signature and the path of the file the rows came from are saved with it, so `load_store` can tell when the file changes."""
+    # Build into a temporary file first, so stopping partway through doesn't leave a broken database.
+    temporary_path = f"{database_path}.{os.getpid()}.tmp"
+
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    connection = sqlite3.connect(temporary_path)
+    try:
+        # The temporary file is thrown away if anything goes wrong, so there's no need for a journal.
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SCHEMA)
+
+        size = import_rows(connection, rows)
+
+        connection.executescript(INDEXES)
+        build_strata(connection)
+        connection.executemany("INSERT INTO info VALUES (?, ?)", [
+            ("schema", str(SCHEMA_VERSION)),
+            ("signature", signature),
+            ("source", source_path),
+            ("size", str(size))
+        ])
+        connection.commit()
+        connection.close()
+
+        os.replace(temporary_path, database_path)
+    except BaseException:
+        connection.close()
+
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+        raise
+
+def _open_existing(database_path: str) -> PuzzleStore | None:
+    """Opens the database if it exists and uses the current schema, otherwise returns None."""
+    if not os.path.isfile(database_path):
+        return None
+
+    connection = _connect(database_path)
+
+    try:
+        store = PuzzleStore(connection)
+
+        if store.info("schema") == str(SCHEMA_VERSION):
+            return store
+    except (sqlite3.DatabaseError, TypeError):
+        # Not a database, or one from before the info table had everything in it.
+        pass
+
+    connection.close()
+    return None
+
+def _read_compressed(path: str) -> typing.Generator[list[str], None, None]:
+    """Yields the rows of a CSV compressed with Zstandard, decompressing it as it's read."""
+    with open(path, "rb") as file_read:
+        reader = zstandard.ZstdDecompressor().stream_reader(file_read, read_across_frames=True)
+
+        yield from csv.reader(io.TextIOWrapper(reader, encoding="utf-8", newline=""))
+
+def _read_csv(path: str) -> typing.Generator[list[str], None, None]:
+    """Yields the rows of a CSV."""
+    with open(path, "r", newline="", encoding="utf-8") as file_read:
+        yield from csv.reader(file_read)
+
+def read_rows(path: str) -> typing.Iterator[list[str]]:
+    """Returns an iterator over the rows of the puzzle CSV at the given path, which is read as it goes so the whole file is never in memory.
+    If the path ends in `.zst` it's decompressed as it's read, which needs the zstandard library, so the decompressed CSV never has to be on the disk."""
+    if not path.endswith(".zst"):
+        return _read_csv(path)
+
+    if zstandard is None:
+        raise ImportError(f"Reading `{path}` needs the zstandard library, which can be installed via running `pip install zstandard` in the terminal. The file can also be decompressed into a `.csv` instead.")
+
+    return _read_compressed(path)
+
+def _signature(path: str) -> str | None:
+    """Returns a string that changes whenever the file at the path changes, along with the settings that change the database, or None if the file doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return json.dumps([SCHEMA_VERSION, BUCKET_SIZE, stat.st_mtime_ns, stat.st_size])
+
+def load_store(
+        csv_path: str = CSV_PATH,
+        database_path: str = DATABASE_PATH,
+        zst_path: str = ZST_PATH
+    ) -> PuzzleStore:
+    """Loads the puzzle database, importing the puzzles first if there isn't one yet or if the file it was imported from has changed since.
+    New databases are imported from the CSV if it exists, otherwise they're read straight from the compressed CSV.
+
+    An existing database is kept as long as the file it was imported from hasn't changed, even if the other file is there too.
+    If that file is gone it's kept as it is, so the CSV and the compressed CSV can both be deleted after importing the puzzles.
+    It's also kept if the file it was imported from can't be read, like a compressed CSV without the zstandard library."""
+    # The files that exist, in the order they're used to import a new database.
+    sources = [] # type: list[tuple[str, str]]
+
+    for path in (csv_path, zst_path):
+        signature = _signature(path)
+
+        if signature is not None:
+            sources.append((os.path.abspath(path), signature))
+
+    store = _open_existing(database_path)
+
+    if store is not None:
+        source_path = store.info("source")
+        signature = store.info("signature")
+
+        if source_path is None:
+            # Databases from before the source was saved, which were imported from whichever file came first.
+            source = sources[0] if len(sources) != 0 else None
+        else:
+            source = (source_path, _signature(source_path)) if os.path.isfile(source_path) else None
+
+        if source is None or source[1] == signature:
+            return store
+
+        if source[0].endswith(".zst") and zstandard is None:
+            print(f"`{source[0]}` has changed since the puzzles were imported, but it can't be read without the zstandard library, so the puzzles from before are used.")
+            return store
+
+        store.close()
+        sources = [source]
+
+    if len(sources) == 0:
+        raise FileNotFoundError(f"None of `{csv_path}`, `{zst_path}`, or `{database_path}` were found.")
+
+    source_path, signature = sources[0]
+    rows = read_rows(source_path)
+
+    print(f"Importing the puzzles from `{source_path}`, this only needs to happen once and may take a few minutes.")
+
+    build_database(rows, database_path, signature, source_path)
+
+    return PuzzleStore(_connect(database_path))
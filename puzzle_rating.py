@@ -0,0 +1,188 @@
+import math
+import typing
+
+# Glicko-2 puzzle ratings for the bots, updated after every puzzle.
+# See http://www.glicko.net/glicko/glicko2.pdf for the rating system, each puzzle is treated as a rating period with a single game against the puzzle.
+
+# The Glicko-2 scale, ratings and deviations are divided by this to convert them to the scale the calculations are done on.
+SCALE = 400 / math.log(10)
+
+DEFAULT_RATING = 1500.0
+DEFAULT_DEVIATION = 350.0
+
+# A bot's strength doesn't change partway through a run, so this is a lot lower than the 0.06 suggested for players.
+# With 0.06 the deviation can't get much below 70, as every puzzle adds back some of the uncertainty it removes.
+DEFAULT_VOLATILITY = 0.01
+
+# How much the volatility can change, the paper suggests between 0.3 and 1.2. Lower values keep the volatility from jumping after an unlikely result.
+DEFAULT_TAU = 0.3
+
+# The deviation used for puzzles that don't have one, which is around what most puzzles in the Lichess database have.
+DEFAULT_PUZZLE_DEVIATION = 75.0
+
+# The deviation a rating needs to be under to be considered done.
+DEFAULT_TARGET_DEVIATION = 50.0
+
+# The tolerance when solving for the new volatility.
+CONVERGENCE = 0.000001
+
+class Glicko2Rating():
+    """A single Glicko-2 rating, with the rating, deviation, and volatility in the usual Glicko scale, so 1500 is the default rating."""
+    def __init__(
+            self: typing.Self,
+            rating: float = DEFAULT_RATING,
+            deviation: float = DEFAULT_DEVIATION,
+            volatility: float = DEFAULT_VOLATILITY,
+            tau: float = DEFAULT_TAU
+        ) -> None:
+        self.rating = rating
+        self.deviation = deviation
+        self.volatility = volatility
+        self.tau = tau
+
+        self.played = 0
+        self.score = 0.0
+
+    def expected_score(
+            self: typing.Self,
+            rating: float,
+            deviation: float
+        ) -> float:
+        """Returns the expected score against an opponent, or the chance of solving a puzzle, with the given rating and deviation."""
+        mu = (self.rating - DEFAULT_RATING) / SCALE
+        mu_opponent = (rating - DEFAULT_RATING) / SCALE
+        g = 1 / math.sqrt(1 + 3 * (deviation / SCALE) ** 2 / math.pi ** 2)
+
+        return 1 / (1 + math.exp(-g * (mu - mu_opponent)))
+
+    def _new_volatility(
+            self: typing.Self,
+            phi: float,
+            variance: float,
+            delta: float
+        ) -> float:
+        """Solves for the new volatility with the Illinois algorithm, which is step 5 of the paper."""
+        a = math.log(self.volatility ** 2)
+
+        def f(x: float) -> float:
+            exp_x = math.exp(x)
+            return exp_x * (delta ** 2 - phi ** 2 - variance - exp_x) / (2 * (phi ** 2 + variance + exp_x) ** 2) - (x - a) / self.tau ** 2
+
+        upper = a
+
+        if delta ** 2 > phi ** 2 + variance:
+            lower = math.log(delta ** 2 - phi ** 2 - variance)
+        else:
+            k = 1
+            while f(a - k * self.tau) < 0:
+                k += 1
+            lower = a - k * self.tau
+
+        f_upper = f(upper)
+        f_lower = f(lower)
+
+        while abs(lower - upper) > CONVERGENCE:
+            middle = upper + (upper - lower) * f_upper / (f_lower - f_upper)
+            f_middle = f(middle)
+
+            if f_middle * f_lower <= 0:
+                upper = lower
+                f_upper = f_lower
+            else:
+                f_upper /= 2
+
+            lower = middle
+            f_lower = f_middle
+
+        return math.exp(upper / 2)
+
+    def update(
+            self: typing.Self,
+            rating: float,
+            deviation: float,
+            score: float
+        ) -> None:
+        """Updates the rating after a single game against an opponent with the given rating and deviation.
+        `score` is 1 for a win, or a solved puzzle, 0 for a loss, or a failed puzzle, and 0.5 for a draw."""
+        mu = (self.rating - DEFAULT_RATING) / SCALE
+        phi = self.deviation / SCALE
+
+        mu_opponent = (rating - DEFAULT_RATING) / SCALE
+        g = 1 / math.sqrt(1 + 3 * (deviation / SCALE) ** 2 / math.pi ** 2)
+        expected = 1 / (1 + math.exp(-g * (mu - mu_opponent)))
+
+        variance = 1 / (g ** 2 * expected * (1 - expected))
+        delta = variance * g * (score - expected)
+
+        self.volatility = self._new_volatility(phi, variance, delta)
+
+        phi_star = math.sqrt(phi ** 2 + self.volatility ** 2)
+        new_phi = 1 / math.sqrt(1 / phi_star ** 2 + 1 / variance)
+        new_mu = mu + new_phi ** 2 * g * (score - expected)
+
+        self.rating = new_mu * SCALE + DEFAULT_RATING
+        self.deviation = new_phi * SCALE
+
+        self.played += 1
+        self.score += score
+
+    def interval(self: typing.Self) -> tuple[float, float]:
+        """Returns the lower and upper ends of the 95% confidence interval of the rating."""
+        return self.rating - 1.959964 * self.deviation, self.rating + 1.959964 * self.deviation
+
+class PuzzleRater():
+    """Estimates a bot's puzzle rating from the results of the puzzles it plays, overall and for each theme.
+    Every theme of a puzzle gets its own rating updated along with the overall one, so the theme ratings come from the same puzzles.
+
+    Once the overall deviation is below `target_deviation` the rating is considered accurate enough, and `done` returns True,
+    which can be used to stop a run early instead of playing a fixed number of puzzles."""
+    def __init__(
+            self: typing.Self,
+            target_deviation: float = DEFAULT_TARGET_DEVIATION,
+            volatility: float = DEFAULT_VOLATILITY,
+            tau: float = DEFAULT_TAU
+        ) -> None:
+        self.target_deviation = target_deviation
+        self.volatility = volatility
+        self.tau = tau
+
+        self.overall = Glicko2Rating(volatility=volatility, tau=tau)
+        self.themes = {} # type: dict[str, Glicko2Rating]
+
+    def add(
+            self: typing.Self,
+            result: dict
+        ) -> None:
+        """Adds the result of a puzzle, from `puzzle_runner.solve_puzzle` or the puzzle programs.
+        Uses the "correct", "rating", and "themes" of the result, along with "rating_deviation" if it's there."""
+        score = 1.0 if result["correct"] else 0.0
+        deviation = result.get("rating_deviation", DEFAULT_PUZZLE_DEVIATION)
+
+        self.overall.update(result["rating"], deviation, score)
+
+        for theme in result["themes"]:
+            if theme == "":
+                continue
+
+            if theme not in self.themes:
+                self.themes[theme] = Glicko2Rating(volatility=self.volatility, tau=self.tau)
+
+            self.themes[theme].update(result["rating"], deviation, score)
+
+    def done(self: typing.Self) -> bool:
+        """Returns a boolean for whether the overall deviation is below the target deviation."""
+        return self.overall.deviation < self.target_deviation
+
+    def lines(self: typing.Self) -> list[str]:
+        """Returns the lines with the overall rating, followed by the rating for each theme from highest to lowest."""
+        lines = [
+            f"Puzzle rating: {round(self.overall.rating)} ± {round(1.959964 * self.overall.deviation)} (deviation {round(self.overall.deviation, 1)}, {self.overall.played} puzzles)",
+            "",
+            "Theme ratings:"
+        ]
+        lines.extend([
+            f"- {name}: {round(rating.rating)} ± {round(1.959964 * rating.deviation)} ({rating.played} puzzles)"
+            for name, rating in sorted(self.themes.items(), key=lambda item: item[1].rating, reverse=True)
+        ])
+
+        return lines
@@ -0,0 +1,303 @@
+import argparse
+import itertools
+import json
+import os
+import time
+import typing
+
+import chess
+
+import base
+import puzzle_database
+import puzzle_rating
+
+# The number of puzzles sent to a worker at once. Most bots solve a puzzle quicker than it takes to send it to another process, so they're sent in chunks.
+CHUNK_SIZE = 16
+
+def solve_puzzle(
+        bot: base.ChessBot,
+        puzzle: tuple[str]
+    ) -> dict:
+    """Has a new instance of the bot play through a puzzle, the same way the puzzle programs do but without a board to show it on.
+    A move is correct if it's the move in the solution or if it checkmates, and the first incorrect move fails the puzzle.
+
+    Returns whether the bot solved it under "correct", the "puzzle_id", "rating", "rating_deviation", and "themes" of the puzzle,
+    and the number of seconds it took under "time"."""
+    puzzle_id, fen, moves, rating, rating_deviation, popularity, plays, themes, game_url, opening_tags = puzzle
+
+    start = time.perf_counter()
+
+    bot_data = {}
+    bot_obj = bot(bot_data) # type: base.ChessBot
+
+    board = chess.Board(fen)
+    bot_side = not board.turn
+
+    correct = True
+
+    for correct_move_uci in moves.split(" "):
+        if board.turn != bot_side:
+            board.push(chess.Move.from_uci(correct_move_uci))
+            continue
+
+        bot_obj.load(bot_data)
+        move = bot_obj.turn(board.copy())
+        saved = bot_obj.save()
+        if saved is not None:
+            bot_data = saved
+
+        if move is None:
+            raise TypeError("The move played by the bot is None.")
+
+        if move.uci() == correct_move_uci:
+            board.push(move)
+            continue
+
+        # A different move is still correct if it checkmates, and then there's nothing left of the puzzle to play.
+        board.push(move)
+        correct = board.is_checkmate()
+        break
+
+    return {
+        "correct": correct,
+        "themes": themes.split(" "),
+        "rating": int(rating),
+        "rating_deviation": int(rating_deviation),
+        "puzzle_id": puzzle_id,
+        "time": time.perf_counter() - start
+    }
+
+def _solve_chunk(task: tuple[base.ChessBot, list[tuple[str]]]) -> list[dict]:
+    """Solves a chunk of puzzles. This is what gets run in the worker processes."""
+    bot, puzzles = task
+    return [solve_puzzle(bot, puzzle) for puzzle in puzzles]
+
+def run_puzzles(
+        bot: base.ChessBot,
+        puzzles: typing.Iterable[tuple[str]],
+        workers: int = 1,
+        chunk_size: int = CHUNK_SIZE
+    ) -> typing.Generator[dict, None, None]:
+    """Has the bot solve each of the given puzzles, and yields the result of each one from `solve_puzzle` as it finishes.
+    If more than one worker is used the puzzles are spread over a process pool in chunks of `chunk_size`, and the results are yielded in the order the chunks finish.
+    The puzzles are read as they're needed, so they can come straight from the database."""
+    puzzles = iter(puzzles)
+
+    def chunks():
+        while True:
+            chunk = list(itertools.islice(puzzles, chunk_size))
+
+            if len(chunk) == 0:
+                return
+
+            yield bot, chunk
+
+    for _, results in base.iterate_in_pool(_solve_chunk, chunks(), workers):
+        yield from results
+
+class PuzzleSummary():
+    """Keeps track of the results of a bulk puzzle run, and makes the progress lines and the summary at the end.
+    `amount` is the number of puzzles that were asked for, which the percentages in the summary are out of even if fewer were played.
+    The bot's puzzle rating is estimated from the same results with `rater`, see `puzzle_rating.PuzzleRater`."""
+    def __init__(
+            self: typing.Self,
+            amount: int,
+            rater: puzzle_rating.PuzzleRater | None = None
+        ) -> None:
+        self.amount = amount
+
+        if rater is None:
+            rater = puzzle_rating.PuzzleRater()
+
+        self.rater = rater
+
+        self.played = 0
+        self.correct = 0
+        self.correct_rating_sum = 0
+        self.incorrect_rating_sum = 0
+
+        self.highest_correct_rating = 0
+        self.highest_correct_id = None
+
+        self.lowest_incorrect_rating = float("inf")
+        self.lowest_incorrect_id = None
+
+        self.themes = {} # type: dict[str, dict[str, int]]
+
+    def add(
+            self: typing.Self,
+            result: dict
+        ) -> None:
+        """Adds the result of a puzzle, from `solve_puzzle` or the puzzle programs."""
+        self.played += 1
+        self.rater.add(result)
+
+        if result["correct"]:
+            self.correct += 1
+            self.correct_rating_sum += result["rating"]
+
+            if result["rating"] > self.highest_correct_rating:
+                self.highest_correct_rating = result["rating"]
+                self.highest_correct_id = result["puzzle_id"]
+        else:
+            self.incorrect_rating_sum += result["rating"]
+
+            if result["rating"] < self.lowest_incorrect_rating:
+                self.lowest_incorrect_rating = result["rating"]
+                self.lowest_incorrect_id = result["puzzle_id"]
+
+        for theme in result["themes"]:
+            if theme not in self.themes:
+                self.themes[theme] = {"played": 1, "correct": int(result["correct"])}
+            else:
+                self.themes[theme]["played"] += 1
+                if result["correct"]:
+                    self.themes[theme]["correct"] += 1
+
+    def progress(
+            self: typing.Self,
+            elapsed: float
+        ) -> str:
+        """Returns a line with the number of puzzles done, the time taken and left, and the number correct so far."""
+        done = self.played
+
+        return (
+            f"Done {done}/{self.amount} ({round(done / self.amount * 100, 2)}%) | Elapsed: {round(elapsed, 2)} | Remaining: {round(elapsed / done * (self.amount - done), 2)}"
+            f" | Correct: {self.correct} ({round(self.correct / done * 100, 2)}%), Incorrect: {done - self.correct} ({round((1 - self.correct / done) * 100, 2)}%)"
+        )
+
+    def lines(self: typing.Self) -> list[str]:
+        """Returns the lines of the summary, without the border around them."""
+        amount = self.amount
+        correct = self.correct
+
+        lines = [
+            f"Correct: {correct} ({round(correct / amount * 100, 2)}%)",
+            f"Incorrect: {amount - correct} ({round((1 - correct / amount) * 100, 2)}%)",
+            f"Average correct rating: {round(self.correct_rating_sum / (correct if correct != 0 else 1), 2)}",
+            f"Average incorrect rating: {round(self.incorrect_rating_sum / ((amount - correct) if correct != amount else 1), 2)}",
+            "",
+            "Highest rated correctly solved:",
+            f"- Rating: {self.highest_correct_rating}",
+            f"- Link: https://lichess.org/training/{self.highest_correct_id}",
+            "",
+            "Lowest rated incorrectly solved:",
+            f"- Rating: {self.lowest_incorrect_rating}",
+            f"- Link: https://lichess.org/training/{self.lowest_incorrect_id}",
+            "",
+            "Theme information:",
+        ]
+        lines.extend([
+            f"- {name}: {data['correct']}/{data['played']} ({round(data['correct'] / data['played'] * 100, 2)}%)"
+            for name, data in sorted(list(self.themes.items()), key=lambda a: a[1]['correct'] / a[1]['played'], reverse=True)
+        ])
+        lines.append("")
+        lines.extend(self.rater.lines())
+
+        return lines
+
+    def format(
+            self: typing.Self,
+            category: str = ""
+        ) -> list[str]:
+        """Returns the lines of the summary with a border of `#` around them, and the number of puzzles and the category in the top border."""
+        lines = self.lines()
+
+        max_length = len(max(lines, key=len))
+
+        out = [f" {self.amount} {'bulk' if category == '' else category} puzzles: ".center(max_length + 4, "#")]
+        out.extend(["# " + line.ljust(max_length) + " #" for line in lines])
+        out.append("#" * (max_length + 4))
+
+        return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Has a Chess bot solve puzzles from the Lichess puzzle database without the puzzle GUI, spread over a process pool.")
+    parser.add_argument("bot", help="The name of the bot to solve the puzzles.")
+    parser.add_argument("-n", "--amount", type=int, default=1000, help="The number of puzzles to solve.")
+    parser.add_argument("-c", "--category", default="", help="Only use puzzles with this theme, like `fork` or `mateIn2`.")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Pick the puzzles at random with this seed, instead of using the first puzzles in the database.")
+    parser.add_argument("--per-bucket", type=int, default=None, help=f"Pick this many random puzzles from every {puzzle_database.BUCKET_SIZE} point rating bucket instead of using `--amount`. Uses `--seed` if it's given, otherwise 0.")
+    parser.add_argument("-d", "--target-deviation", type=float, default=puzzle_rating.DEFAULT_TARGET_DEVIATION, help="Stop once the deviation of the bot's puzzle rating is below this, instead of playing every puzzle. Use 0 to always play every puzzle.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="The number of processes to use, defaults to the number of CPUs.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="The number of puzzles sent to a worker at once.")
+    parser.add_argument("-o", "--output", default=None, help="Write the result of each puzzle to this file as it finishes, one JSON object per line.")
+    parser.add_argument("--csv", default=puzzle_database.CSV_PATH, help="The Lichess puzzle CSV to import the puzzles from.")
+    parser.add_argument("--zst", default=puzzle_database.ZST_PATH, help="The compressed Lichess puzzle CSV, which is read if the CSV doesn't exist.")
+    parser.add_argument("--database", default=puzzle_database.DATABASE_PATH, help="The puzzle database made from the CSV.")
+    arguments = parser.parse_args()
+
+    if arguments.amount <= 0:
+        parser.error("the number of puzzles has to be at least 1")
+
+    if arguments.per_bucket is not None and arguments.per_bucket <= 0:
+        parser.error("the number of puzzles per bucket has to be at least 1")
+
+    bot = base.get_bot(arguments.bot)
+    workers = arguments.workers or os.cpu_count() or 1
+
+    store = puzzle_database.load_store(arguments.csv, arguments.database, arguments.zst)
+
+    output = None
+    if arguments.output is not None:
+        output = open(arguments.output, "w", encoding="utf-8")
+
+    try:
+        if arguments.per_bucket is not None:
+            puzzles = store.sample_stratified(
+                per_bucket = arguments.per_bucket,
+                themes = [arguments.category],
+                seed = 0 if arguments.seed is None else arguments.seed
+            )
+            amount = len(puzzles)
+        elif arguments.seed is not None:
+            puzzles = store.sample(arguments.amount, arguments.category, arguments.seed)
+            amount = arguments.amount
+        else:
+            puzzles = (puzzle for _, puzzle in itertools.islice(store.iterate(arguments.category), arguments.amount))
+            amount = arguments.amount
+
+        summary = PuzzleSummary(max(amount, 1), puzzle_rating.PuzzleRater(arguments.target_deviation))
+        increment = max(amount // 100, 1)
+        start = time.time()
+
+        results = run_puzzles(bot, puzzles, workers, arguments.chunk_size)
+
+        for result in results:
+            summary.add(result)
+
+            if output is not None:
+                output.write(json.dumps(result) + "\n")
+
+            if summary.played % increment == 0 or summary.played == amount:
+                print(summary.progress(time.time() - start))
+
+            if summary.rater.done() and summary.played < amount:
+                # Closing the generator cancels the puzzles that haven't been started yet.
+                results.close()
+
+                print(summary.progress(time.time() - start))
+                print(f"Stopping after {summary.played} puzzles, as the rating deviation is below {arguments.target_deviation}.\n")
+
+                # The percentages are out of the puzzles that were played.
+                summary.amount = summary.played
+                amount = summary.played
+                break
+    finally:
+        if output is not None:
+            output.close()
+
+        store.close()
+
+    if summary.played < amount or amount == 0:
+        print("Out of puzzles to solve!\n")
+
+    if summary.played == 0:
+        return
+
+    print()
+    for line in summary.format(arguments.category):
+        print(line)
+
+if __name__ == "__main__":
+    main()
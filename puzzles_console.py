@@ -8,7 +8,8 @@ import typing
 import threading
 import traceback
 import base
-import csv
+import puzzle_database
+import puzzle_runner
 import os
 import builtins
 import time
@@ -16,11 +17,15 @@ import re
 
 puzzle_data = []
 
-if not os.path.isfile("data/lichess_db_puzzle.csv"):
+has_database = os.path.isfile(puzzle_database.CSV_PATH) or os.path.isfile(puzzle_database.DATABASE_PATH)
+has_zst = os.path.isfile(puzzle_database.ZST_PATH)
+
+if not has_database and not has_zst:
     print()
     print("To have the bots solve puzzles you need to download the Lichess puzzle database.")
-    print("Once downloaded, extract the `.zst` file and put the resulting `.csv` into the `data` folder.")
-    print("The file should be named `lichess_db_puzzle.csv`.")
+    print("Once downloaded, put the `.zst` file into the `data` folder. It should be named `lichess_db_puzzle.csv.zst`.")
+    print("Reading the `.zst` file needs the zstandard library, which can be installed via running `pip install zstandard` in the terminal.")
+    print("Alternatively, extract the `.zst` file and put the resulting `.csv` into the `data` folder, which should be named `lichess_db_puzzle.csv`.")
     print("The puzzle database is intentionally not tracked by GitHub due to its size (around 800 MB with 4.8 million puzzles.)")
     print("The database download can be found here:")
     print("https://database.lichess.org/#puzzles")
@@ -31,6 +36,21 @@ if not os.path.isfile("data/lichess_db_puzzle.csv"):
         message = "The copy of the Lichess puzzle database used by this file to run the puzzles does not appear to exist.\nYou can find instructions in the terminal on how to download and use it."
     )
     exit()
+
+if not has_database and puzzle_database.zstandard is None:
+    print()
+    print("The Lichess puzzle database is still compressed, and the library used to read it has not been installed.")
+    print("The library can be installed via running `pip install zstandard` in the terminal.")
+    print("The library can be found here:")
+    print("https://pypi.org/project/zstandard/")
+    print("Alternatively, extract the `.zst` file and put the resulting `.csv` into the `data` folder.")
+    print()
+    
+    messagebox.showerror(
+        title = "Missing module",
+        message = "The zstandard module is needed to read the compressed puzzle database, please install it via running `pip install zstandard` in the terminal.\nAlternatively, you can extract the `.zst` file into the `data` folder."
+    )
+    exit()
     
 
 try:
@@ -383,57 +403,42 @@ else:
 
 class PuzzleDatabase():
     def __init__(self: typing.Self) -> None:
-        self.puzzle_cache = {}
-        
-        self.file_path = "data/lichess_db_puzzle.csv"
+        self.store = puzzle_database.load_store()
             
         self.reset_reader()
     
     def reset_reader(self: typing.Self) -> None:
-        self.opened_file = open(self.file_path, "r")
-        self.reader = csv.reader(self.opened_file)
+        # The position of the last puzzle read, so the next read carries on from there.
+        self.position = 0
     
     def read_puzzles(
             self: typing.Self,
             amount: int,
             category: str
         ) -> typing.Generator[tuple[str]]:
+        if amount <= 0:
+            return
+        
         index = 0
-        while index < amount:
-            give = next(self.reader)
-            
-            if give[1] == "FEN":
-                give = next(self.reader)
+        for position, puzzle in self.store.iterate(category, after=self.position):
+            self.position = position
             
-            if category != "" and category not in give[7].split(" "):
-                while category not in give[7].split(" "):
-                    give = next(self.reader)
-            
-            yield give
+            yield puzzle
             
             index += 1
+            if index >= amount:
+                return
+        
+        raise RuntimeError("There are no more puzzles to read.")
     
     def find_puzzle_by_id(
             self: typing.Self,
             puzzle_id: str
         ) -> tuple[str] | None:
-        if puzzle_id in self.puzzle_cache:
-            return self.puzzle_cache[puzzle_id]
-        
-        self.reset_reader()
-        
-        for puzzle in self.reader:
-            if puzzle[0] == puzzle_id:
-                self.puzzle_cache[puzzle[0]] = puzzle
-                return puzzle
-            
-        print(next(self.reader))
-        
-        self.puzzle_cache[puzzle_id] = None
-        return None
+        return self.store.get(puzzle_id)
 
     def teardown(self: typing.Self) -> None:
-        self.opened_file.close()
+        self.store.close()
 
 class ChessApp(parent_class):
     SOUND_PATHS = {
@@ -678,6 +683,7 @@ class ChessApp(parent_class):
             "correct": correct,
             "themes": themes.split(" "),
             "rating": int(rating),
+            "rating_deviation": int(ratingdeviation),
             "puzzle_id": puzzle_id
         }
     
@@ -693,86 +699,24 @@ class ChessApp(parent_class):
             )
             return None
         
-        correct = 0
-        correct_rating_sum = 0
-        incorrect_rating_sum = 0
-        
-        highest_correct_rating = 0
-        highest_correct_id = None
-        
-        lowest_incorrect_rating = float("inf")
-        lowest_incorrect_id = None
-        
-        themes = {}
+        summary = puzzle_runner.PuzzleSummary(num_puzzles)
         
         self.database.reset_reader()
         
         start = time.time()
         
         try:
-            for index, puzzle in enumerate(self.database.read_puzzles(num_puzzles, self.specific_category.get())):
-                data = self.run_puzzle(puzzle)
-                
-                if data["correct"]:
-                    correct += 1
-                    correct_rating_sum += data["rating"]
-                    
-                    if data["rating"] > highest_correct_rating:
-                        highest_correct_rating = data["rating"]
-                        highest_correct_id = data["puzzle_id"]
-                else:
-                    incorrect_rating_sum += data["rating"]
-                
-                    if data["rating"] < lowest_incorrect_rating:
-                        lowest_incorrect_rating = data["rating"]
-                        lowest_incorrect_id = data["puzzle_id"]
+            for puzzle in self.database.read_puzzles(num_puzzles, self.specific_category.get()):
+                summary.add(self.run_puzzle(puzzle))
                 
-                for theme in data["themes"]:
-                    if theme not in themes:
-                        themes[theme] = {"played": 1, "correct": int(data["correct"])}
-                    else:
-                        themes[theme]["played"] += 1
-                        if data["correct"]:
-                            themes[theme]["correct"] += 1
-                
-                current = time.time()
-                print(f"Done {index + 1}/{num_puzzles} ({round((index + 1) / num_puzzles * 100, 2)}%) | Elapsed: {round(current - start, 2)} | Remaining: {round((current - start) / (index + 1) * (num_puzzles - (index+ 1)), 2)}"
-                    f" | Correct: {correct} ({round(correct / (index + 1) * 100, 2)}%), Incorrect: {index + 1 - correct} ({round((1 - correct / (index + 1)) * 100, 2)}%)"
-                )
+                print(summary.progress(time.time() - start))
                 if self.do_delay:
                     time.sleep(0.5)
         except RuntimeError:
             print("Out of puzzles to solve!\n")
         
-        lines = [
-            f"Correct: {correct} ({round(correct / num_puzzles * 100, 2)}%)",
-            f"Incorrect: {num_puzzles - correct} ({round((1 - correct / num_puzzles) * 100, 2)}%)",
-            f"Average correct rating: {round(correct_rating_sum / (correct if correct != 0 else 1), 2)}",
-            f"Average incorrect rating: {round(incorrect_rating_sum / ((num_puzzles - correct) if correct != num_puzzles else 1), 2)}",
-            "",
-            "Highest rated correctly solved:",
-            f"- Rating: {highest_correct_rating}",
-            f"- Link: https://lichess.org/training/{highest_correct_id}",
-            "",
-            "Lowest rated incorrectly solved:",
-            f"- Rating: {lowest_incorrect_rating}",
-            f"- Link: https://lichess.org/training/{lowest_incorrect_id}",
-            "",
-            "Theme information:",
-        ]
-        lines.extend([
-            f"- {name}: {data['correct']}/{data['played']} ({round(data['correct'] / data['played'] * 100, 2)}%)"
-            for name, data in sorted(list(themes.items()), key=lambda a: a[1]['correct'] / a[1]['played'], reverse=True)
-        ])
-        
-        max_length = len(max(lines, key=len))
-        
-        print(f" {num_puzzles} {'bulk' if self.specific_category.get() == '' else self.specific_category.get()} puzzles: ".center(max_length + 4, "#"))
-        
-        for line in lines:
-            print("# " + line.ljust(max_length) + " #")
-        
-        print("#" * (max_length + 4))
+        for line in summary.format(self.specific_category.get()):
+            print(line)
             
             
         
@@ -1195,8 +1139,8 @@ def main():
             
         print = custom_print
         base.print = custom_print
-        for module in base.bot_modules.values():
-            module.print = custom_print
+        # Bots are imported when they're first used, so this also needs to happen to the ones imported later.
+        base.add_module_load_hook(lambda module: setattr(module, "print", custom_print))
         
         chess_app.mainloop()
         
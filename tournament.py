@@ -0,0 +1,318 @@
+import argparse
+import itertools
+import math
+import os
+import time
+import typing
+
+import base
+
+def schedule_pairings(
+        bot_names: list[str],
+        gauntlet: str | None = None
+    ) -> list[tuple[str, str]]:
+    """Returns the pairings to play. Every bot plays every other bot once, unless `gauntlet` is given,
+    in which case only that bot plays against the rest."""
+    if gauntlet is None:
+        return list(itertools.combinations(bot_names, 2))
+
+    return [(gauntlet, name) for name in bot_names if name != gauntlet]
+
+def resolve_bots(
+        bot_names: list[str],
+        gauntlet: str | None = None
+    ) -> tuple[list[str], str | None]:
+    """Returns the names of the bots as they're found in `base.all_bots` without any repeats, and the name of the gauntlet bot, which is added to the bots if it isn't there.
+    Raises a ValueError if a bot isn't found, or if there wouldn't be any pairings to play."""
+    # Every name is looked up first, so the same bot given twice in different cases only plays once.
+    bot_names = list(dict.fromkeys(base.get_bot(name).name for name in bot_names))
+
+    if gauntlet is not None:
+        gauntlet = base.get_bot(gauntlet).name
+
+        if gauntlet not in bot_names:
+            bot_names.append(gauntlet)
+
+    if len(bot_names) < 2:
+        raise ValueError("A tournament needs at least two different bots.")
+
+    return bot_names, gauntlet
+
+def _interleave_games(
+        pairings: list[tuple[str, str]],
+        games_per_pairing: int,
+        variate_starting_positions: bool,
+        seeded_positions: bool,
+        time_control: base.TimeControl | None = None
+    ) -> typing.Generator[dict, None, None]:
+    """Yields the games for every pairing, alternating between the pairings.
+    This keeps the slow pairings spread out over the whole tournament instead of all being left at the end."""
+    plans = []
+
+    for pairing in pairings:
+        plan = base.plan_bulk_games(
+            bot_1 = base.get_bot(pairing[0]),
+            bot_2 = base.get_bot(pairing[1]),
+            amount = games_per_pairing,
+            variate_starting_positions = variate_starting_positions,
+            seeded_positions = seeded_positions,
+            time_control = time_control
+        )
+        plans.append((pairing, plan))
+
+    for round_games in itertools.zip_longest(*[plan for _, plan in plans]):
+        for (pairing, _), game in zip(plans, round_games):
+            if game is None:
+                continue
+
+            game["pairing"] = pairing
+            yield game
+
+def compute_ratings(
+        results: dict[tuple[str, str], dict[str, int]],
+        prior_draws: float = 1.0,
+        iterations: int = 1000
+    ) -> dict[str, tuple[float, float]]:
+    """Computes the maximum likelihood Elo ratings from the results of each pairing, similar to Ordo and BayesElo.
+    Draws count as half a win for each side, and `prior_draws` virtual draws are added to every pairing
+    so a bot that won or lost every game still gets a finite rating.
+
+    The ratings are centered around 0. Returns a dictionary of each bot's rating and the margin of its 95% confidence interval."""
+    names = sorted({name for pairing in results for name in pairing})
+
+    if len(names) == 0:
+        return {}
+
+    games = {name: {} for name in names}
+    scores = {name: 0.0 for name in names}
+
+    for (name_1, name_2), outcome in results.items():
+        played = outcome[name_1] + outcome[name_2] + outcome["draw"] + prior_draws
+
+        games[name_1][name_2] = games[name_1].get(name_2, 0) + played
+        games[name_2][name_1] = games[name_2].get(name_1, 0) + played
+
+        scores[name_1] += outcome[name_1] + (outcome["draw"] + prior_draws) / 2
+        scores[name_2] += outcome[name_2] + (outcome["draw"] + prior_draws) / 2
+
+    # Bradley-Terry strengths, fit with the minorization-maximization algorithm.
+    strengths = {name: 1.0 for name in names}
+
+    for _ in range(iterations):
+        updated = {}
+
+        for name in names:
+            denominator = sum(
+                played / (strengths[name] + strengths[opponent])
+                for opponent, played in games[name].items()
+            )
+            updated[name] = scores[name] / denominator if denominator else strengths[name]
+
+        # Normalize with the geometric mean, which centers the ratings around 0.
+        center = math.exp(sum(math.log(value) for value in updated.values()) / len(updated))
+        updated = {name: value / center for name, value in updated.items()}
+
+        converged = all(abs(updated[name] - strengths[name]) < 1e-10 * strengths[name] for name in names)
+        strengths = updated
+
+        if converged:
+            break
+
+    elo_scale = 400 / math.log(10)
+    ratings = {}
+
+    for name in names:
+        # The margin comes from the Fisher information of the bot's own rating.
+        information = sum(
+            played * strengths[name] * strengths[opponent] / (strengths[name] + strengths[opponent]) ** 2
+            for opponent, played in games[name].items()
+        )
+        margin = 1.959964 * elo_scale / math.sqrt(information) if information else math.inf
+
+        ratings[name] = (elo_scale * math.log(strengths[name]), margin)
+
+    return ratings
+
+def format_crosstable(
+        results: dict[tuple[str, str], dict[str, int]],
+        ratings: dict[str, tuple[float, float]]
+    ) -> list[str]:
+    """Returns the lines of a crosstable, with the bots sorted by rating.
+    Each cell is the score of the bot in that row against the bot in that column."""
+    order = sorted(ratings, key=lambda name: ratings[name][0], reverse=True)
+
+    if len(order) == 0:
+        return []
+
+    cells = {}
+    totals = {name: [0.0, 0] for name in order}
+
+    for (name_1, name_2), outcome in results.items():
+        played = outcome[name_1] + outcome[name_2] + outcome["draw"]
+        score_1 = outcome[name_1] + outcome["draw"] / 2
+        score_2 = outcome[name_2] + outcome["draw"] / 2
+
+        cells[name_1, name_2] = f"{score_1:g}/{played}"
+        cells[name_2, name_1] = f"{score_2:g}/{played}"
+
+        totals[name_1][0] += score_1
+        totals[name_1][1] += played
+        totals[name_2][0] += score_2
+        totals[name_2][1] += played
+
+    name_width = max(len(name) for name in order)
+    cell_width = max([len(cell) for cell in cells.values()] + [len(str(len(order)))])
+
+    header = " ".join([
+        "#".rjust(len(str(len(order)))),
+        "Bot".ljust(name_width),
+        "Elo".rjust(6),
+        "+/-".rjust(6),
+        "Score".rjust(12),
+        *[str(index + 1).rjust(cell_width) for index in range(len(order))]
+    ])
+    lines = [header, "-" * len(header)]
+
+    for index, name in enumerate(order):
+        rating, margin = ratings[name]
+        score, played = totals[name]
+
+        lines.append(" ".join([
+            str(index + 1).rjust(len(str(len(order)))),
+            name.ljust(name_width),
+            str(round(rating)).rjust(6),
+            str(round(margin)).rjust(6),
+            f"{score:g}/{played}".rjust(12),
+            *[
+                ("-" if opponent == name else cells.get((name, opponent), "")).rjust(cell_width)
+                for opponent in order
+            ]
+        ]))
+
+    return lines
+
+def run_tournament(
+        bot_names: list[str],
+        games_per_pairing: int = 100,
+        *, # This means the following arguments must be passed as keyword arguments.
+        gauntlet: str | None = None,
+        variate_starting_positions: bool = False,
+        seeded_positions: bool = True,
+        workers: int | None = None,
+        time_control: base.TimeControl | None = None
+    ) -> dict:
+    """Runs a round robin tournament between the given bots, or a gauntlet if `gauntlet` is given.
+    The games from every pairing share one process pool, so no worker is left waiting on a slow pairing to finish.
+
+    Args:
+        bot_names (list[str]): The names of the bots to play, as found in `base.all_bots`.
+        games_per_pairing (int, optional): The number of games each pairing plays. Defaults to 100.
+        gauntlet (str | None, optional): The name of a bot that plays against every other bot, instead of every bot playing every other bot. Defaults to None.
+        variate_starting_positions (bool, optional): Whether to use random starting positions. Defaults to False.
+        seeded_positions (bool, optional): Whether to use a seed for the starting positions, the same as in `base.run_bulk`. Defaults to True.
+        workers (int | None, optional): The number of processes to use. If None the number of CPUs is used. Defaults to None.
+        time_control (base.TimeControl | None, optional): The time limit for the bots in every game, see `base.run_match` for more information. Defaults to None.
+
+    Returns:
+        dict: The results of every pairing under "results", the ratings under "ratings", and the lines of the crosstable under "crosstable".
+
+    Raises a ValueError if there are fewer than two different bots, see `resolve_bots`.
+    """
+    bot_names, gauntlet = resolve_bots(bot_names, gauntlet)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pairings = schedule_pairings(bot_names, gauntlet)
+
+    if len(pairings) == 0:
+        raise ValueError("There are no pairings to play.")
+
+    results = {
+        pairing: {pairing[0]: 0, pairing[1]: 0, "draw": 0}
+        for pairing in pairings
+    }
+
+    games = _interleave_games(
+        pairings = pairings,
+        games_per_pairing = games_per_pairing,
+        variate_starting_positions = variate_starting_positions,
+        seeded_positions = seeded_positions,
+        time_control = time_control
+    )
+
+    total = len(pairings) * games_per_pairing
+    increment = max(total // 100, 1)
+    starting_time = time.time()
+
+    for done, (game, data) in enumerate(base.iterate_bulk_games(games, workers), start=1):
+        outcome = results[game["pairing"]]
+
+        if data["winner"] is None:
+            outcome["draw"] += 1
+        elif data["winner"]:
+            outcome[game["white"].name] += 1
+        else:
+            outcome[game["black"].name] += 1
+
+        if done % increment == 0 or done == total:
+            elapsed = time.time() - starting_time
+            print(f"{str(done).rjust(len(str(total)))}/{total} | Elapsed: {round(elapsed, 2)} | Remaining: {round(elapsed / done * (total - done), 2)}")
+
+    ratings = compute_ratings(results)
+    crosstable = format_crosstable(results, ratings)
+
+    print()
+    for line in crosstable:
+        print(line)
+
+    return {
+        "results": results,
+        "ratings": ratings,
+        "crosstable": crosstable
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a round robin or gauntlet tournament between Chess bots.")
+    parser.add_argument("bots", nargs="+", help="The names of the bots to play. Use `all` for every bot.")
+    parser.add_argument("-n", "--games", type=int, default=100, help="The number of games each pairing plays.")
+    parser.add_argument("-g", "--gauntlet", default=None, help="A bot to play against every other bot, instead of a round robin.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="The number of processes to use, defaults to the number of CPUs.")
+    parser.add_argument("--random-start", action="store_true", help="Start the games from random positions.")
+    parser.add_argument("--unseeded", action="store_true", help="Don't seed the random starting positions.")
+    parser.add_argument("-t", "--time-control", default=None, help="The time limit for the bots, like `60+0.5` for a 60 second clock with a 0.5 second increment, or `0.5` for 0.5 seconds per move.")
+    parser.add_argument("--time-fallback", action="store_true", help="Play a random move when a bot runs out of time, instead of the bot losing.")
+    arguments = parser.parse_args()
+
+    time_control = None
+    if arguments.time_control is not None:
+        try:
+            time_control = base.TimeControl.from_string(
+                arguments.time_control,
+                fallback = base.random_move if arguments.time_fallback else None
+            )
+        except ValueError:
+            parser.error(f"invalid time control: {arguments.time_control}")
+
+    if arguments.bots == ["all"]:
+        bot_names = list(base.all_bots.keys())
+    else:
+        bot_names = arguments.bots
+
+    try:
+        bot_names, gauntlet = resolve_bots(bot_names, arguments.gauntlet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    run_tournament(
+        bot_names = bot_names,
+        games_per_pairing = arguments.games,
+        gauntlet = gauntlet,
+        variate_starting_positions = arguments.random_start,
+        seeded_positions = not arguments.unseeded,
+        workers = arguments.workers,
+        time_control = time_control
+    )
+
+if __name__ == "__main__":
+    main()